@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+# pylint: disable=missing-docstring
+
+import argparse
+import json
+import math
+import os
+import queue
+import re
+import subprocess
+import sys
+import threading
+import time
+
+try:
+    import grpc
+except ImportError:
+    grpc = None
+
+TX_HASH_RE = re.compile(r'0x[0-9a-fA-F]{64}')
+
+DEFAULT_SEND_CMD = 'cldi -r {rpc} -e {executor} send 0xffffffffffffffffffffffffffffffffffffffff 0x'
+
+DEFAULT_RECEIPT_CMD = 'cldi -r {rpc} -e {executor} get receipt {tx_hash}'
+
+# send_cmd without {count} is repeated in one shell for a batch
+BATCH_SEND_CMD = 'for i in $(seq {count}); do {send_cmd}; done'
+
+# request is common.Hash, response is common.BlockNumber, fails until the tx is in a block
+GET_TRANSACTION_BLOCK_NUMBER_METHOD = '/controller.RPCService/GetTransactionBlockNumber'
+
+RECEIPT_MODE_GRPC = 'grpc'
+
+RECEIPT_MODE_CMD = 'cmd'
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        '--rpc', default='localhost:50004', help='Address of controller rpc.')
+
+    parser.add_argument(
+        '--executor', default='localhost:50002', help='Address of executor call.')
+
+    parser.add_argument(
+        '--total',
+        type=int,
+        default=10000,
+        help='Count of transactions to send.')
+
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=16,
+        help='Count of concurrent senders.')
+
+    parser.add_argument(
+        '--rate',
+        type=float,
+        default=0,
+        help='Max transactions sent per second, 0 is unlimited.')
+
+    parser.add_argument(
+        '--batch_size',
+        type=int,
+        default=1,
+        help='Count of transactions sent by one run of send_cmd.')
+
+    parser.add_argument(
+        '--receipt_mode',
+        choices=[RECEIPT_MODE_GRPC, RECEIPT_MODE_CMD],
+        help='grpc: query controller over one channel (needs grpcio); cmd: run receipt_cmd. Default grpc if grpcio is installed.')
+
+    parser.add_argument(
+        '--timeout',
+        type=float,
+        default=300,
+        help='Seconds to wait for the receipt of a transaction.')
+
+    parser.add_argument(
+        '--poll_interval',
+        type=float,
+        help='Seconds between two receipt queries of a transaction, default 0.1 in grpc mode and 0.5 in cmd mode.')
+
+    parser.add_argument(
+        '--send_cmd', default=DEFAULT_SEND_CMD, help='Command to send a transaction, prints tx hash. With {count} it sends count transactions and prints all hashes.')
+
+    parser.add_argument(
+        '--receipt_cmd', default=DEFAULT_RECEIPT_CMD, help='Command to get receipt, exits 0 when committed.')
+
+    parser.add_argument(
+        '--report_dir', default='.', help='Directory of the json report.')
+
+    parser.add_argument(
+        '--label', default='bench', help='Label of this run, used in name of report.')
+
+    args = parser.parse_args()
+    if args.receipt_mode is None:
+        args.receipt_mode = RECEIPT_MODE_GRPC if grpc else RECEIPT_MODE_CMD
+    if args.receipt_mode == RECEIPT_MODE_GRPC and grpc is None:
+        print('grpcio must be installed: pip install grpcio')
+        sys.exit(1)
+    if args.poll_interval is None:
+        args.poll_interval = 0.1 if args.receipt_mode == RECEIPT_MODE_GRPC else 0.5
+    return args
+
+
+def run_cmd(cmd, timeout):
+    try:
+        result = subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return 1, ''
+    return result.returncode, result.stdout.decode(errors='replace')
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    # nearest rank
+    index = max(0, math.ceil(pct / 100.0 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def decode_varint(data, pos):
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+
+
+# protobuf of common.BlockNumber {uint64 block_number = 1;}
+def decode_block_number(data):
+    block_number = 0
+    pos = 0
+    while pos < len(data):
+        key, pos = decode_varint(data, pos)
+        field, wire_type = key >> 3, key & 0x7
+        if wire_type == 0:
+            value, pos = decode_varint(data, pos)
+            if field == 1:
+                block_number = value
+        elif wire_type == 1:
+            pos += 8
+        elif wire_type == 2:
+            size, pos = decode_varint(data, pos)
+            pos += size
+        elif wire_type == 5:
+            pos += 4
+        else:
+            raise ValueError('Invalid wire type {}'.format(wire_type))
+    return block_number
+
+
+# protobuf of common.Hash {bytes hash = 1;}
+def encode_hash(tx_hash):
+    data = bytes.fromhex(tx_hash[2:])
+    return b'\x0a' + bytes([len(data)]) + data
+
+
+def new_state():
+    return {
+        'lock': threading.Lock(),
+        'pending': queue.Queue(),
+        'senders_done': threading.Event(),
+        'next_index': 0,
+        'next_send_time': time.time(),
+        'submitted': 0,
+        'send_failed': 0,
+        'timeout': 0,
+        'latencies': [],
+        'first_submit': None,
+        'last_submit': None,
+        'last_commit': None,
+    }
+
+
+# take a batch of transactions to send, return (count, seconds to wait for rate limit) or None when all sent
+def take_txs(args, state):
+    with state['lock']:
+        if state['next_index'] >= args.total:
+            return None
+        count = min(args.batch_size, args.total - state['next_index'])
+        state['next_index'] += count
+        now = time.time()
+        delay = 0
+        if args.rate > 0:
+            delay = max(0, state['next_send_time'] - now)
+            state['next_send_time'] = max(now, state['next_send_time']) + count / args.rate
+        return count, delay
+
+
+def gen_send_cmd(args, count):
+    if '{count}' in args.send_cmd:
+        return args.send_cmd.format(rpc=args.rpc, executor=args.executor, count=count)
+    send_cmd = args.send_cmd.format(rpc=args.rpc, executor=args.executor)
+    if count == 1:
+        return send_cmd
+    return BATCH_SEND_CMD.format(count=count, send_cmd=send_cmd)
+
+
+# one process per batch, latency of a transaction counts from the start of its batch
+def send_worker(args, state):
+    while True:
+        batch = take_txs(args, state)
+        if batch is None:
+            return
+        count, delay = batch
+        if delay:
+            time.sleep(delay)
+        submit_time = time.time()
+        _, output = run_cmd(gen_send_cmd(args, count), args.timeout)
+        tx_hashes = TX_HASH_RE.findall(output)[:count]
+        with state['lock']:
+            state['send_failed'] += count - len(tx_hashes)
+            if not tx_hashes:
+                continue
+            state['submitted'] += len(tx_hashes)
+            if state['first_submit'] is None:
+                state['first_submit'] = submit_time
+            state['last_submit'] = time.time()
+        for tx_hash in tx_hashes:
+            state['pending'].put((tx_hash, submit_time, submit_time + args.poll_interval))
+
+
+# is transaction committed, controller knows its block number only after commit
+def gen_receipt_checker(args):
+    if args.receipt_mode == RECEIPT_MODE_CMD:
+        def check(tx_hash):
+            cmd = args.receipt_cmd.format(rpc=args.rpc, executor=args.executor, tx_hash=tx_hash)
+            code, _ = run_cmd(cmd, args.timeout)
+            return code == 0
+        return check, lambda: None
+
+    channel = grpc.insecure_channel(args.rpc)
+    get_block_number = channel.unary_unary(GET_TRANSACTION_BLOCK_NUMBER_METHOD)
+
+    def check(tx_hash):
+        try:
+            decode_block_number(get_block_number(encode_hash(tx_hash), timeout=args.timeout))
+        except grpc.RpcError:
+            return False
+        return True
+    return check, channel.close
+
+
+# query receipts of pending transactions until committed or timeout
+def receipt_worker(args, state, check):
+    while True:
+        try:
+            tx_hash, submit_time, next_check = state['pending'].get(timeout=args.poll_interval)
+        except queue.Empty:
+            if state['senders_done'].is_set():
+                return
+            continue
+        now = time.time()
+        if now < next_check:
+            time.sleep(next_check - now)
+        is_committed = check(tx_hash)
+        now = time.time()
+        if is_committed:
+            with state['lock']:
+                state['latencies'].append(now - submit_time)
+                state['last_commit'] = now
+        elif now - submit_time > args.timeout:
+            with state['lock']:
+                state['timeout'] += 1
+        else:
+            state['pending'].put((tx_hash, submit_time, now + args.poll_interval))
+
+
+# receivers share one grpc channel in grpc mode
+def run_bench(args, state):
+    check, close = gen_receipt_checker(args)
+    senders = [threading.Thread(target=send_worker, args=(args, state)) for _ in range(args.concurrency)]
+    receivers = [threading.Thread(target=receipt_worker, args=(args, state, check)) for _ in range(args.concurrency)]
+    try:
+        for thread in senders + receivers:
+            thread.start()
+        for thread in senders:
+            thread.join()
+        state['senders_done'].set()
+        for thread in receivers:
+            thread.join()
+    finally:
+        close()
+
+
+def gen_report(args, state):
+    latencies = sorted(state['latencies'])
+    committed = len(latencies)
+    report = {
+        'label': args.label,
+        'rpc': args.rpc,
+        'total': args.total,
+        'concurrency': args.concurrency,
+        'rate': args.rate,
+        'batch_size': args.batch_size,
+        'receipt_mode': args.receipt_mode,
+        'submitted': state['submitted'],
+        'send_failed': state['send_failed'],
+        'committed': committed,
+        'timeout': state['timeout'],
+        'submit_tps': None,
+        'tps': None,
+        'latency': {
+            'p50': percentile(latencies, 50),
+            'p90': percentile(latencies, 90),
+            'p99': percentile(latencies, 99),
+            'max': latencies[-1] if latencies else None,
+            'mean': sum(latencies) / committed if committed else None,
+        },
+    }
+    first_submit = state['first_submit']
+    if first_submit is not None and state['last_submit'] > first_submit:
+        report['submit_tps'] = state['submitted'] / (state['last_submit'] - first_submit)
+    if committed and state['last_commit'] > first_submit:
+        # sustained tps: committed transactions from first submit to last commit
+        report['tps'] = committed / (state['last_commit'] - first_submit)
+    return report
+
+
+def main():
+    args = parse_arguments()
+    print("args:", args)
+    state = new_state()
+    run_bench(args, state)
+    report = gen_report(args, state)
+    print(json.dumps(report, indent=2))
+
+    if not os.path.exists(args.report_dir):
+        os.makedirs(args.report_dir)
+    path = os.path.join(args.report_dir, '{}-{}.json'.format(args.label, int(time.time())))
+    with open(path, 'wt') as stream:
+        json.dump(report, stream, indent=2)
+    print("report_path:", path)
+
+
+if __name__ == '__main__':
+    main()
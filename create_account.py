@@ -2,27 +2,85 @@
 # -*- coding:utf-8 -*-
 # pylint: disable=missing-docstring
 
+import argparse
+import csv
+import json
 import os
 import subprocess
 import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 
-def main():
-    cmd = './kms create -k key_file'
-    kms_create = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
-    output = kms_create.stdout.readlines()[-1].decode().strip()
-    print("kms create output:", output)
-    # output should looks like: key_id:1,address:0xba21324990a2feb0a0b6ca16b444b5585b841df9
-    infos = output.split(',')
-    key_id = infos[0].split(':')[1]
-    address = infos[1].split(':')[1]
+# files in current dir used by kms create
+KMS_INPUT_FILES = ['key_file', 'kms-log4rs.yaml']
 
-    current_dir = os.path.abspath(os.curdir)
-    dir = os.path.join(current_dir, address)
-    if not os.path.exists(dir):
-        os.makedirs(dir)
-    
-    shutil.move(os.path.join(current_dir, 'kms.db'), os.path.join(dir, 'kms.db'))
-    shutil.move(os.path.join(current_dir, 'key_file'), os.path.join(dir, 'key_file'))
+
+def parse_arguments():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        '--kms', default='./kms', help='Path of kms binary.')
+
+    parser.add_argument(
+        '--count',
+        type=int,
+        default=1,
+        help='Count of accounts to create.')
+
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        default=4,
+        help='Count of accounts created concurrently.')
+
+    parser.add_argument(
+        '--summary', help='Write addresses of created accounts to the file, json or csv by the extension.')
+
+    args = parser.parse_args()
+    return args
+
+
+# write summary of accounts, authorities is ready for --authorities of create_k8s_config.py
+def write_summary(path, accounts):
+    with open(path, 'wt') as stream:
+        if path.endswith('.csv'):
+            writer = csv.DictWriter(stream, fieldnames=['address', 'key_id', 'path'])
+            writer.writeheader()
+            writer.writerows(accounts)
+        else:
+            summary = {
+                'authorities': ','.join(account['address'] for account in accounts),
+                'accounts': accounts,
+            }
+            json.dump(summary, stream, indent=2)
+    print("summary_path:", path)
+
+
+# kms create in a dir of its own, so that concurrent runs do not share kms.db
+def create_account(kms, current_dir):
+    temp_dir = tempfile.mkdtemp(dir=current_dir)
+    try:
+        for name in KMS_INPUT_FILES:
+            if os.path.exists(os.path.join(current_dir, name)):
+                shutil.copy(os.path.join(current_dir, name), temp_dir)
+        cmd = '{} create -k key_file'.format(kms)
+        kms_create = subprocess.Popen(cmd, shell=True, cwd=temp_dir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        output = kms_create.stdout.readlines()[-1].decode().strip()
+        kms_create.wait()
+        print("kms create output:", output)
+        # output should looks like: key_id:1,address:0xba21324990a2feb0a0b6ca16b444b5585b841df9
+        infos = output.split(',')
+        key_id = infos[0].split(':')[1]
+        address = infos[1].split(':')[1]
+
+        dir = os.path.join(current_dir, address)
+        if not os.path.exists(dir):
+            os.makedirs(dir)
+
+        shutil.move(os.path.join(temp_dir, 'kms.db'), os.path.join(dir, 'kms.db'))
+        shutil.move(os.path.join(temp_dir, 'key_file'), os.path.join(dir, 'key_file'))
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
 
     path = os.path.join(dir, 'key_id')
     with open(path, 'wt') as stream:
@@ -31,6 +89,22 @@ def main():
     path = os.path.join(dir, 'node_address')
     with open(path, 'wt') as stream:
         stream.write(address)
+    return {'address': address, 'key_id': key_id, 'path': dir}
+
+
+def main():
+    args = parse_arguments()
+    current_dir = os.path.abspath(os.curdir)
+    kms = os.path.abspath(args.kms)
+    with ThreadPoolExecutor(max_workers=args.jobs) as executor:
+        accounts = list(executor.map(lambda _: create_account(kms, current_dir), range(args.count)))
+    # key_file is archived with every account
+    if os.path.exists(os.path.join(current_dir, 'key_file')):
+        os.remove(os.path.join(current_dir, 'key_file'))
+    if args.count > 1:
+        print("authorities:", ','.join(account['address'] for account in accounts))
+    if args.summary:
+        write_summary(args.summary, accounts)
 
 
 if __name__ == '__main__':
@@ -13,13 +13,101 @@ import xml.etree.ElementTree as ET
 import base64
 import yaml
 import hashlib
+import json
+import fcntl
+import glob
+import ssl
+import tempfile
+import threading
+import http.client
+import queue
+import datetime
+import asyncio
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from pysmx.SM2 import generate_keypair
 from pysmx.SM3 import hash_msg
+from create_pvc import DEFAULT_PV_CAPACITY, DEFAULT_PVC_REQUEST
+from bench import percentile, decode_block_number
+
+# optional, apply over http2 if httpx and h2 are installed
+try:
+    import httpx
+except ImportError:
+    httpx = None
+try:
+    import h2
+except ImportError:
+    h2 = None
+
+# optional, probe controllers with asyncio grpc
+try:
+    from grpc import aio as grpc_aio
+except ImportError:
+    grpc_aio = None
 
 DEFAULT_PREVHASH = '0x{:064x}'.format(0)
 
 DEFAULT_BLOCK_INTERVAL = 6
 
+DEFAULT_BLOCK_DELAY_NUMBER = 0
+
+DEFAULT_LOG_LEVEL = 'info'
+
+# performance profiles, set defaults of chain parameters together
+# explicit CLI arguments and service-config.toml take precedence
+PERF_PROFILES = {
+    'low-latency': {
+        'block_interval': 1,
+        'block_delay_number': 0,
+        'log_level': 'warn',
+        'log': {
+            'refresh_rate': 0,
+        },
+        'sync': {
+            'compression': 'never',
+            'fs_watcher_delay_s': 1,
+        },
+        'resources': {
+            'requests': {
+                'cpu': '500m',
+                'memory': '512Mi',
+            },
+        },
+    },
+    'high-throughput': {
+        'block_interval': 6,
+        'block_delay_number': 0,
+        'log_level': 'warn',
+        'log': {
+            'refresh_rate': 0,
+        },
+        'sync': {
+            'compression': 'metadata',
+        },
+        'resources': {
+            'requests': {
+                'cpu': '1',
+                'memory': '1Gi',
+            },
+        },
+    },
+    'dev': {
+        'block_interval': 3,
+        'block_delay_number': 0,
+        'log_level': 'debug',
+        'sync': {
+            'compression': 'metadata',
+        },
+        'resources': {
+            'requests': {
+                'cpu': '100m',
+                'memory': '128Mi',
+            },
+        },
+    },
+}
+
 DEFAULT_IMAGEPULLPOLICY = 'Always'
 
 SERVICE_LIST = [
@@ -35,12 +123,229 @@ SYNCTHING_DOCKER_IMAGE = 'syncthing/syncthing:latest'
 
 DEBUG_DOCKER_IMAGE = 'praqma/network-multitool'
 
+STATE_DB_DOCKER_IMAGE = 'couchdb'
+
+MONITOR_PROCESS_DOCKER_IMAGE = 'citacloud/monitor-process-exporter:0.4.1'
+
+MONITOR_CITACLOUD_DOCKER_IMAGE = 'citacloud/monitor-citacloud-exporter:0.1.1'
+
+PAUSE_DOCKER_IMAGE = 'registry.k8s.io/pause:3.9'
+
+# static busybox, copied into prepull containers as true
+PREPULL_TOOL_DOCKER_IMAGE = 'busybox:1.36-musl'
+
+# label node_role of node pods
+NODE_ROLE_VALIDATOR = 'validator'
+
+NODE_ROLE_RPC = 'rpc'
+
+MONITOR_MODE_SIDECAR = 'sidecar'
+
+MONITOR_MODE_SHARED = 'shared'
+
+# process exporter of shared mode, one per host for all chains
+MONITOR_PROCESS_NAME = 'monitor-process'
+
+MONITOR_CONFIG_OPERATOR = 'operator'
+
+MONITOR_CONFIG_STATIC = 'static'
+
+# metric names of citacloud exporter
+MONITOR_METRIC_BLOCK_HEIGHT = 'Node_Get_BlockNumber'
+
+MONITOR_METRIC_BLOCK_TXS = 'Node_Get_LastBlockTxs'
+
+IMAGEPULLPOLICY_LIST = [
+    'Always',
+    'IfNotPresent',
+    'Never',
+]
+
 SYNC_FOLDERS = [
     'blocks',
     'proposals',
     'txs'
 ]
 
+# tuning of syncthing, set in [sync] of service-config.toml
+# and overridden per node in [sync.nodes.<index>]
+DEFAULT_SYNC_COMPRESSION = 'always'
+
+SYNC_FOLDER_ATTRS = {
+    'fs_watcher_delay_s': 'fsWatcherDelayS',
+    'rescan_interval_s': 'rescanIntervalS',
+}
+
+SYNC_FOLDER_ELEMENTS = {
+    'copiers': 'copiers',
+    'hashers': 'hashers',
+    'puller_max_pending_kib': 'pullerMaxPendingKiB',
+    'max_concurrent_writes': 'maxConcurrentWrites',
+}
+
+SYNC_OPTION_ELEMENTS = {
+    'max_send_kbps': 'maxSendKbps',
+    'max_recv_kbps': 'maxRecvKbps',
+}
+
+SYNC_FOLDER_TYPES = [
+    'sendreceive',
+    'sendonly',
+    'receiveonly',
+]
+
+# services which read/write the sync folders
+# dir in config of syncthing, keeps .stignore of each folder
+SYNC_IGNORE_DIR = 'stignore'
+
+SYNC_FOLDER_SERVICES = [
+    'controller',
+]
+
+# volume class of logs, sync folders and state db
+# datadir: share the pvc of chain data (default)
+# emptydir: use emptyDir of the pod
+# others: name of a dedicated persistentVolumeClaim
+VOLUME_CLASS_DATADIR = 'datadir'
+
+VOLUME_CLASS_EMPTYDIR = 'emptydir'
+
+# [state_db] of service-config.toml, couchdb of chaincode_ext executor
+DEFAULT_STATE_DB_CONFIG = {
+    'max_dbs_open': 500,
+    # fragmentation ratio of a db or view to be compacted
+    'compaction_min_priority': 2.0,
+    # system databases of a single node couchdb
+    'databases': ['_users', '_replicator', '_global_changes'],
+}
+
+STATE_DB_INI_PATH = '/opt/couchdb/etc/local.d/citacloud.ini'
+
+STATE_DB_INIT_PATH = '/opt/couchdb/citacloud-init.sh'
+
+STATE_DB_URL = 'http://127.0.0.1:5984'
+
+PD_DOCKER_IMAGE = 'pingcap/pd:v4.0.16'
+
+TIKV_DOCKER_IMAGE = 'pingcap/tikv:v4.0.16'
+
+# [tikv] of service-config.toml, for storage_tikv
+DEFAULT_TIKV_CONFIG = {
+    'pd_storage': '1Gi',
+    'tikv_storage': DEFAULT_PVC_REQUEST,
+    # arguments of storage cmd are only added when set, they depend on the storage_tikv version
+    # pd_endpoints_arg: argument to set pd endpoints
+    # keyspace_arg: argument to set key prefix of the node, nodes of the chain share one tikv
+}
+
+# fields of a node in inventory of multi cluster
+INVENTORY_NODE_FIELDS = ['cluster', 'ip', 'lbs_token', 'authority', 'kms_password', 'pvc_name']
+
+# grpc ports of services and couchdb, probed for startup and readiness
+SERVICE_PROBE_PORTS = {
+    'network': 50000,
+    'consensus': 50001,
+    'executor': 50002,
+    'storage': 50003,
+    'controller': 50004,
+    'kms': 50005,
+    'couchdb': 5984,
+}
+
+PROBE_TYPE_LIST = ['tcp', 'grpc', 'none']
+
+# services start as soon as they listen, wait up to 300s
+STARTUP_PROBE = {
+    'periodSeconds': 1,
+    'failureThreshold': 300,
+}
+
+READINESS_PROBE = {
+    'periodSeconds': 5,
+    'failureThreshold': 3,
+}
+
+STARTUP_ORDER_PARALLEL = 'parallel'
+STARTUP_ORDER_NATIVE = 'native'
+
+# dependencies of controller, started one by one as native sidecars
+STARTUP_ORDER_SERVICES = ['kms', 'storage', 'couchdb', 'executor', 'network']
+
+# stages of local cluster, in order
+STAGE_LIST = ['config', 'accounts', 'sysconfig', 'sync']
+
+# default NodePort range of kube-apiserver (--service-node-port-range)
+DEFAULT_NODE_PORT_RANGE = '30000-32767'
+
+PORTS_ACTION_LIST = ['list', 'free', 'stat']
+
+DEFAULT_FIELD_MANAGER = 'create-k8s-config'
+
+# kind: (plural, is namespaced), api path comes from apiVersion
+KIND_RESOURCES = {
+    'Namespace': ('namespaces', False),
+    'Secret': ('secrets', True),
+    'ConfigMap': ('configmaps', True),
+    'Service': ('services', True),
+    'PersistentVolume': ('persistentvolumes', False),
+    'PersistentVolumeClaim': ('persistentvolumeclaims', True),
+    'StorageClass': ('storageclasses', False),
+    'Deployment': ('deployments', True),
+    'DaemonSet': ('daemonsets', True),
+    'StatefulSet': ('statefulsets', True),
+    'Job': ('jobs', True),
+    'PodDisruptionBudget': ('poddisruptionbudgets', True),
+    'ServiceMonitor': ('servicemonitors', True),
+    'PrometheusRule': ('prometheusrules', True),
+}
+
+# rpc of controller, request is common.Flag and response is common.BlockNumber
+CONTROLLER_RPC_PORT = 50004
+
+GET_BLOCK_NUMBER_METHOD = '/controller.RPCService/GetBlockNumber'
+
+# reason of event when image of a container is ready
+EVENT_REASON_PULLED = 'Pulled'
+
+# kinds applied after the objects they depend on
+WORKLOAD_KINDS = ['Deployment', 'DaemonSet', 'StatefulSet', 'Job']
+
+# ports of all_service in multi cluster: node_port + 0..8
+MC_NODE_PORTS_SIZE = 9
+
+# assumptions of capacity plan
+# requests of containers which have no resources in service-config.toml
+PLAN_DEFAULT_REQUESTS = {
+    'cpu': '100m',
+    'memory': '128Mi',
+}
+
+# bytes of block header, proof and index besides transactions
+PLAN_BLOCK_OVERHEAD = 1024
+
+# a transaction is stored by storage, executor (receipt) and state db
+PLAN_TX_COPIES = 3
+
+QUANTITY_SUFFIXES = {
+    'm': 0.001,
+    'k': 1000,
+    'M': 1000 ** 2,
+    'G': 1000 ** 3,
+    'T': 1000 ** 4,
+    'Ki': 1024,
+    'Mi': 1024 ** 2,
+    'Gi': 1024 ** 3,
+    'Ti': 1024 ** 4,
+}
+
+# size units of log4rs
+LOG_SIZE_SUFFIXES = {
+    'b': 1,
+    'kb': 1024,
+    'mb': 1024 ** 2,
+    'gb': 1024 ** 3,
+}
+
 
 def parse_arguments():
     parser = argparse.ArgumentParser()
@@ -60,9 +365,18 @@ def parse_arguments():
     plocal_cluster.add_argument(
         '--block_delay_number',
         type=int,
-        default=0,
         help='The block delay number of chain.')
 
+    plocal_cluster.add_argument(
+        '--block_interval',
+        type=int,
+        help='The block interval (seconds) of chain.')
+
+    plocal_cluster.add_argument(
+        '--profile',
+        choices=list(PERF_PROFILES),
+        help='Performance profile of chain: low-latency/high-throughput/dev')
+
     plocal_cluster.add_argument(
         '--chain_name', default='test-chain', help='The name of chain.')
 
@@ -72,6 +386,18 @@ def parse_arguments():
         default=2,
         help='Count of peers.')
 
+    plocal_cluster.add_argument(
+        '--rpc_replicas',
+        type=int,
+        default=0,
+        help='Count of non-validator nodes which serve rpc.')
+
+    plocal_cluster.add_argument(
+        '--rpc_session_affinity',
+        type=bool,
+        default=False,
+        help='Is rpc service use ClientIP session affinity')
+
     plocal_cluster.add_argument(
         '--kms_password', help='Password of kms.')
 
@@ -90,14 +416,76 @@ def parse_arguments():
         default=30004,
         help='The node port of rpc.')
 
+    plocal_cluster.add_argument(
+        '--restart_from',
+        choices=STAGE_LIST,
+        help='Redo this stage and stages after it even if they are in checkpoint.')
+
+    plocal_cluster.add_argument(
+        '--port_registry', help='Port registry file, allocate node_port from it instead of --node_port.')
+
     plocal_cluster.add_argument(
         '--need_monitor',
         type=bool,
         default=False,
         help='Is need monitor')
 
+    plocal_cluster.add_argument(
+        '--monitor_mode',
+        default=MONITOR_MODE_SIDECAR,
+        choices=[MONITOR_MODE_SIDECAR, MONITOR_MODE_SHARED],
+        help='sidecar: process and citacloud exporters in every node pod; shared: citacloud exporter in every node pod, one process exporter per host for all chains in monitor-process.yaml')
+
+    plocal_cluster.add_argument(
+        '--monitor_config',
+        default=MONITOR_CONFIG_OPERATOR,
+        choices=[MONITOR_CONFIG_OPERATOR, MONITOR_CONFIG_STATIC],
+        help='operator: ServiceMonitor/PrometheusRule/dashboard ConfigMap; static: prometheus scrape_config and rule files')
+
+    plocal_cluster.add_argument(
+        '--bench',
+        type=bool,
+        default=False,
+        help='Is need Job to benchmark the chain')
+
+    plocal_cluster.add_argument(
+        '--bench_total',
+        type=int,
+        default=10000,
+        help='Count of transactions sent by bench.')
+
+    plocal_cluster.add_argument(
+        '--bench_concurrency',
+        type=int,
+        default=16,
+        help='Count of concurrent senders of bench.')
+
+    plocal_cluster.add_argument(
+        '--bench_rate',
+        type=float,
+        default=0,
+        help='Max transactions sent per second by bench, 0 is unlimited.')
+
+    plocal_cluster.add_argument(
+        '--bench_batch_size',
+        type=int,
+        default=1,
+        help='Count of transactions sent by one run of send command of bench.')
+
+    plocal_cluster.add_argument(
+        '--bench_image', help='Docker image of bench, must have python3, grpcio and cldi, required by bench.')
+
+    plocal_cluster.add_argument(
+        '--bench_send_cmd', help='Command to send a transaction, see bench.py.')
+
+    plocal_cluster.add_argument(
+        '--bench_receipt_cmd', help='Command to get receipt, see bench.py.')
+
     plocal_cluster.add_argument(
         '--pvc_name', help='Name of persistentVolumeClaim.')
+
+    plocal_cluster.add_argument(
+        '--pvc_map', help='PVC map file generated by create_pvc.py node_local_pvc, one pvc per node.')
     
     plocal_cluster.add_argument(
         '--need_debug',
@@ -119,8 +507,80 @@ def parse_arguments():
 
     plocal_cluster.add_argument(
         '--log_level',
-        default="info",
-        help='log level: warn/info/debug/trace')
+        help='log level: warn/info/debug/trace, overrides log_level of services in service config')
+
+    plocal_cluster.add_argument(
+        '--log_refresh_rate',
+        type=int,
+        help='Seconds between scans of log config for changes, 0 to disable.')
+
+    plocal_cluster.add_argument(
+        '--log_roll_size', help='Size of log file to roll, e.g. 50mb.')
+
+    plocal_cluster.add_argument(
+        '--log_roll_count',
+        type=int,
+        help='Count of rolled log files to keep.')
+
+    plocal_cluster.add_argument(
+        '--probe_type',
+        default='tcp',
+        choices=PROBE_TYPE_LIST,
+        help='Startup and readiness probes of services: tcp/grpc/none.')
+
+    plocal_cluster.add_argument(
+        '--startup_order',
+        default=STARTUP_ORDER_PARALLEL,
+        choices=[STARTUP_ORDER_PARALLEL, STARTUP_ORDER_NATIVE],
+        help='parallel: all containers start together; native: dependencies of controller start in order as native sidecars, needs k8s 1.29+ and probe_type tcp/grpc.')
+
+    plocal_cluster.add_argument(
+        '--log_volume',
+        default=VOLUME_CLASS_DATADIR,
+        help='Volume of logs: datadir/emptydir/<pvc name>')
+
+    plocal_cluster.add_argument(
+        '--sync_volume',
+        default=VOLUME_CLASS_DATADIR,
+        help='Volume of syncthing folders: datadir/emptydir/<pvc name>')
+
+    plocal_cluster.add_argument(
+        '--image_pull_policy',
+        default=DEFAULT_IMAGEPULLPOLICY,
+        choices=IMAGEPULLPOLICY_LIST,
+        help='Image pull policy of containers.')
+
+    plocal_cluster.add_argument(
+        '--image_lock', help='Image lock file, pin images to the digests in its [images].')
+
+    plocal_cluster.add_argument(
+        '--need_tikv',
+        type=bool,
+        default=False,
+        help='Is need PD and TiKV for storage_tikv')
+
+    plocal_cluster.add_argument(
+        '--need_prepull',
+        type=bool,
+        default=False,
+        help='Is need DaemonSet to pre-pull images')
+
+    plocal_cluster.add_argument(
+        '--disable_sync',
+        type=bool,
+        default=False,
+        help='Is disable syncthing sidecar')
+
+    plocal_cluster.add_argument(
+        '--state_db_volume',
+        default=VOLUME_CLASS_DATADIR,
+        help='Volume of state db: datadir/emptydir/<pvc name>')
+
+    plocal_cluster.add_argument(
+        '--changed_only',
+        type=bool,
+        default=False,
+        help='Is output objects changed since last run to a -changed.yaml file')
 
     #
     # Subcommand: multi_cluster
@@ -132,8 +592,17 @@ def parse_arguments():
     pmulti_cluster.add_argument(
         '--block_delay_number',
         type=int,
-        default=0,
         help='The block delay number of chain.')
+
+    pmulti_cluster.add_argument(
+        '--block_interval',
+        type=int,
+        help='The block interval (seconds) of chain.')
+
+    pmulti_cluster.add_argument(
+        '--profile',
+        choices=list(PERF_PROFILES),
+        help='Performance profile of chain: low-latency/high-throughput/dev')
     
     pmulti_cluster.add_argument(
         '--chain_name', default='test-chain', help='The name of chain.')
@@ -163,6 +632,15 @@ def parse_arguments():
         '--authorities',
         help='Authorities (addresses) list.')
 
+    pmulti_cluster.add_argument(
+        '--inventory', help='Inventory file (toml/json) of nodes and their clusters, instead of the lists.')
+
+    pmulti_cluster.add_argument(
+        '--jobs',
+        type=int,
+        default=0,
+        help='Count of processes to render clusters, 0 is count of cpus.')
+
     pmulti_cluster.add_argument(
         '--nodes',
         help='Node network ip list.')
@@ -182,6 +660,9 @@ def parse_arguments():
         '--node_ports',
         help='The list of start port of Nodeport.')
 
+    pmulti_cluster.add_argument(
+        '--port_registry', help='Port registry file, allocate node_ports from it if node_ports is not set.')
+
     pmulti_cluster.add_argument(
         '--pvc_names', help='The list of persistentVolumeClaim names.')
 
@@ -211,126 +692,620 @@ def parse_arguments():
 
     pmulti_cluster.add_argument(
         '--log_level',
-        default="info",
-        help='log level: warn/info/debug/trace')
+        help='log level: warn/info/debug/trace, overrides log_level of services in service config')
 
-    args = parser.parse_args()
-    return args
+    pmulti_cluster.add_argument(
+        '--log_refresh_rate',
+        type=int,
+        help='Seconds between scans of log config for changes, 0 to disable.')
 
+    pmulti_cluster.add_argument(
+        '--log_roll_size', help='Size of log file to roll, e.g. 50mb.')
 
-# pod name is {chain_name}-{index}
-def get_node_pod_name(index, chain_name):
-    return '{}-{}'.format(chain_name, index)
+    pmulti_cluster.add_argument(
+        '--log_roll_count',
+        type=int,
+        help='Count of rolled log files to keep.')
 
+    pmulti_cluster.add_argument(
+        '--probe_type',
+        default='tcp',
+        choices=PROBE_TYPE_LIST,
+        help='Startup and readiness probes of services: tcp/grpc/none.')
 
-# generate peers info by pod name
-def gen_peers(count, chain_name):
-    peers = []
-    for i in range(count):
-        peer = {
-            'ip': get_node_pod_name(i, chain_name),
-            'port': 40000
-        }
-        peers.append(peer)
-    return peers
+    pmulti_cluster.add_argument(
+        '--startup_order',
+        default=STARTUP_ORDER_PARALLEL,
+        choices=[STARTUP_ORDER_PARALLEL, STARTUP_ORDER_NATIVE],
+        help='parallel: all containers start together; native: dependencies of controller start in order as native sidecars, needs k8s 1.29+ and probe_type tcp/grpc.')
 
+    pmulti_cluster.add_argument(
+        '--log_volume',
+        default=VOLUME_CLASS_DATADIR,
+        help='Volume of logs: datadir/emptydir/<pvc name>')
 
-def gen_net_config_list(peers, enable_tls):
-    net_config_list = []
-    for peer in peers:
-        peers_clone = copy.deepcopy(peers)
-        peers_clone.remove(peer)
-        net_config = {
-            'enable_tls': enable_tls,
-            'port': 40000,
-            'peers': peers_clone
-        }
-        net_config_list.append(net_config)
-    return net_config_list
+    pmulti_cluster.add_argument(
+        '--sync_volume',
+        default=VOLUME_CLASS_DATADIR,
+        help='Volume of syncthing folders: datadir/emptydir/<pvc name>')
 
+    pmulti_cluster.add_argument(
+        '--image_pull_policy',
+        default=DEFAULT_IMAGEPULLPOLICY,
+        choices=IMAGEPULLPOLICY_LIST,
+        help='Image pull policy of containers.')
 
-def need_directory(path):
-    """Create a directory if it is not existed."""
-    if not os.path.exists(path):
-        os.makedirs(path)
+    pmulti_cluster.add_argument(
+        '--image_lock', help='Image lock file, pin images to the digests in its [images].')
 
+    pmulti_cluster.add_argument(
+        '--need_prepull',
+        type=bool,
+        default=False,
+        help='Is need DaemonSet to pre-pull images')
 
-def gen_chainid(chain_name):
-    return '0x'+hashlib.sha256(chain_name.encode()).hexdigest()
+    pmulti_cluster.add_argument(
+        '--disable_sync',
+        type=bool,
+        default=False,
+        help='Is disable syncthing sidecar')
 
+    pmulti_cluster.add_argument(
+        '--state_db_volume',
+        default=VOLUME_CLASS_DATADIR,
+        help='Volume of state db: datadir/emptydir/<pvc name>')
 
-LOG_CONFIG_TEMPLATE = '''# Scan this file for changes every 30 seconds
-refresh_rate: 30 seconds
+    pmulti_cluster.add_argument(
+        '--changed_only',
+        type=bool,
+        default=False,
+        help='Is output objects changed since last run to a -changed.yaml file')
 
-appenders:
-  # An appender named \"stdout\" that writes to stdout
-  stdout:
-    kind: console
+    #
+    # Subcommand: plan
+    #
 
-  journey-service:
-    kind: rolling_file
-    path: \"logs/{0}-service.log\"
-    policy:
-      # Identifies which policy is to be used. If no kind is specified, it will
-      # default to \"compound\".
-      kind: compound
-      # The remainder of the configuration is passed along to the policy's
-      # deserializer, and will vary based on the kind of policy.
-      trigger:
-        kind: size
-        limit: 50mb
-      roller:
-        kind: fixed_window
-        base: 1
-        count: 5
-        pattern: \"logs/{0}-service.{{}}.gz\"
+    pplan = subparsers.add_parser(
+        SUBCMD_PLAN, help='Estimate resources of a chain in local cluster.')
 
-# Set the default logging level and attach the default appender to the root
-root:
-  level: {1}
-  appenders:
-    - {2}
-'''
+    pplan.add_argument(
+        '--chain_name', default='test-chain', help='The name of chain.')
 
+    pplan.add_argument(
+        '--service_config', default='./service-config.toml', help='Config file about service information.')
 
-def gen_log4rs_config(node_path, log_level, is_stdout):
-    if is_stdout:
-        appender = "stdout"
-    else:
-        appender = "journey-service"
-    for service_name in SERVICE_LIST:
-        path = os.path.join(node_path, '{}-log4rs.yaml'.format(service_name))
-        with open(path, 'wt') as stream:
-            stream.write(LOG_CONFIG_TEMPLATE.format(service_name, log_level, appender))
+    pplan.add_argument(
+        '--peers_count',
+        type=int,
+        default=2,
+        help='Count of peers.')
 
+    pplan.add_argument(
+        '--rpc_replicas',
+        type=int,
+        default=0,
+        help='Count of non-validator nodes which serve rpc.')
 
-CONSENSUS_CONFIG_TEMPLATE = '''network_port = 50000
-controller_port = 50004
-node_id = {}
-'''
+    pplan.add_argument(
+        '--block_delay_number',
+        type=int,
+        help='The block delay number of chain.')
 
+    pplan.add_argument(
+        '--block_interval',
+        type=int,
+        help='The block interval (seconds) of chain.')
 
-# generate consensus-config.toml
-def gen_consensus_config(node_path, i):
-    path = os.path.join(node_path, 'consensus-config.toml')
-    with open(path, 'wt') as stream:
-        stream.write(CONSENSUS_CONFIG_TEMPLATE.format(i))
+    pplan.add_argument(
+        '--profile',
+        choices=list(PERF_PROFILES),
+        help='Performance profile of chain: low-latency/high-throughput/dev')
 
+    pplan.add_argument(
+        '--need_monitor',
+        type=bool,
+        default=False,
+        help='Is need monitor')
 
-CONTROLLER_CONFIG_TEMPLATE = '''network_port = 50000
-consensus_port = 50001
-storage_port = 50003
-kms_port = 50005
-executor_port = 50002
-block_delay_number = {}
-'''
+    pplan.add_argument(
+        '--monitor_mode',
+        default=MONITOR_MODE_SIDECAR,
+        choices=[MONITOR_MODE_SIDECAR, MONITOR_MODE_SHARED],
+        help='sidecar: process and citacloud exporters in every node pod; shared: citacloud exporter in every node pod, one process exporter per host for all chains in monitor-process.yaml')
 
+    pplan.add_argument(
+        '--need_debug',
+        type=bool,
+        default=False,
+        help='Is need debug container')
 
-# generate controller-config.toml
-def gen_controller_config(node_path, block_delay_number):
-    path = os.path.join(node_path, 'controller-config.toml')
-    with open(path, 'wt') as stream:
-        stream.write(CONTROLLER_CONFIG_TEMPLATE.format(block_delay_number))
+    pplan.add_argument(
+        '--disable_sync',
+        type=bool,
+        default=False,
+        help='Is disable syncthing sidecar')
+
+    pplan.add_argument(
+        '--log_level',
+        help='log level: warn/info/debug/trace, overrides log_level of services in service config')
+
+    pplan.add_argument(
+        '--log_refresh_rate',
+        type=int,
+        help='Seconds between scans of log config for changes, 0 to disable.')
+
+    pplan.add_argument(
+        '--log_roll_size', help='Size of log file to roll, e.g. 50mb.')
+
+    pplan.add_argument(
+        '--log_roll_count',
+        type=int,
+        help='Count of rolled log files to keep.')
+
+    pplan.add_argument(
+        '--is_stdout',
+        type=bool,
+        default=False,
+        help='Is output to stdout')
+
+    pplan.add_argument(
+        '--state_db_user', default='citacloud', help='User of state db.')
+
+    pplan.add_argument(
+        '--state_db_password', default='citacloud', help='Password of state db.')
+
+    pplan.add_argument(
+        '--probe_type',
+        default='tcp',
+        choices=PROBE_TYPE_LIST,
+        help='Startup and readiness probes of services: tcp/grpc/none.')
+
+    pplan.add_argument(
+        '--startup_order',
+        default=STARTUP_ORDER_PARALLEL,
+        choices=[STARTUP_ORDER_PARALLEL, STARTUP_ORDER_NATIVE],
+        help='parallel: all containers start together; native: dependencies of controller start in order as native sidecars, needs k8s 1.29+ and probe_type tcp/grpc.')
+
+    pplan.add_argument(
+        '--log_volume',
+        default=VOLUME_CLASS_DATADIR,
+        help='Volume of logs: datadir/emptydir/<pvc name>, logs are out of the PV if not datadir')
+
+    pplan.add_argument(
+        '--sync_volume',
+        default=VOLUME_CLASS_DATADIR,
+        help='Volume of syncthing folders: datadir/emptydir/<pvc name>, synced copies are out of the PV if not datadir')
+
+    pplan.add_argument(
+        '--state_db_volume',
+        default=VOLUME_CLASS_DATADIR,
+        help='Volume of state db: datadir/emptydir/<pvc name>')
+
+    pplan.add_argument(
+        '--need_tikv',
+        type=bool,
+        default=False,
+        help='Is need PD and TiKV for storage_tikv')
+
+    pplan.add_argument(
+        '--need_prepull',
+        type=bool,
+        default=False,
+        help='Is need DaemonSet to pre-pull images')
+
+    pplan.add_argument(
+        '--bench',
+        type=bool,
+        default=False,
+        help='Is need Job to benchmark the chain')
+
+    pplan.add_argument(
+        '--bench_total',
+        type=int,
+        default=10000,
+        help='Count of transactions sent by bench.')
+
+    pplan.add_argument(
+        '--bench_concurrency',
+        type=int,
+        default=16,
+        help='Count of concurrent senders of bench.')
+
+    pplan.add_argument(
+        '--bench_rate',
+        type=float,
+        default=0,
+        help='Max transactions sent per second by bench, 0 is unlimited.')
+
+    pplan.add_argument(
+        '--bench_batch_size',
+        type=int,
+        default=1,
+        help='Count of transactions sent by one run of send command of bench.')
+
+    pplan.add_argument(
+        '--bench_image', help='Docker image of bench, must have python3, grpcio and cldi.')
+
+    pplan.add_argument(
+        '--bench_send_cmd', help='Command to send a transaction, see bench.py.')
+
+    pplan.add_argument(
+        '--bench_receipt_cmd', help='Command to get receipt, see bench.py.')
+
+    pplan.add_argument(
+        '--pvc_per_node',
+        type=bool,
+        default=False,
+        help='Is every node has its own PV, e.g. node_local_pvc, otherwise all nodes share one PV')
+
+    pplan.add_argument(
+        '--pv_capacity', default=DEFAULT_PV_CAPACITY, help='Capacity of a PV.')
+
+    pplan.add_argument(
+        '--tx_size',
+        type=int,
+        default=512,
+        help='Assumed average size (bytes) of a transaction.')
+
+    pplan.add_argument(
+        '--tx_rate',
+        type=float,
+        default=100,
+        help='Assumed transactions per second.')
+
+    pplan.add_argument(
+        '--days',
+        type=int,
+        default=30,
+        help='Days of data the PV should hold.')
+
+    pplan.add_argument(
+        '--cluster_nodes',
+        type=int,
+        default=1,
+        help='Count of k8s nodes, for DaemonSets.')
+
+    pplan.add_argument(
+        '--cluster_cpu', help='Allocatable cpu of the cluster, e.g. 64.')
+
+    pplan.add_argument(
+        '--cluster_memory', help='Allocatable memory of the cluster, e.g. 256Gi.')
+
+    pplan.add_argument(
+        '--node_port_range',
+        default=DEFAULT_NODE_PORT_RANGE,
+        help='NodePort range of the cluster.')
+
+    #
+    # Subcommand: apply
+    #
+
+    papply = subparsers.add_parser(
+        SUBCMD_APPLY, help='Apply yaml files to k8s with server-side apply.')
+
+    papply.add_argument(
+        'files', nargs='*', help='Yaml files generated by local_cluster/multi_cluster.')
+
+    papply.add_argument(
+        '--index', help='Index file of multi_cluster, apply files of each cluster to the context of the same name.')
+
+    papply.add_argument(
+        '--kubeconfig', help='Kubeconfig file, default is $KUBECONFIG or ~/.kube/config.')
+
+    papply.add_argument(
+        '--context', help='Context of kubeconfig for all files, default is current-context.')
+
+    papply.add_argument(
+        '--contexts', help='Context list of kubeconfig, one for each file.')
+
+    papply.add_argument(
+        '--server', help='Address of api server, e.g. http://127.0.0.1:8080, overrides kubeconfig.')
+
+    papply.add_argument(
+        '--namespace', help='Namespace of objects, default is the namespace of context or default.')
+
+    papply.add_argument(
+        '--concurrency',
+        type=int,
+        default=8,
+        help='Max concurrent requests to one cluster.')
+
+    papply.add_argument(
+        '--field_manager', default=DEFAULT_FIELD_MANAGER, help='Field manager of server-side apply.')
+
+    papply.add_argument(
+        '--force_conflicts',
+        type=bool,
+        default=False,
+        help='Is force to take ownership of conflicting fields')
+
+    papply.add_argument(
+        '--wave_size',
+        type=int,
+        default=0,
+        help='Count of node deployments updated in a wave, the next wave waits for them ready, 0 to apply all at once.')
+
+    papply.add_argument(
+        '--wave_timeout',
+        type=int,
+        default=600,
+        help='Seconds to wait for a wave ready.')
+
+    papply.add_argument(
+        '--timeout',
+        type=float,
+        default=30,
+        help='Seconds of timeout of a request.')
+
+    #
+    # Subcommand: watch
+    #
+
+    pwatch = subparsers.add_parser(
+        SUBCMD_WATCH, help='Watch rollout of a chain and measure time to ready of nodes.')
+
+    pwatch.add_argument(
+        '--work_dir', default='.', help='The output director of the json report.')
+
+    pwatch.add_argument(
+        '--chain_name', default='test-chain', help='The name of chain.')
+
+    pwatch.add_argument(
+        '--peers_count',
+        type=int,
+        default=2,
+        help='Count of peers.')
+
+    pwatch.add_argument(
+        '--rpc_replicas',
+        type=int,
+        default=0,
+        help='Count of non-validator nodes which serve rpc.')
+
+    pwatch.add_argument(
+        '--kubeconfig', help='Kubeconfig file, default is $KUBECONFIG or ~/.kube/config.')
+
+    pwatch.add_argument(
+        '--context', help='Context of kubeconfig, default is current-context.')
+
+    pwatch.add_argument(
+        '--server', help='Address of api server, e.g. http://127.0.0.1:8080, overrides kubeconfig.')
+
+    pwatch.add_argument(
+        '--namespace', help='Namespace of the chain, default is the namespace of context or default.')
+
+    pwatch.add_argument(
+        '--timeout',
+        type=int,
+        default=600,
+        help='Seconds to wait for all nodes ready.')
+
+    #
+    # Subcommand: probe
+    #
+
+    pprobe = subparsers.add_parser(
+        SUBCMD_PROBE, help='Probe block height and rpc latency of all nodes.')
+
+    pprobe.add_argument(
+        '--work_dir', default='.', help='The output director of node config files.')
+
+    pprobe.add_argument(
+        '--chain_name', default='test-chain', help='The name of chain.')
+
+    pprobe.add_argument(
+        '--targets', help='Address list of controllers, host:port, instead of the generated layout.')
+
+    pprobe.add_argument(
+        '--nodes', help='Node list of multi cluster, ip of nodes, when the ip can not be found in the index or network config, e.g. a single node.')
+
+    pprobe.add_argument(
+        '--interval',
+        type=float,
+        default=0,
+        help='Seconds between two samples, 0 to sample once.')
+
+    pprobe.add_argument(
+        '--count',
+        type=int,
+        default=0,
+        help='Count of samples when interval is set, 0 to sample until interrupted.')
+
+    pprobe.add_argument(
+        '--timeout',
+        type=float,
+        default=3,
+        help='Seconds of timeout of a rpc.')
+
+    #
+    # Subcommand: ports
+    #
+
+    pports = subparsers.add_parser(
+        SUBCMD_PORTS, help='Manage the port registry.')
+
+    pports.add_argument(
+        'action', choices=PORTS_ACTION_LIST, help='list: show allocated blocks; free: release ports of a chain; stat: show usage of the range')
+
+    pports.add_argument(
+        '--port_registry', default='./port-registry.toml', help='Port registry file.')
+
+    pports.add_argument(
+        '--chain_name', help='The name of chain.')
+
+    pports.add_argument(
+        '--node_port_range',
+        default=DEFAULT_NODE_PORT_RANGE,
+        help='NodePort range of the cluster, used when the registry is created.')
+
+    args = parser.parse_args()
+    return args
+
+
+# pod name is {chain_name}-{index}
+def get_node_pod_name(index, chain_name):
+    return '{}-{}'.format(chain_name, index)
+
+
+# generate peers info by pod name
+def gen_peers(count, chain_name):
+    peers = []
+    for i in range(count):
+        peer = {
+            'ip': get_node_pod_name(i, chain_name),
+            'port': 40000
+        }
+        peers.append(peer)
+    return peers
+
+
+def gen_net_config_list(peers, enable_tls):
+    net_config_list = []
+    for peer in peers:
+        peers_clone = copy.deepcopy(peers)
+        peers_clone.remove(peer)
+        net_config = {
+            'enable_tls': enable_tls,
+            'port': 40000,
+            'peers': peers_clone
+        }
+        net_config_list.append(net_config)
+    return net_config_list
+
+
+def need_directory(path):
+    """Create a directory if it is not existed."""
+    if not os.path.exists(path):
+        os.makedirs(path)
+
+
+def gen_chainid(chain_name):
+    return '0x'+hashlib.sha256(chain_name.encode()).hexdigest()
+
+
+LOG_CONFIG_TEMPLATE = '''{refresh}appenders:
+  # An appender named \"stdout\" that writes to stdout
+  stdout:
+    kind: console
+
+  journey-service:
+    kind: rolling_file
+    path: \"logs/{service_name}-service.log\"
+    policy:
+      # Identifies which policy is to be used. If no kind is specified, it will
+      # default to \"compound\".
+      kind: compound
+      # The remainder of the configuration is passed along to the policy's
+      # deserializer, and will vary based on the kind of policy.
+      trigger:
+        kind: size
+        limit: {roll_size}
+      roller:
+        kind: fixed_window
+        base: 1
+        count: {roll_count}
+        pattern: \"logs/{service_name}-service.{{}}.gz\"
+
+# Set the default logging level and attach the default appender to the root
+root:
+  level: {log_level}
+  appenders:
+    - {appender}
+{loggers}'''
+
+LOG_REFRESH_TEMPLATE = '''# Scan this file for changes every {0} seconds
+refresh_rate: {0} seconds
+
+'''
+
+DEFAULT_LOG_CONFIG = {
+    'refresh_rate': 30,
+    'roll_size': '50mb',
+    'roll_count': 5,
+}
+
+
+# log config of chain: CLI > [log] of service-config.toml > default
+def gen_log_config(args, service_config):
+    log_config = copy.deepcopy(DEFAULT_LOG_CONFIG)
+    log_config.update(service_config.get('log', {}))
+    if args.log_refresh_rate is not None:
+        log_config['refresh_rate'] = args.log_refresh_rate
+    if args.log_roll_size is not None:
+        log_config['roll_size'] = args.log_roll_size
+    if args.log_roll_count is not None:
+        log_config['roll_count'] = args.log_roll_count
+    log_config['level'] = args.log_level
+    log_config['cli_level'] = getattr(args, 'cli_log_level', None)
+    log_config['is_stdout'] = args.is_stdout or log_config.get('target') == 'stdout'
+    return log_config
+
+
+# log_level and log_modules of each service can be set in [[services]], --log_level overrides log_level
+def gen_log4rs_config(node_path, log_config, service_config):
+    if log_config['is_stdout']:
+        appender = "stdout"
+    else:
+        appender = "journey-service"
+    if log_config['refresh_rate']:
+        refresh = LOG_REFRESH_TEMPLATE.format(log_config['refresh_rate'])
+    else:
+        refresh = ''
+    for service_name in SERVICE_LIST:
+        service = find_service(service_config, service_name) or {}
+        loggers = ''
+        if service.get('log_modules'):
+            loggers = '\nloggers:\n'
+            for module, level in service['log_modules'].items():
+                loggers += '  {}:\n    level: {}\n'.format(module, level)
+        path = os.path.join(node_path, '{}-log4rs.yaml'.format(service_name))
+        with open(path, 'wt') as stream:
+            stream.write(LOG_CONFIG_TEMPLATE.format(
+                refresh=refresh,
+                service_name=service_name,
+                roll_size=log_config['roll_size'],
+                roll_count=log_config['roll_count'],
+                log_level=log_config['cli_level'] or service.get('log_level', log_config['level']),
+                appender=appender,
+                loggers=loggers))
+
+
+CONSENSUS_CONFIG_TEMPLATE = '''network_port = 50000
+controller_port = 50004
+node_id = {}
+'''
+
+
+# extra config of service is set in config of [[services]]
+def write_service_config(path, config_str, service):
+    with open(path, 'wt') as stream:
+        if service and service.get('config'):
+            config = toml.loads(config_str)
+            config.update(service['config'])
+            toml.dump(config, stream)
+        else:
+            stream.write(config_str)
+
+
+# generate consensus-config.toml
+def gen_consensus_config(node_path, i, service=None):
+    path = os.path.join(node_path, 'consensus-config.toml')
+    write_service_config(path, CONSENSUS_CONFIG_TEMPLATE.format(i), service)
+
+
+CONTROLLER_CONFIG_TEMPLATE = '''network_port = 50000
+consensus_port = 50001
+storage_port = 50003
+kms_port = 50005
+executor_port = 50002
+block_delay_number = {}
+'''
+
+
+# generate controller-config.toml
+def gen_controller_config(node_path, block_delay_number, service=None):
+    path = os.path.join(node_path, 'controller-config.toml')
+    write_service_config(path, CONTROLLER_CONFIG_TEMPLATE.format(block_delay_number), service)
 
 
 GENESIS_TEMPLATE = '''timestamp = {}
@@ -375,24 +1350,16 @@ def gen_super_admin(work_dir, chain_name, kms_docker_image, kms_password):
     return super_admin
 
 
-def gen_authorities(work_dir, chain_name, kms_docker_image, kms_password, peers_count):
-    for i in range(peers_count):
-        path = os.path.join("{0}/cita-cloud/{1}/node{2}".format(work_dir, chain_name, i), 'key_file')
-        with open(path, 'wt') as stream:
-            stream.write(kms_password)
-    
-    authorities = []
-    for i in range(peers_count):
-        path = "{0}/cita-cloud/{1}/node{2}".format(work_dir, chain_name, i)
-        addr = gen_kms_account(path, kms_docker_image)
-        authorities.append(addr)
-    
-    # clean key_file for peers
-    for i in range(peers_count):
-        path = os.path.join("{0}/cita-cloud/{1}/node{2}".format(work_dir, chain_name, i), 'key_file')
-        os.remove(path)
-    
-    return authorities
+# key_file of kms password is removed even if kms fails
+def gen_authority(work_dir, chain_name, kms_docker_image, kms_password, i):
+    path = "{0}/cita-cloud/{1}/node{2}".format(work_dir, chain_name, i)
+    key_file = os.path.join(path, 'key_file')
+    with open(key_file, 'wt') as stream:
+        stream.write(kms_password)
+    try:
+        return gen_kms_account(path, kms_docker_image)
+    finally:
+        os.remove(key_file)
 
 
 INIT_SYSCONFIG_TEMPLATE = '''version = 0
@@ -403,9 +1370,9 @@ validators = [\"0x010928818c840630a60b4fda06848cac541599462f\"]
 '''
 
 
-def gen_init_sysconfig(work_dir, chain_name, super_admin, authorities, peers_count):
+def gen_init_sysconfig(work_dir, chain_name, super_admin, authorities, peers_count, block_interval):
     init_sys_config = toml.loads(INIT_SYSCONFIG_TEMPLATE)
-    init_sys_config['block_interval'] = DEFAULT_BLOCK_INTERVAL
+    init_sys_config['block_interval'] = block_interval
     init_sys_config['validators'] = authorities    
     init_sys_config['admin'] = super_admin
     init_sys_config['chain_id'] = gen_chainid(chain_name)
@@ -417,43 +1384,117 @@ def gen_init_sysconfig(work_dir, chain_name, super_admin, authorities, peers_cou
             toml.dump(init_sys_config, stream)
 
 
-# generate sync peers info by pod name
-def gen_sync_peers(work_dir, count, chain_name):
+# generate sync peer info by pod name
+def gen_sync_peer(work_dir, i, chain_name):
     mark_str = 'Device ID: '
     device_id_len = 63
-    peers = []
-    for i in range(count):
-        cmd = 'docker run --rm -e PUID=$(id -u $USER) -e PGID=$(id -g $USER) -v {0}:{0} {1} -generate="{0}/cita-cloud/{2}/node{3}/config"'.format(work_dir, SYNCTHING_DOCKER_IMAGE, chain_name, i)
-        syncthing_gen = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
-        output = str(syncthing_gen.stdout.read())
-        mark_index = output.index(mark_str)
-        device_id = output[mark_index + len(mark_str):mark_index + len(mark_str) + device_id_len]
-        print("device_id:", device_id)
-        peer = {
-            'ip': get_node_pod_name(i, chain_name),
-            'port': 22000,
-            'device_id': device_id
-        }
-        peers.append(peer)
-    return peers
+    cmd = 'docker run --rm -e PUID=$(id -u $USER) -e PGID=$(id -g $USER) -v {0}:{0} {1} -generate="{0}/cita-cloud/{2}/node{3}/config"'.format(work_dir, SYNCTHING_DOCKER_IMAGE, chain_name, i)
+    syncthing_gen = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    output = str(syncthing_gen.stdout.read())
+    mark_index = output.index(mark_str)
+    device_id = output[mark_index + len(mark_str):mark_index + len(mark_str) + device_id_len]
+    print("device_id:", device_id)
+    peer = {
+        'ip': get_node_pod_name(i, chain_name),
+        'port': 22000,
+        'device_id': device_id
+    }
+    return peer
+
 
+def gen_sync_tuning(service_config, i):
+    sync_config = service_config.get('sync', {})
+    tuning_keys = ['compression'] + list(SYNC_FOLDER_ATTRS) + list(SYNC_FOLDER_ELEMENTS) + list(SYNC_OPTION_ELEMENTS)
+    tuning = {
+        'compression': DEFAULT_SYNC_COMPRESSION,
+    }
+    node_config = sync_config.get('nodes', {}).get(str(i), {})
+    for config in [sync_config, node_config]:
+        for key in tuning_keys:
+            if key in config:
+                tuning[key] = config[key]
+    return tuning
+
+
+def is_sync_enabled(args, service_config):
+    return not args.disable_sync and service_config.get('sync', {}).get('enabled', True)
+
+
+# folders in [sync] of service-config.toml
+# type and ignore patterns of each folder are set in [sync.folder_options.<id>]
+def gen_sync_folders(service_config):
+    sync_config = service_config.get('sync', {})
+    folders = []
+    for folder_id in sync_config.get('folders', SYNC_FOLDERS):
+        folder_options = sync_config.get('folder_options', {}).get(folder_id, {})
+        folder_type = folder_options.get('type', 'sendreceive')
+        if folder_type not in SYNC_FOLDER_TYPES:
+            print('Invalid type of sync folder {}: {}'.format(folder_id, folder_type))
+            sys.exit(1)
+        folders.append({
+            'id': folder_id,
+            'type': folder_type,
+            'ignore': sync_config.get('ignore', []) + folder_options.get('ignore', []),
+        })
+    return folders
+
+
+# ignore rules of a folder, written into the folder in datadir and into config of syncthing
+# folders on other sync volume get the copy in config by init container sync-ignore
+def gen_sync_folder_ignore(work_dir, chain_name, i, folder):
+    node_dir = os.path.join(work_dir, 'cita-cloud/{}/node{}'.format(chain_name, i))
+    paths = [
+        os.path.join(node_dir, folder['id'], '.stignore'),
+        os.path.join(node_dir, 'config', SYNC_IGNORE_DIR, folder['id']),
+    ]
+    for path in paths:
+        if not folder['ignore']:
+            # no stale rules left from the last run
+            if os.path.exists(path):
+                os.remove(path)
+            continue
+        need_directory(os.path.dirname(path))
+        with open(path, 'wt') as stream:
+            for pattern in folder['ignore']:
+                stream.write(pattern + '\n')
 
-def gen_sync_configs(work_dir, sync_peers, chain_name):
+
+def gen_sync_configs(work_dir, sync_peers, chain_name, service_config):
+    folders = gen_sync_folders(service_config)
     for i in range(len(sync_peers)):
+        tuning = gen_sync_tuning(service_config, i)
         config_example = ET.parse(os.path.join(os.curdir, 'config.xml'))
         root = config_example.getroot()
+        # build folders from the first folder in config.xml
+        folder_template = root.find('folder')
+        for elem in root.findall('folder'):
+            root.remove(elem)
+        for index, folder in enumerate(folders):
+            elem = copy.deepcopy(folder_template)
+            elem.set('id', folder['id'])
+            elem.set('path', '/var/syncthing/{}'.format(folder['id']))
+            elem.set('type', folder['type'])
+            root.insert(index, elem)
+            gen_sync_folder_ignore(work_dir, chain_name, i, folder)
         # add device for all folder
         for elem in root.findall('folder'):
             for peer in sync_peers:
                 d = ET.SubElement(elem, 'device')
                 d.set('id', peer['device_id'])
                 d.set('introducedBy', '')
+            # folder tuning
+            for key, attr in SYNC_FOLDER_ATTRS.items():
+                if key in tuning:
+                    elem.set(attr, str(tuning[key]))
+            for key, tag in SYNC_FOLDER_ELEMENTS.items():
+                if key in tuning:
+                    elem.find(tag).text = str(tuning[key])
         # add all device
         for peer in sync_peers:
             d = ET.SubElement(root, 'device')
             d.set('id', peer['device_id'])
             d.set('name', peer['ip'])
-            d.set('compression', 'always')
+            d.set('compression', tuning['compression'])
             d.set('introducer', 'false')
             d.set('skipIntroductionRemovals', 'false')
             d.set('introducedBy', '')
@@ -469,6 +1510,11 @@ def gen_sync_configs(work_dir, sync_peers, chain_name):
             maxRecvKbps.text = '0'
             maxRequestKiB = ET.SubElement(d, 'maxRequestKiB')
             maxRequestKiB.text = '0'
+        # global rate limits
+        options = root.find('options')
+        for key, tag in SYNC_OPTION_ELEMENTS.items():
+            if key in tuning:
+                options.find(tag).text = str(tuning[key])
         # add gui/apikey
         gui = root.findall('gui')[0]
         apikey = ET.SubElement(gui, 'apikey')
@@ -498,7 +1544,8 @@ def gen_kms_secret(kms_password, secret_name):
     return secret
 
 
-def gen_grpc_service(chain_name, node_port):
+# route rpc to nodes of node_role only if it is set
+def gen_grpc_service(chain_name, node_port, node_role=None, is_session_affinity=False):
     grpc_service = {
         'apiVersion': 'v1',
         'kind': 'Service',
@@ -520,6 +1567,10 @@ def gen_grpc_service(chain_name, node_port):
             }
         }
     }
+    if node_role:
+        grpc_service['spec']['selector']['node_role'] = node_role
+    if is_session_affinity:
+        grpc_service['spec']['sessionAffinity'] = 'ClientIP'
     return grpc_service
 
 
@@ -543,7 +1594,7 @@ def gen_network_secret(chain_name, i):
     return netwok_secret
 
 
-def gen_network_service(i, chain_name):
+def gen_network_service(i, chain_name, is_need_sync=True, is_need_rpc=False):
     network_service = {
         'apiVersion': 'v1',
         'kind': 'Service',
@@ -573,14 +1624,29 @@ def gen_network_service(i, chain_name):
             }
         }
     }
+    if not is_need_sync:
+        network_service['spec']['ports'] = network_service['spec']['ports'][:1]
+    if is_need_rpc:
+        rpc_port = {
+            'port': 50004,
+            'targetPort': 50004,
+            'name': 'rpc',
+        }
+        network_service['spec']['ports'].append(rpc_port)
     return network_service
 
-def gen_monitor_service(i, chain_name, node_port):
+# in shared mode process exporter is not in node pod, only exporter is exposed
+def gen_monitor_service(i, chain_name, node_port, is_shared_monitor=False):
     monitor_service = {
         'apiVersion': 'v1',
         'kind': 'Service',
         'metadata': {
-            'name': 'monitor-{}-{}'.format(chain_name, i)
+            'name': 'monitor-{}-{}'.format(chain_name, i),
+            'labels': {
+                'chain_name': chain_name,
+                'node_name': get_node_pod_name(i, chain_name),
+                'component': 'monitor',
+            }
         },
         'spec': {
             'type': 'NodePort',
@@ -603,11 +1669,482 @@ def gen_monitor_service(i, chain_name, node_port):
             }
         }
     }
+    if is_shared_monitor:
+        monitor_service['spec']['ports'] = monitor_service['spec']['ports'][1:]
     return monitor_service
 
-def gen_executor_service(i, chain_name, node_port, is_chaincode_executor):
-    executor_service = {
-        'apiVersion': 'v1',
+# process exporter on every host, it sees processes of all pods by hostPID
+# so it is shared by all chains and has no chain_name
+def gen_monitor_process_daemonset():
+    monitor_process_daemonset = {
+        'apiVersion': 'apps/v1',
+        'kind': 'DaemonSet',
+        'metadata': {
+            'name': MONITOR_PROCESS_NAME,
+            'labels': {
+                'component': MONITOR_PROCESS_NAME,
+            }
+        },
+        'spec': {
+            'selector': {
+                'matchLabels': {
+                    'component': MONITOR_PROCESS_NAME,
+                }
+            },
+            'template': {
+                'metadata': {
+                    'labels': {
+                        'component': MONITOR_PROCESS_NAME,
+                    }
+                },
+                'spec': {
+                    'hostPID': True,
+                    'containers': [
+                        {
+                            'image': MONITOR_PROCESS_DOCKER_IMAGE,
+                            'imagePullPolicy': DEFAULT_IMAGEPULLPOLICY,
+                            'name': 'monitor-process',
+                            'ports': [
+                                {
+                                    'containerPort': 9256,
+                                    'protocol': 'TCP',
+                                    'name': 'process',
+                                }
+                            ],
+                            'args': [
+                                '--procfs',
+                                '/proc',
+                                '--config.path',
+                                '/config/process_list.yml'
+                            ],
+                        }
+                    ],
+                }
+            }
+        }
+    }
+    return monitor_process_daemonset
+
+
+# headless, every exporter pod is a target of its own
+def gen_monitor_process_service():
+    monitor_process_service = {
+        'apiVersion': 'v1',
+        'kind': 'Service',
+        'metadata': {
+            'name': MONITOR_PROCESS_NAME,
+            'labels': {
+                'component': MONITOR_PROCESS_NAME,
+            }
+        },
+        'spec': {
+            'clusterIP': 'None',
+            'ports': [
+                {
+                    'port': 9256,
+                    'targetPort': 9256,
+                    'name': 'process',
+                },
+            ],
+            'selector': {
+                'component': MONITOR_PROCESS_NAME,
+            }
+        }
+    }
+    return monitor_process_service
+
+
+def gen_monitor_rules(chain_name):
+    height = MONITOR_METRIC_BLOCK_HEIGHT
+    txs = MONITOR_METRIC_BLOCK_TXS
+    rules = [
+        {
+            'record': 'citacloud:block_height:max',
+            'expr': 'max by (chain_name) ({})'.format(height),
+        },
+        {
+            'record': 'citacloud:block_height:lag',
+            'expr': 'max by (chain_name) ({0}) - on (chain_name) group_right {0}'.format(height),
+        },
+        {
+            'record': 'citacloud:block_interval_seconds',
+            'expr': '1 / max by (chain_name) (rate({}[5m]))'.format(height),
+        },
+        {
+            'record': 'citacloud:tps',
+            'expr': 'max by (chain_name) (avg_over_time({}[5m]) * rate({}[5m]))'.format(txs, height),
+        },
+    ]
+    return [
+        {
+            'name': 'citacloud-{}'.format(chain_name),
+            'rules': rules,
+        }
+    ]
+
+
+def gen_dashboard_panel(index, title, expr, legend):
+    return {
+        'id': index + 1,
+        'type': 'timeseries',
+        'title': title,
+        'datasource': {
+            'type': 'prometheus',
+            'uid': '${datasource}',
+        },
+        'gridPos': {
+            'h': 8,
+            'w': 12,
+            'x': 12 * (index % 2),
+            'y': 8 * (index // 2),
+        },
+        'targets': [
+            {
+                'expr': expr,
+                'legendFormat': legend,
+                'refId': 'A',
+            }
+        ],
+    }
+
+
+def gen_dashboard(chain_name):
+    selector = '{{chain_name="{}"}}'.format(chain_name)
+    panels = [
+        gen_dashboard_panel(0, 'Block height', MONITOR_METRIC_BLOCK_HEIGHT + selector, '{{node_name}}'),
+        gen_dashboard_panel(1, 'Block interval (s)', 'citacloud:block_interval_seconds' + selector, '{{chain_name}}'),
+        gen_dashboard_panel(2, 'TPS', 'citacloud:tps' + selector, '{{chain_name}}'),
+        gen_dashboard_panel(3, 'Height lag', 'citacloud:block_height:lag' + selector, '{{node_name}}'),
+    ]
+    dashboard = {
+        'title': 'CITA-Cloud {}'.format(chain_name),
+        'uid': 'citacloud-{}'.format(chain_name)[:40],
+        'schemaVersion': 36,
+        'refresh': '30s',
+        'time': {
+            'from': 'now-1h',
+            'to': 'now',
+        },
+        # datasource is picked in grafana, dashboards provisioned from ConfigMap have no __inputs
+        'templating': {
+            'list': [
+                {
+                    'name': 'datasource',
+                    'label': 'Prometheus',
+                    'type': 'datasource',
+                    'query': 'prometheus',
+                },
+            ],
+        },
+        'panels': panels,
+    }
+    return dashboard
+
+
+# process exporter of shared mode is scraped by gen_process_service_monitor
+def gen_service_monitor(chain_name, is_shared_monitor):
+    endpoints = [
+        {
+            'port': 'exporter',
+        },
+    ]
+    if not is_shared_monitor:
+        endpoints.insert(0, {
+            'port': 'process',
+        })
+    service_monitor = {
+        'apiVersion': 'monitoring.coreos.com/v1',
+        'kind': 'ServiceMonitor',
+        'metadata': {
+            'name': 'monitor-{}'.format(chain_name),
+            'labels': {
+                'chain_name': chain_name,
+            }
+        },
+        'spec': {
+            'selector': {
+                'matchLabels': {
+                    'chain_name': chain_name,
+                    'component': 'monitor',
+                }
+            },
+            'targetLabels': [
+                'chain_name',
+                'node_name',
+            ],
+            'endpoints': endpoints,
+        }
+    }
+    return service_monitor
+
+
+# every pod of process exporter, labeled with its host
+def gen_process_service_monitor():
+    service_monitor = {
+        'apiVersion': 'monitoring.coreos.com/v1',
+        'kind': 'ServiceMonitor',
+        'metadata': {
+            'name': MONITOR_PROCESS_NAME,
+            'labels': {
+                'component': MONITOR_PROCESS_NAME,
+            }
+        },
+        'spec': {
+            'selector': {
+                'matchLabels': {
+                    'component': MONITOR_PROCESS_NAME,
+                }
+            },
+            'endpoints': [
+                {
+                    'port': 'process',
+                    'relabelings': [
+                        {
+                            'sourceLabels': ['__meta_kubernetes_pod_node_name'],
+                            'targetLabel': 'host',
+                        }
+                    ],
+                }
+            ],
+        }
+    }
+    return service_monitor
+
+
+def gen_prometheus_rule(chain_name):
+    prometheus_rule = {
+        'apiVersion': 'monitoring.coreos.com/v1',
+        'kind': 'PrometheusRule',
+        'metadata': {
+            'name': 'monitor-{}'.format(chain_name),
+            'labels': {
+                'chain_name': chain_name,
+            }
+        },
+        'spec': {
+            'groups': gen_monitor_rules(chain_name),
+        }
+    }
+    return prometheus_rule
+
+
+# grafana sidecar loads dashboards from ConfigMaps with label grafana_dashboard
+def gen_dashboard_configmap(chain_name):
+    dashboard_configmap = {
+        'apiVersion': 'v1',
+        'kind': 'ConfigMap',
+        'metadata': {
+            'name': 'dashboard-{}'.format(chain_name),
+            'labels': {
+                'chain_name': chain_name,
+                'grafana_dashboard': '1',
+            }
+        },
+        'data': {
+            '{}.json'.format(chain_name): json.dumps(gen_dashboard(chain_name), indent=2),
+        }
+    }
+    return dashboard_configmap
+
+
+# targets: list of (address, node_name)
+# process exporters of shared mode are found by dns of the headless service, one target per host
+def gen_static_scrape_config(chain_name, targets):
+    static_configs = []
+    for address, node_name in targets:
+        labels = {
+            'chain_name': chain_name,
+        }
+        if node_name:
+            labels['node_name'] = node_name
+        static_configs.append({
+            'targets': [address],
+            'labels': labels,
+        })
+    scrape_configs = [
+        {
+            'job_name': 'citacloud-{}'.format(chain_name),
+            'static_configs': static_configs,
+        }
+    ]
+    return {
+        'scrape_configs': scrape_configs,
+    }
+
+
+# every pod of headless service monitor-process is a target
+def gen_process_scrape_config():
+    return {
+        'scrape_configs': [
+            {
+                'job_name': MONITOR_PROCESS_NAME,
+                'dns_sd_configs': [
+                    {
+                        'names': [MONITOR_PROCESS_NAME],
+                        'type': 'A',
+                        'port': 9256,
+                    }
+                ],
+            }
+        ],
+    }
+
+
+def write_monitor_config(work_dir, chain_name, monitor_config, is_shared_monitor, targets):
+    if monitor_config == MONITOR_CONFIG_OPERATOR:
+        k8s_config = [
+            gen_service_monitor(chain_name, is_shared_monitor),
+            gen_prometheus_rule(chain_name),
+            gen_dashboard_configmap(chain_name),
+        ]
+        yaml_ptah = os.path.join(work_dir, '{}-monitor.yaml'.format(chain_name))
+        print("yaml_ptah:{}", yaml_ptah)
+        with open(yaml_ptah, 'wt') as stream:
+            yaml.dump_all(k8s_config, stream, sort_keys=False)
+        return
+
+    path = os.path.join(work_dir, '{}-scrape.yml'.format(chain_name))
+    with open(path, 'wt') as stream:
+        yaml.dump(gen_static_scrape_config(chain_name, targets), stream, sort_keys=False)
+    path = os.path.join(work_dir, '{}-rules.yml'.format(chain_name))
+    with open(path, 'wt') as stream:
+        yaml.dump({'groups': gen_monitor_rules(chain_name)}, stream, sort_keys=False)
+    path = os.path.join(work_dir, '{}-dashboard.json'.format(chain_name))
+    with open(path, 'wt') as stream:
+        json.dump(gen_dashboard(chain_name), stream, indent=2)
+
+
+# process exporter is shared by all chains of the namespace, its files are not of any chain
+# deleting the yaml of a chain keeps it, applying another chain does not change it
+def write_monitor_process_config(work_dir, monitor_config, image_pull_policy, image_lock):
+    k8s_config = [
+        gen_monitor_process_daemonset(),
+        gen_monitor_process_service(),
+    ]
+    if monitor_config == MONITOR_CONFIG_OPERATOR:
+        k8s_config.append(gen_process_service_monitor())
+    else:
+        path = os.path.join(work_dir, '{}-scrape.yml'.format(MONITOR_PROCESS_NAME))
+        with open(path, 'wt') as stream:
+            yaml.dump(gen_process_scrape_config(), stream, sort_keys=False)
+    apply_image_policy(k8s_config, image_pull_policy, image_lock)
+    yaml_ptah = os.path.join(work_dir, '{}.yaml'.format(MONITOR_PROCESS_NAME))
+    print("yaml_ptah:{}", yaml_ptah)
+    with open(yaml_ptah, 'wt') as stream:
+        yaml.dump_all(k8s_config, stream, sort_keys=False)
+    return gen_images(k8s_config)
+
+
+def gen_bench_label(chain_name, service_config):
+    consensus = find_docker_image(service_config, 'consensus').split('/')[-1]
+    storage = find_docker_image(service_config, 'storage').split('/')[-1]
+    return '{}-{}-{}'.format(chain_name, consensus, storage).replace(':', '-')
+
+
+# bench.py runs in a Job and writes report to cita-cloud/{chain_name}/bench on pvc
+def gen_bench_config(args, service_config, pvc_name):
+    with open(os.path.join(os.curdir, 'bench.py'), 'rt') as stream:
+        bench_script = stream.read()
+    bench_configmap = {
+        'apiVersion': 'v1',
+        'kind': 'ConfigMap',
+        'metadata': {
+            'name': 'bench-{}'.format(args.chain_name),
+            'labels': {
+                'chain_name': args.chain_name,
+            }
+        },
+        'data': {
+            'bench.py': bench_script,
+        }
+    }
+    bench_args = [
+        'python3',
+        '/bench/bench.py',
+        '--rpc',
+        '{}-node-port:50004'.format(args.chain_name),
+        '--executor',
+        'executor-{}:50002'.format(get_node_pod_name(0, args.chain_name)),
+        '--total',
+        str(args.bench_total),
+        '--concurrency',
+        str(args.bench_concurrency),
+        '--rate',
+        str(args.bench_rate),
+        '--report_dir',
+        '/report',
+        '--label',
+        gen_bench_label(args.chain_name, service_config),
+    ]
+    if args.bench_batch_size > 1:
+        bench_args += ['--batch_size', str(args.bench_batch_size)]
+    if args.bench_send_cmd:
+        bench_args += ['--send_cmd', args.bench_send_cmd]
+    if args.bench_receipt_cmd:
+        bench_args += ['--receipt_cmd', args.bench_receipt_cmd]
+    bench_job = {
+        'apiVersion': 'batch/v1',
+        'kind': 'Job',
+        'metadata': {
+            'name': 'bench-{}'.format(args.chain_name),
+            'labels': {
+                'chain_name': args.chain_name,
+            }
+        },
+        'spec': {
+            'backoffLimit': 0,
+            'template': {
+                'metadata': {
+                    'labels': {
+                        'bench': args.chain_name,
+                    }
+                },
+                'spec': {
+                    'restartPolicy': 'Never',
+                    'containers': [
+                        {
+                            'image': args.bench_image,
+                            'imagePullPolicy': DEFAULT_IMAGEPULLPOLICY,
+                            'name': 'bench',
+                            'command': bench_args,
+                            'volumeMounts': [
+                                {
+                                    'name': 'bench-script',
+                                    'mountPath': '/bench',
+                                    'readOnly': True,
+                                },
+                                {
+                                    'name': 'datadir',
+                                    'subPath': 'cita-cloud/{}/bench'.format(args.chain_name),
+                                    'mountPath': '/report',
+                                },
+                            ],
+                        }
+                    ],
+                    'volumes': [
+                        {
+                            'name': 'bench-script',
+                            'configMap': {
+                                'name': 'bench-{}'.format(args.chain_name),
+                            }
+                        },
+                        {
+                            'name': 'datadir',
+                            'persistentVolumeClaim': {
+                                'claimName': pvc_name,
+                            }
+                        },
+                    ],
+                }
+            }
+        }
+    }
+    return [bench_configmap, bench_job]
+
+
+def gen_executor_service(i, chain_name, node_port, is_chaincode_executor):
+    executor_service = {
+        'apiVersion': 'v1',
         'kind': 'Service',
         'metadata': {
             'name': 'executor-{}-{}'.format(chain_name, i)
@@ -627,25 +2164,407 @@ def gen_executor_service(i, chain_name, node_port, is_chaincode_executor):
             }
         }
     }
-    if is_chaincode_executor:
-        chaincode_port = {
-            'port': 7052,
-            'targetPort': 7052,
-            'nodePort': node_port + 1 + 5 * i + 2,
-            'name': 'chaincode',
+    if is_chaincode_executor:
+        chaincode_port = {
+            'port': 7052,
+            'targetPort': 7052,
+            'nodePort': node_port + 1 + 5 * i + 2,
+            'name': 'chaincode',
+        }
+        eventhub_port = {
+            'port': 7053,
+            'targetPort': 7053,
+            'nodePort': node_port + 1 + 5 * i + 3,
+            'name': 'eventhub',
+        }
+        executor_service['spec']['ports'].append(chaincode_port)
+        executor_service['spec']['ports'].append(eventhub_port)
+    return executor_service
+
+
+# faults tolerated by consensus: raft needs a majority, bft needs more than 2/3
+def gen_tolerated_faults(peers_count, is_raft):
+    if is_raft:
+        return (peers_count - 1) // 2
+    return (peers_count - 1) // 3
+
+
+# keep quorum of validators during voluntary disruptions, e.g. node drain
+def gen_validator_pdb(chain_name, validators_count, tolerated_faults):
+    pdb = {
+        'apiVersion': 'policy/v1',
+        'kind': 'PodDisruptionBudget',
+        'metadata': {
+            'name': 'pdb-{}'.format(chain_name),
+        },
+        'spec': {
+            'minAvailable': validators_count - tolerated_faults,
+            'selector': {
+                'matchLabels': {
+                    'chain_name': chain_name,
+                    'node_role': NODE_ROLE_VALIDATOR,
+                }
+            },
+        },
+    }
+    return pdb
+
+
+# state db
+def is_state_db_needed(service_config):
+    return "chaincode_ext" in find_docker_image(service_config, "executor")
+
+
+def gen_state_db_config(service_config):
+    state_db_config = copy.deepcopy(DEFAULT_STATE_DB_CONFIG)
+    state_db_config.update(service_config.get('state_db', {}))
+    return state_db_config
+
+
+def gen_state_db_configmap_name(chain_name):
+    return 'state-db-{}'.format(chain_name)
+
+
+# ini sections: shortcuts first, [state_db.ini.<section>] of service-config.toml override them
+def gen_state_db_ini(state_db_config):
+    sections = {
+        'couchdb': {
+            'max_dbs_open': state_db_config['max_dbs_open'],
+        },
+    }
+    for channel in ['smoosh.ratio_dbs', 'smoosh.ratio_views']:
+        sections[channel] = {'min_priority': state_db_config['compaction_min_priority']}
+        # compact only in a time window, e.g. 00:00 - 06:00
+        if 'compaction_from' in state_db_config:
+            sections[channel]['from'] = state_db_config['compaction_from']
+            sections[channel]['to'] = state_db_config['compaction_to']
+    for section, options in state_db_config.get('ini', {}).items():
+        sections.setdefault(section, {}).update(options)
+    lines = []
+    for section, options in sections.items():
+        lines.append('[{}]'.format(section))
+        lines.extend('{} = {}'.format(key, value) for key, value in options.items())
+        lines.append('')
+    return '\n'.join(lines)
+
+
+# create databases and indexes after couchdb is up, existing ones are kept
+def gen_state_db_init(state_db_config):
+    curl = 'curl -s -u "$COUCHDB_USER:$COUCHDB_PASSWORD"'
+    lines = [
+        '#!/bin/sh',
+        'until {} -f {}/_up > /dev/null; do sleep 1; done'.format(curl, STATE_DB_URL),
+    ]
+    for database in state_db_config['databases']:
+        lines.append('{} -X PUT {}/{}'.format(curl, STATE_DB_URL, database))
+    # [state_db.indexes.<name>] database = "", fields = []
+    for name, index in state_db_config.get('indexes', {}).items():
+        body = {
+            'index': {
+                'fields': index['fields'],
+            },
+            'ddoc': 'index-{}'.format(name),
+            'name': name,
+            'type': 'json',
+        }
+        lines.append("{} -X POST -H 'Content-Type: application/json' {}/{}/_index -d '{}'".format(curl, STATE_DB_URL, index['database'], json.dumps(body)))
+    lines.append('')
+    return '\n'.join(lines)
+
+
+def gen_state_db_configmap(chain_name, service_config):
+    state_db_config = gen_state_db_config(service_config)
+    configmap = {
+        'apiVersion': 'v1',
+        'kind': 'ConfigMap',
+        'metadata': {
+            'name': gen_state_db_configmap_name(chain_name),
+        },
+        'data': {
+            'citacloud.ini': gen_state_db_ini(state_db_config),
+            'init.sh': gen_state_db_init(state_db_config),
+        },
+    }
+    return configmap
+
+
+# tikv
+def gen_tikv_config(service_config, peers_count):
+    tikv_config = copy.deepcopy(DEFAULT_TIKV_CONFIG)
+    # a store near every validator, pd needs a majority so it is 1 or 3
+    tikv_config['tikv_replicas'] = max(1, peers_count)
+    tikv_config['pd_replicas'] = 3 if peers_count >= 3 else 1
+    tikv_config.update(service_config.get('tikv', {}))
+    return tikv_config
+
+
+def gen_pd_endpoints(chain_name):
+    return 'pd-{}:2379'.format(chain_name)
+
+
+# storage connects to pd of the chain
+# key prefix of each node is added to storage cmd in gen_node_deployment
+def wire_tikv_storage(service_config, chain_name):
+    storage = find_service(service_config, 'storage')
+    tikv_config = gen_tikv_config(service_config, 0)
+    pd_endpoints_arg = tikv_config.get('pd_endpoints_arg')
+    if pd_endpoints_arg and pd_endpoints_arg not in storage['cmd']:
+        storage['cmd'] = '{} {} {}'.format(storage['cmd'], pd_endpoints_arg, gen_pd_endpoints(chain_name))
+    keyspace_arg = tikv_config.get('keyspace_arg')
+    if keyspace_arg and keyspace_arg not in storage['cmd']:
+        storage['tikv_keyspace_arg'] = keyspace_arg
+    if not pd_endpoints_arg:
+        print('pd_endpoints_arg is not set in [tikv], storage cmd must connect to', gen_pd_endpoints(chain_name))
+    if not keyspace_arg:
+        print('keyspace_arg is not set in [tikv], storage of all nodes share the keys of tikv')
+
+
+# peer service is headless, for pods of statefulset to find each other
+def gen_tikv_service(chain_name, component, port, is_peer):
+    name = '{}-{}'.format(component, chain_name)
+    if is_peer:
+        name += '-peer'
+    service = {
+        'apiVersion': 'v1',
+        'kind': 'Service',
+        'metadata': {
+            'name': name,
+        },
+        'spec': {
+            'ports': [
+                {
+                    'port': port,
+                    'targetPort': port,
+                    'name': component,
+                }
+            ],
+            'selector': {
+                'tikv_cluster': chain_name,
+                'component': component,
+            }
+        }
+    }
+    if is_peer:
+        service['spec']['clusterIP'] = 'None'
+        # peers find each other before they are ready
+        service['spec']['publishNotReadyAddresses'] = True
+    return service
+
+
+# statefulset of pd or tikv, near validators of the chain and away from each other
+def gen_tikv_statefulset(chain_name, component, image, replicas, command, data_size, storage_class, resources):
+    name = '{}-{}'.format(component, chain_name)
+    labels = {
+        'tikv_cluster': chain_name,
+        'component': component,
+    }
+    volume_claim = {
+        'metadata': {
+            'name': 'data',
+        },
+        'spec': {
+            'accessModes': ['ReadWriteOnce'],
+            'resources': {
+                'requests': {
+                    'storage': data_size,
+                }
+            },
+        }
+    }
+    if storage_class:
+        volume_claim['spec']['storageClassName'] = storage_class
+    container = {
+        'image': image,
+        'imagePullPolicy': DEFAULT_IMAGEPULLPOLICY,
+        'name': component,
+        'command': command,
+        'env': [
+            {
+                'name': 'POD_NAME',
+                'valueFrom': {
+                    'fieldRef': {
+                        'fieldPath': 'metadata.name',
+                    }
+                }
+            },
+        ],
+        'volumeMounts': [
+            {
+                'name': 'data',
+                'mountPath': '/data',
+            },
+        ],
+    }
+    if resources:
+        container['resources'] = copy.deepcopy(resources)
+    statefulset = {
+        'apiVersion': 'apps/v1',
+        'kind': 'StatefulSet',
+        'metadata': {
+            'name': name,
+            'labels': labels,
+        },
+        'spec': {
+            'serviceName': '{}-peer'.format(name),
+            'replicas': replicas,
+            'podManagementPolicy': 'Parallel',
+            'selector': {
+                'matchLabels': labels,
+            },
+            'template': {
+                'metadata': {
+                    'labels': labels,
+                },
+                'spec': {
+                    'affinity': {
+                        'podAffinity': {
+                            'preferredDuringSchedulingIgnoredDuringExecution': [
+                                {
+                                    'weight': 100,
+                                    'podAffinityTerm': {
+                                        'labelSelector': {
+                                            'matchLabels': {
+                                                'chain_name': chain_name,
+                                                'node_role': NODE_ROLE_VALIDATOR,
+                                            }
+                                        },
+                                        'topologyKey': 'kubernetes.io/hostname',
+                                    }
+                                }
+                            ]
+                        },
+                        'podAntiAffinity': {
+                            'preferredDuringSchedulingIgnoredDuringExecution': [
+                                {
+                                    'weight': 100,
+                                    'podAffinityTerm': {
+                                        'labelSelector': {
+                                            'matchLabels': labels,
+                                        },
+                                        'topologyKey': 'kubernetes.io/hostname',
+                                    }
+                                }
+                            ]
+                        },
+                    },
+                    'containers': [container],
+                }
+            },
+            'volumeClaimTemplates': [volume_claim],
+        }
+    }
+    return statefulset
+
+
+def gen_tikv_config_objects(chain_name, service_config, peers_count):
+    tikv_config = gen_tikv_config(service_config, peers_count)
+    pd_name = 'pd-{}'.format(chain_name)
+    pd_peer = '{}-peer'.format(pd_name)
+    initial_cluster = ','.join('{0}-{1}=http://{0}-{1}.{2}:2380'.format(pd_name, i, pd_peer) for i in range(tikv_config['pd_replicas']))
+    pd_command = [
+        '/pd-server',
+        '--name=$(POD_NAME)',
+        '--data-dir=/data/pd',
+        '--client-urls=http://0.0.0.0:2379',
+        '--advertise-client-urls=http://$(POD_NAME).{}:2379'.format(pd_peer),
+        '--peer-urls=http://0.0.0.0:2380',
+        '--advertise-peer-urls=http://$(POD_NAME).{}:2380'.format(pd_peer),
+        '--initial-cluster={}'.format(initial_cluster),
+    ]
+    tikv_command = [
+        '/tikv-server',
+        '--addr=0.0.0.0:20160',
+        '--advertise-addr=$(POD_NAME).tikv-{}-peer:20160'.format(chain_name),
+        '--data-dir=/data/tikv',
+        '--pd={}'.format(gen_pd_endpoints(chain_name)),
+    ]
+    return [
+        gen_tikv_service(chain_name, 'pd', 2379, False),
+        gen_tikv_service(chain_name, 'pd', 2380, True),
+        gen_tikv_service(chain_name, 'tikv', 20160, True),
+        gen_tikv_statefulset(chain_name, 'pd', PD_DOCKER_IMAGE, tikv_config['pd_replicas'], pd_command, tikv_config['pd_storage'], tikv_config.get('storage_class'), tikv_config.get('pd_resources')),
+        gen_tikv_statefulset(chain_name, 'tikv', TIKV_DOCKER_IMAGE, tikv_config['tikv_replicas'], tikv_command, tikv_config['tikv_storage'], tikv_config.get('storage_class'), tikv_config.get('tikv_resources')),
+    ]
+
+
+def gen_volume_classes(args):
+    return {
+        'log': args.log_volume,
+        'sync': args.sync_volume,
+        'state_db': args.state_db_volume,
+    }
+
+
+def gen_volume(name, volume_class):
+    if volume_class == VOLUME_CLASS_EMPTYDIR:
+        return {
+            'name': name,
+            'emptyDir': {},
         }
-        eventhub_port = {
-            'port': 7053,
-            'targetPort': 7053,
-            'nodePort': node_port + 1 + 5 * i + 3,
-            'name': 'eventhub',
+    return {
+        'name': name,
+        'persistentVolumeClaim': {
+            'claimName': volume_class,
         }
-        executor_service['spec']['ports'].append(chaincode_port)
-        executor_service['spec']['ports'].append(eventhub_port)
-    return executor_service
+    }
+
+
+# mount sub directory of node on a dedicated volume
+# emptyDir belongs to the pod, so there is no need of subPath
+def gen_volume_mount(name, volume_class, sub_path, mount_path):
+    volume_mount = {
+        'name': name,
+        'mountPath': mount_path,
+    }
+    if volume_class != VOLUME_CLASS_EMPTYDIR:
+        volume_mount['subPath'] = sub_path
+    return volume_mount
+
+
+# native sidecars wait for startupProbe of the previous one, without probes they are not ordered
+def verify_startup_config(args):
+    if args.startup_order == STARTUP_ORDER_NATIVE and args.probe_type == 'none':
+        print('startup_order native needs probe_type tcp or grpc')
+        sys.exit(1)
+
+
+# deployment of node i of local cluster, plan estimates the same deployments
+def gen_local_node_deployment(args, service_config, i, pvc_name, is_need_sync):
+    node_role = NODE_ROLE_VALIDATOR if i < args.peers_count else NODE_ROLE_RPC
+    is_shared_monitor = args.need_monitor and args.monitor_mode == MONITOR_MODE_SHARED
+    return gen_node_deployment(i, service_config, args.chain_name, pvc_name, args.state_db_user, args.state_db_password, args.need_monitor, gen_kms_secret_name(args.chain_name), args.need_debug, gen_volume_classes(args), is_need_sync, node_role, gen_startup_config(args), is_shared_monitor)
+
+
+def gen_startup_config(args):
+    return {
+        'probe_type': args.probe_type,
+        'startup_order': args.startup_order,
+    }
 
 
-def gen_node_deployment(i, service_config, chain_name, pvc_name, state_db_user, state_db_password, is_need_monitor, kms_secret_name, is_need_debug):
+def gen_service_probe(port, probe_type, probe_config):
+    probe = {}
+    if probe_type == 'grpc':
+        probe['grpc'] = {'port': port}
+    else:
+        probe['tcpSocket'] = {'port': port}
+    probe.update(probe_config)
+    return probe
+
+
+def gen_node_deployment(i, service_config, chain_name, pvc_name, state_db_user, state_db_password, is_need_monitor, kms_secret_name, is_need_debug, volume_classes=None, is_need_sync=True, node_role=NODE_ROLE_VALIDATOR, startup_config=None, is_shared_monitor=False):
+    if volume_classes is None:
+        volume_classes = {}
+    if startup_config is None:
+        startup_config = {}
+    probe_type = startup_config.get('probe_type', 'none')
+    startup_order = startup_config.get('startup_order', STARTUP_ORDER_PARALLEL)
+    log_volume = volume_classes.get('log', VOLUME_CLASS_DATADIR)
+    sync_volume = volume_classes.get('sync', VOLUME_CLASS_DATADIR)
+    state_db_volume = volume_classes.get('state_db', VOLUME_CLASS_DATADIR)
+    node_sub_path = 'cita-cloud/{}/node{}'.format(chain_name, i)
+    sync_folders = [folder['id'] for folder in gen_sync_folders(service_config)]
+
     containers = []
     if is_need_debug:
         debug_container = {
@@ -708,7 +2627,38 @@ def gen_node_deployment(i, service_config, chain_name, pvc_name, state_db_user,
             },
         ]
     }
-    containers.append(syncthing_container)
+    if sync_volume != VOLUME_CLASS_DATADIR:
+        # config of syncthing is still in datadir, only folders move to sync volume
+        syncthing_container['volumeMounts'] = [
+            {
+                'name': 'datadir',
+                'subPath': '{}/config'.format(node_sub_path),
+                'mountPath': '/var/syncthing/config',
+            }
+        ]
+        for folder in sync_folders:
+            syncthing_container['volumeMounts'].append(gen_volume_mount('sync', sync_volume, '{}/{}'.format(node_sub_path, folder), '/var/syncthing/{}'.format(folder)))
+    if is_need_sync:
+        containers.append(syncthing_container)
+    # copy .stignore from config to folders on sync volume before syncthing starts
+    pre_init_containers = []
+    if is_need_sync and sync_volume != VOLUME_CLASS_DATADIR:
+        copy_cmds = []
+        for folder in sync_folders:
+            src = '/var/syncthing/config/{}/{}'.format(SYNC_IGNORE_DIR, folder)
+            dst = '/var/syncthing/{}/.stignore'.format(folder)
+            copy_cmds.append('if [ -f {0} ]; then cp {0} {1}; else rm -f {1}; fi'.format(src, dst))
+        pre_init_containers.append({
+            'image': SYNCTHING_DOCKER_IMAGE,
+            'imagePullPolicy': DEFAULT_IMAGEPULLPOLICY,
+            'name': 'sync-ignore',
+            'command': [
+                'sh',
+                '-c',
+                '; '.join(copy_cmds),
+            ],
+            'volumeMounts': copy.deepcopy(syncthing_container['volumeMounts']),
+        })
     for service in service_config['services']:
         if service['name'] == 'network':
             network_container = {
@@ -818,7 +2768,7 @@ def gen_node_deployment(i, service_config, chain_name, pvc_name, state_db_user,
                 executor_container['ports'].append(eventhub_port)
                 if "chaincode_ext" in service['docker_image']:
                     state_db_container = {
-                        'image': "couchdb",
+                        'image': STATE_DB_DOCKER_IMAGE,
                         'imagePullPolicy': DEFAULT_IMAGEPULLPOLICY,
                         'name': "couchdb",
                         'ports': [
@@ -846,6 +2796,31 @@ def gen_node_deployment(i, service_config, chain_name, pvc_name, state_db_user,
                             },
                         ],
                     }
+                    if state_db_volume != VOLUME_CLASS_DATADIR:
+                        state_db_container['volumeMounts'] = [
+                            gen_volume_mount('state-data', state_db_volume, '{}/state-data'.format(node_sub_path), '/opt/couchdb/data'),
+                        ]
+                    # tuning and init of state db
+                    state_db_container['volumeMounts'].append({
+                        'name': 'state-db-config',
+                        'subPath': 'citacloud.ini',
+                        'mountPath': STATE_DB_INI_PATH,
+                    })
+                    state_db_container['volumeMounts'].append({
+                        'name': 'state-db-config',
+                        'subPath': 'init.sh',
+                        'mountPath': STATE_DB_INIT_PATH,
+                    })
+                    state_db_container['lifecycle'] = {
+                        'postStart': {
+                            'exec': {
+                                'command': ['sh', STATE_DB_INIT_PATH],
+                            },
+                        },
+                    }
+                    state_db_resources = gen_state_db_config(service_config).get('resources')
+                    if state_db_resources:
+                        state_db_container['resources'] = copy.deepcopy(state_db_resources)
                     containers.append(state_db_container)
                     # add --couchdb-username username --couchdb-password password
                     executor_ext_cmd = service['cmd'] + " --couchdb-username " + state_db_user + " --couchdb-password " + state_db_password
@@ -856,6 +2831,9 @@ def gen_node_deployment(i, service_config, chain_name, pvc_name, state_db_user,
                     ]
             containers.append(executor_container)
         elif service['name'] == 'storage':
+            storage_cmd = service['cmd']
+            if 'tikv_keyspace_arg' in service:
+                storage_cmd = '{} {} {}'.format(storage_cmd, service['tikv_keyspace_arg'], get_node_pod_name(i, chain_name))
             storage_container = {
                 'image': service['docker_image'],
                 'imagePullPolicy': DEFAULT_IMAGEPULLPOLICY,
@@ -870,7 +2848,7 @@ def gen_node_deployment(i, service_config, chain_name, pvc_name, state_db_user,
                 'command': [
                     'sh',
                     '-c',
-                    service['cmd'],
+                    storage_cmd,
                 ],
                 'workingDir': '/data',
                 'volumeMounts': [
@@ -947,7 +2925,7 @@ def gen_node_deployment(i, service_config, chain_name, pvc_name, state_db_user,
 
     if is_need_monitor:
         monitor_process_container = {
-            'image': 'citacloud/monitor-process-exporter:0.4.1',
+            'image': MONITOR_PROCESS_DOCKER_IMAGE,
             'imagePullPolicy': DEFAULT_IMAGEPULLPOLICY,
             'name': 'monitor-process',
             'ports': [
@@ -972,9 +2950,11 @@ def gen_node_deployment(i, service_config, chain_name, pvc_name, state_db_user,
                 },
             ],
         }
-        containers.append(monitor_process_container)
+        # process exporter of shared mode runs on host
+        if not is_shared_monitor:
+            containers.append(monitor_process_container)
         monitor_citacloud_container = {
-            'image': 'citacloud/monitor-citacloud-exporter:0.1.1',
+            'image': MONITOR_CITACLOUD_DOCKER_IMAGE,
             'imagePullPolicy': DEFAULT_IMAGEPULLPOLICY,
             'name': 'monitor-citacloud',
             'ports': [
@@ -1023,6 +3003,56 @@ def gen_node_deployment(i, service_config, chain_name, pvc_name, state_db_user,
             }
         },
     ]
+
+    # resources of services
+    for container in containers:
+        service = find_service(service_config, container['name'])
+        if service and service.get('resources'):
+            container['resources'] = copy.deepcopy(service['resources'])
+
+    # logs of services and debug container
+    if log_volume != VOLUME_CLASS_DATADIR:
+        volumes.append(gen_volume('logs', log_volume))
+        for container in containers:
+            if container['name'] in SERVICE_LIST or container['name'] == 'debug':
+                container['volumeMounts'].append(gen_volume_mount('logs', log_volume, '{}/logs'.format(node_sub_path), '/data/logs'))
+
+    # sync folders used by services
+    if is_need_sync and sync_volume != VOLUME_CLASS_DATADIR:
+        volumes.append(gen_volume('sync', sync_volume))
+        for container in containers:
+            if container['name'] in SYNC_FOLDER_SERVICES:
+                for folder in sync_folders:
+                    container['volumeMounts'].append(gen_volume_mount('sync', sync_volume, '{}/{}'.format(node_sub_path, folder), '/data/{}'.format(folder)))
+
+    # probes of services, pod is ready only when all of them are serving
+    if probe_type != 'none':
+        for container in containers:
+            port = SERVICE_PROBE_PORTS.get(container['name'])
+            if port:
+                # couchdb has no grpc
+                container_probe_type = 'tcp' if container['name'] == 'couchdb' else probe_type
+                container['startupProbe'] = gen_service_probe(port, container_probe_type, STARTUP_PROBE)
+                container['readinessProbe'] = gen_service_probe(port, container_probe_type, READINESS_PROBE)
+
+    # native sidecars start in order, the next one starts after startupProbe of the previous one succeeds
+    init_containers = []
+    if startup_order == STARTUP_ORDER_NATIVE:
+        for name in STARTUP_ORDER_SERVICES:
+            init_containers.extend(container for container in containers if container['name'] == name)
+        containers = [container for container in containers if container not in init_containers]
+        for container in init_containers:
+            container['restartPolicy'] = 'Always'
+
+    if any(container['name'] == 'couchdb' for container in init_containers + containers):
+        if state_db_volume != VOLUME_CLASS_DATADIR:
+            volumes.append(gen_volume('state-data', state_db_volume))
+        volumes.append({
+            'name': 'state-db-config',
+            'configMap': {
+                'name': gen_state_db_configmap_name(chain_name),
+            },
+        })
     deployment = {
         'apiVersion': 'apps/v1',
         'kind': 'Deployment',
@@ -1031,10 +3061,19 @@ def gen_node_deployment(i, service_config, chain_name, pvc_name, state_db_user,
             'labels': {
                 'node_name': get_node_pod_name(i, chain_name),
                 'chain_name': chain_name,
+                'node_role': node_role,
             }
         },
         'spec': {
             'replicas': 1,
+            # old pod stops before new pod starts, they never share the datadir
+            'strategy': {
+                'type': 'RollingUpdate',
+                'rollingUpdate': {
+                    'maxSurge': 0,
+                    'maxUnavailable': 1,
+                },
+            },
             'selector': {
                 'matchLabels': {
                     'node_name': get_node_pod_name(i, chain_name),
@@ -1045,6 +3084,7 @@ def gen_node_deployment(i, service_config, chain_name, pvc_name, state_db_user,
                     'labels': {
                         'node_name': get_node_pod_name(i, chain_name),
                         'chain_name': chain_name,
+                        'node_role': node_role,
                     }
                 },
                 'spec': {
@@ -1055,17 +3095,227 @@ def gen_node_deployment(i, service_config, chain_name, pvc_name, state_db_user,
             }
         }
     }
+    if pre_init_containers or init_containers:
+        deployment['spec']['template']['spec']['initContainers'] = pre_init_containers + init_containers
     return deployment
 
 
+def load_image_lock(image_lock):
+    if not image_lock:
+        return {}
+    return toml.load(image_lock).get('images', {})
+
+
+def pin_image(image, image_lock):
+    if '@' not in image and image in image_lock:
+        return '{}@{}'.format(image, image_lock[image])
+    return image
+
+
+def get_pod_spec(obj):
+    if obj['kind'] in ['Deployment', 'DaemonSet', 'StatefulSet', 'Job']:
+        return obj['spec']['template']['spec']
+
+
+def get_pod_containers(pod_spec):
+    return pod_spec.get('initContainers', []) + pod_spec['containers']
+
+
+# set image pull policy and pin image digests for all workloads
+def apply_image_policy(k8s_config, image_pull_policy, image_lock):
+    for obj in k8s_config:
+        pod_spec = get_pod_spec(obj)
+        if pod_spec is None:
+            continue
+        for container in get_pod_containers(pod_spec):
+            container['image'] = pin_image(container['image'], image_lock)
+            container['imagePullPolicy'] = image_pull_policy
+
+
+def gen_images(k8s_config):
+    images = []
+    for obj in k8s_config:
+        pod_spec = get_pod_spec(obj)
+        if pod_spec is None:
+            continue
+        for container in get_pod_containers(pod_spec):
+            if container['image'] not in images:
+                images.append(container['image'])
+    return images
+
+
+# pull images onto all nodes before chain rolls out
+# every image is pulled by an init container which runs a static true copied into emptyDir,
+# so images without sh (distroless, pause) also succeed
+def gen_prepull_tool_mount():
+    return {
+        'name': 'prepull-tool',
+        'mountPath': '/prepull',
+    }
+
+
+def gen_prepull_daemonset(chain_name, images, image_pull_policy):
+    init_containers = [
+        {
+            'image': PREPULL_TOOL_DOCKER_IMAGE,
+            'imagePullPolicy': 'IfNotPresent',
+            'name': 'prepull-tool',
+            'command': [
+                'cp',
+                '/bin/busybox',
+                '/prepull/true',
+            ],
+            'volumeMounts': [gen_prepull_tool_mount()],
+        }
+    ]
+    for index, image in enumerate(images):
+        init_container = {
+            'image': image,
+            'imagePullPolicy': image_pull_policy,
+            'name': 'prepull-{}'.format(index),
+            'command': [
+                '/prepull/true',
+            ],
+            'volumeMounts': [gen_prepull_tool_mount()],
+        }
+        init_containers.append(init_container)
+    prepull_daemonset = {
+        'apiVersion': 'apps/v1',
+        'kind': 'DaemonSet',
+        'metadata': {
+            'name': 'prepull-{}'.format(chain_name),
+            'labels': {
+                'chain_name': chain_name,
+            }
+        },
+        'spec': {
+            'selector': {
+                'matchLabels': {
+                    'prepull': chain_name,
+                }
+            },
+            'template': {
+                'metadata': {
+                    'labels': {
+                        'prepull': chain_name,
+                    }
+                },
+                'spec': {
+                    'initContainers': init_containers,
+                    'containers': [
+                        {
+                            'image': PAUSE_DOCKER_IMAGE,
+                            'imagePullPolicy': 'IfNotPresent',
+                            'name': 'pause',
+                        }
+                    ],
+                    'volumes': [
+                        {
+                            'name': 'prepull-tool',
+                            'emptyDir': {},
+                        }
+                    ],
+                }
+            }
+        }
+    }
+    return prepull_daemonset
+
+
+def write_prepull_config(work_dir, chain_name, images, image_pull_policy):
+    yaml_ptah = os.path.join(work_dir, '{}-prepull.yaml'.format(chain_name))
+    print("yaml_ptah:{}", yaml_ptah)
+    with open(yaml_ptah, 'wt') as stream:
+        yaml.dump(gen_prepull_daemonset(chain_name, images, image_pull_policy), stream, sort_keys=False)
+
+
+# snapshot of objects written last time, secret values are regenerated every run so only keys are kept
+def gen_object_key(obj):
+    return '{}/{}'.format(obj['kind'], obj['metadata']['name'])
+
+
+def normalize_object(obj):
+    obj = json.loads(json.dumps(obj))
+    # network key is random on each run, values of other secrets are kept as hash
+    if obj['kind'] == 'Secret':
+        obj['data'] = {key: '' if key == 'network-key' else hashlib.sha256(value.encode()).hexdigest() for key, value in obj.get('data', {}).items()}
+    return obj
+
+
+# update snapshot of {yaml_name}.yaml, write changed objects to {yaml_name}-changed.yaml if is_changed_only
+def write_changed_config(work_dir, chain_name, yaml_name, k8s_config, is_changed_only):
+    snapshot_path = os.path.join(work_dir, 'cita-cloud/{}/{}-snapshot.json'.format(chain_name, yaml_name))
+    old_snapshot = {}
+    if os.path.exists(snapshot_path):
+        with open(snapshot_path) as stream:
+            old_snapshot = json.load(stream)
+    snapshot = {gen_object_key(obj): normalize_object(obj) for obj in k8s_config}
+
+    if is_changed_only:
+        changed = [obj for obj in k8s_config if old_snapshot.get(gen_object_key(obj)) != snapshot[gen_object_key(obj)]]
+        for obj in changed:
+            print('changed:', gen_object_key(obj))
+        # removed objects are not deleted by apply
+        for key in old_snapshot:
+            if key not in snapshot:
+                print('removed:', key)
+        yaml_ptah = os.path.join(work_dir, '{}-changed.yaml'.format(yaml_name))
+        print("yaml_ptah:{}", yaml_ptah)
+        with open(yaml_ptah, 'wt') as stream:
+            yaml.dump_all(changed, stream, sort_keys=False)
+
+    need_directory(os.path.dirname(snapshot_path))
+    with open(snapshot_path, 'wt') as stream:
+        json.dump(snapshot, stream, indent=2, sort_keys=True)
+
+
+def find_service(service_config, service_name):
+    for service in service_config['services']:
+        if service['name'] == service_name:
+            return service
+
+
 def find_docker_image(service_config, service_name):
     for service in service_config['services']:
         if service['name'] == service_name:
             return service['docker_image']
 
 
+# plain dicts, inline tables of toml can not be dumped to yaml
 def load_service_config(service_config):
-    return toml.load(service_config)
+    return json.loads(json.dumps(toml.load(service_config)))
+
+
+def load_pvc_names(pvc_map, chain_name, peers_count):
+    pvc_map = toml.load(pvc_map)
+    if pvc_map.get('chain_name', chain_name) != chain_name:
+        print('pvc_map is for chain', pvc_map['chain_name'])
+        sys.exit(1)
+    pvc_names = pvc_map['pvc_names']
+    if len(pvc_names) < peers_count:
+        print('The len of pvc_names in pvc_map is invalid')
+        sys.exit(1)
+    return pvc_names
+
+
+def apply_profile(args, service_config):
+    if args.profile:
+        profile = PERF_PROFILES[args.profile]
+    else:
+        profile = {}
+    # log_level given in CLI also overrides log_level of services
+    args.cli_log_level = args.log_level
+    for key, default in [('block_interval', DEFAULT_BLOCK_INTERVAL), ('block_delay_number', DEFAULT_BLOCK_DELAY_NUMBER), ('log_level', DEFAULT_LOG_LEVEL)]:
+        if getattr(args, key) is None:
+            setattr(args, key, profile.get(key, default))
+    for section in ['log', 'sync']:
+        if section in profile:
+            config = service_config.setdefault(section, {})
+            for key, value in profile[section].items():
+                config.setdefault(key, value)
+    if 'resources' in profile:
+        for service in service_config['services']:
+            service.setdefault('resources', copy.deepcopy(profile['resources']))
 
 
 def verify_service_config(service_config):
@@ -1083,22 +3333,985 @@ def gen_kms_secret_name(chain_name):
     return 'kms-secret-{}'.format(chain_name)
 
 
-def gen_sm2_authorities(work_dir, chain_name, peers_count):
-    authorities = []
-    for i in range(peers_count):
-        pk, sk = generate_keypair()
-        addr = '0x'+hash_msg(pk)[24:]
-        path = os.path.join("{0}/cita-cloud/{1}/node{2}".format(work_dir, chain_name, i), 'node_key')
-        with open(path, 'wt') as stream:
-            stream.write('0x'+sk.hex())
-        path = os.path.join("{0}/cita-cloud/{1}/node{2}".format(work_dir, chain_name, i), 'node_address')
-        with open(path, 'wt') as stream:
-            stream.write(addr)
-        path = os.path.join("{0}/cita-cloud/{1}/node{2}".format(work_dir, chain_name, i), 'key_id')
-        with open(path, 'wt') as stream:
-            stream.write(str(i))
-        authorities.append(addr)
-    return authorities
+def gen_sm2_authority(work_dir, chain_name, i):
+    pk, sk = generate_keypair()
+    addr = '0x'+hash_msg(pk)[24:]
+    path = os.path.join("{0}/cita-cloud/{1}/node{2}".format(work_dir, chain_name, i), 'node_key')
+    with open(path, 'wt') as stream:
+        stream.write('0x'+sk.hex())
+    path = os.path.join("{0}/cita-cloud/{1}/node{2}".format(work_dir, chain_name, i), 'node_address')
+    with open(path, 'wt') as stream:
+        stream.write(addr)
+    path = os.path.join("{0}/cita-cloud/{1}/node{2}".format(work_dir, chain_name, i), 'key_id')
+    with open(path, 'wt') as stream:
+        stream.write(str(i))
+    return addr
+
+
+# checkpoint of local cluster
+# stages done and results of nodes done are saved in cita-cloud/<chain_name>/checkpoint.toml
+def gen_checkpoint_path(work_dir, chain_name):
+    return os.path.join(work_dir, 'cita-cloud/{}/checkpoint.toml'.format(chain_name))
+
+
+# hash of inputs of each stage, a stage done with other inputs is redone
+def gen_stage_inputs(args, service_config, nodes_count):
+    is_need_sync = is_sync_enabled(args, service_config)
+    inputs = {
+        'config': {
+            'nodes_count': nodes_count,
+            'enable_tls': args.enable_tls,
+            'block_delay_number': args.block_delay_number,
+            'log_config': gen_log_config(args, service_config),
+            'services': [find_service(service_config, name) for name in ['consensus', 'controller']],
+        },
+        'accounts': {
+            'nodes_count': nodes_count,
+            'kms_docker_image': find_docker_image(service_config, 'kms'),
+            'is_bft': 'bft' in find_docker_image(service_config, 'consensus'),
+            'kms_password': args.kms_password,
+        },
+        'sysconfig': {
+            'peers_count': args.peers_count,
+            'nodes_count': nodes_count,
+            'block_interval': args.block_interval,
+        },
+        'sync': {
+            'is_need_sync': is_need_sync,
+            'folders': gen_sync_folders(service_config) if is_need_sync else [],
+            'tunings': [gen_sync_tuning(service_config, i) for i in range(nodes_count)] if is_need_sync else [],
+        },
+    }
+    return {stage: hashlib.sha256(json.dumps(inputs[stage], sort_keys=True).encode()).hexdigest() for stage in STAGE_LIST}
+
+
+# stages with changed inputs are redone, only sysconfig depends on another stage (accounts)
+# new accounts change the chain, so they are only regenerated by --restart_from
+def load_checkpoint(work_dir, chain_name, stage_inputs, restart_from):
+    path = gen_checkpoint_path(work_dir, chain_name)
+    if os.path.exists(path):
+        checkpoint = toml.load(path)
+    else:
+        checkpoint = {'inputs': {}, 'stages': []}
+    if restart_from:
+        redo = STAGE_LIST[STAGE_LIST.index(restart_from):]
+        # genesis is only regenerated on request
+        if restart_from == STAGE_LIST[0]:
+            checkpoint.pop('genesis', None)
+    else:
+        # stages done or with results of some nodes
+        inputs = checkpoint.get('inputs', {})
+        started = [stage for stage in STAGE_LIST if stage in checkpoint['stages'] or stage in checkpoint]
+        redo = [stage for stage in started if inputs.get(stage) != stage_inputs[stage]]
+        if 'accounts' in redo:
+            print('inputs of stage accounts changed, use --restart_from {}'.format(redo[0]))
+            sys.exit(1)
+        if redo:
+            print('inputs of stages {} changed, redo them'.format(redo))
+    checkpoint['stages'] = [stage for stage in checkpoint['stages'] if stage not in redo]
+    for stage in redo:
+        checkpoint.pop(stage, None)
+    checkpoint['inputs'] = stage_inputs
+    checkpoint.pop('nodes_count', None)
+    return checkpoint
+
+
+# write to a temp file first, a failure never leaves a half-written checkpoint
+def save_checkpoint(work_dir, chain_name, checkpoint):
+    path = gen_checkpoint_path(work_dir, chain_name)
+    need_directory(os.path.dirname(path))
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wt') as stream:
+        toml.dump(checkpoint, stream)
+    os.replace(tmp_path, path)
+
+
+def finish_stage(work_dir, chain_name, checkpoint, stage):
+    checkpoint['stages'].append(stage)
+    save_checkpoint(work_dir, chain_name, checkpoint)
+    print('stage {} done'.format(stage))
+
+
+# port registry
+# blocks of ports are keyed by chain_name and node, node is -1 for a block of whole chain
+def parse_port_range(port_range):
+    try:
+        min_port, max_port = map(int, port_range.split('-'))
+    except ValueError:
+        print('Invalid port range', port_range)
+        sys.exit(1)
+    if min_port > max_port:
+        print('Invalid port range', port_range)
+        sys.exit(1)
+    return min_port, max_port
+
+
+# lock a sidecar file, the registry itself is replaced on write
+def lock_port_registry(path):
+    stream = open(path + '.lock', 'a')
+    fcntl.flock(stream, fcntl.LOCK_EX)
+    return stream
+
+
+def load_port_registry(path, port_range=DEFAULT_NODE_PORT_RANGE):
+    if os.path.exists(path):
+        registry = toml.load(path)
+        registry.setdefault('blocks', [])
+        return registry
+    min_port, max_port = parse_port_range(port_range)
+    return {'min_port': min_port, 'max_port': max_port, 'blocks': []}
+
+
+def save_port_registry(path, registry):
+    registry['blocks'].sort(key=lambda block: block['start'])
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wt') as stream:
+        toml.dump(registry, stream)
+    os.replace(tmp_path, path)
+
+
+# first fit, so freed ports are reused and blocks stay compact
+def find_free_port(registry, size):
+    start = registry['min_port']
+    for block in sorted(registry['blocks'], key=lambda block: block['start']):
+        if block['start'] - start >= size:
+            break
+        start = max(start, block['start'] + block['size'])
+    if start + size - 1 > registry['max_port']:
+        return None
+    return start
+
+
+def alloc_ports(registry, chain_name, node, size):
+    for block in registry['blocks']:
+        if block['chain_name'] == chain_name and block['node'] == node:
+            if block['size'] >= size:
+                return block['start']
+            # grow: release the old block and find a new one
+            registry['blocks'].remove(block)
+            break
+    start = find_free_port(registry, size)
+    if start is None:
+        print('No {} free ports left in {}-{}'.format(size, registry['min_port'], registry['max_port']))
+        sys.exit(1)
+    registry['blocks'].append({'chain_name': chain_name, 'node': node, 'start': start, 'size': size})
+    return start
+
+
+# allocate blocks in one locked transaction, return start ports in order of nodes
+def alloc_port_blocks(path, chain_name, nodes, size):
+    lock = lock_port_registry(path)
+    try:
+        registry = load_port_registry(path)
+        starts = [alloc_ports(registry, chain_name, node, size) for node in nodes]
+        save_port_registry(path, registry)
+    finally:
+        lock.close()
+    return starts
+
+
+def free_ports(registry, chain_name):
+    freed = [block for block in registry['blocks'] if block['chain_name'] == chain_name]
+    registry['blocks'] = [block for block in registry['blocks'] if block['chain_name'] != chain_name]
+    return freed
+
+
+def gen_port_stat(registry):
+    total = registry['max_port'] - registry['min_port'] + 1
+    used = sum(block['size'] for block in registry['blocks'])
+    largest_free = 0
+    start = registry['min_port']
+    for block in sorted(registry['blocks'], key=lambda block: block['start']):
+        largest_free = max(largest_free, block['start'] - start)
+        start = max(start, block['start'] + block['size'])
+    largest_free = max(largest_free, registry['max_port'] + 1 - start)
+    return {
+        'range': '{}-{}'.format(registry['min_port'], registry['max_port']),
+        'total': total,
+        'used': used,
+        'free': total - used,
+        'largest_free_block': largest_free,
+        'chains': len(set(block['chain_name'] for block in registry['blocks'])),
+    }
+
+
+def run_subcmd_ports(args, work_dir):
+    lock = lock_port_registry(args.port_registry)
+    try:
+        registry = load_port_registry(args.port_registry, args.node_port_range)
+        if args.action == 'list':
+            for block in sorted(registry['blocks'], key=lambda block: block['start']):
+                if args.chain_name and block['chain_name'] != args.chain_name:
+                    continue
+                print('{}\t{}\t{}-{}'.format(block['chain_name'], block['node'], block['start'], block['start'] + block['size'] - 1))
+        elif args.action == 'free':
+            if not args.chain_name:
+                print('chain_name must be set!')
+                sys.exit(1)
+            freed = free_ports(registry, args.chain_name)
+            save_port_registry(args.port_registry, registry)
+            print('freed {} ports of {}'.format(sum(block['size'] for block in freed), args.chain_name))
+        else:
+            for key, value in gen_port_stat(registry).items():
+                print('{}: {}'.format(key, value))
+    finally:
+        lock.close()
+
+
+# capacity plan
+# parse k8s quantity, e.g. 500m, 1Gi
+def parse_quantity(quantity):
+    quantity = str(quantity)
+    for suffix in sorted(QUANTITY_SUFFIXES, key=len, reverse=True):
+        if quantity.endswith(suffix):
+            return float(quantity[:-len(suffix)]) * QUANTITY_SUFFIXES[suffix]
+    return float(quantity)
+
+
+# parse log4rs size, e.g. 50mb
+def parse_log_size(size):
+    size = str(size).lower()
+    for suffix in sorted(LOG_SIZE_SUFFIXES, key=len, reverse=True):
+        if size.endswith(suffix):
+            return float(size[:-len(suffix)]) * LOG_SIZE_SUFFIXES[suffix]
+    return float(size)
+
+
+def format_bytes(size):
+    for suffix in ['Ti', 'Gi', 'Mi', 'Ki']:
+        if size >= QUANTITY_SUFFIXES[suffix]:
+            return '{:.2f}{}'.format(size / QUANTITY_SUFFIXES[suffix], suffix)
+    return '{:.0f}'.format(size)
+
+
+# sum requests of containers in pods, replicas times for workloads
+def sum_pod_requests(k8s_config, cluster_nodes):
+    total = {'pods': 0, 'containers': 0, 'no_requests': 0, 'cpu': 0.0, 'memory': 0.0}
+    for obj in k8s_config:
+        pod_spec = get_pod_spec(obj)
+        if pod_spec is None:
+            continue
+        if obj['kind'] == 'DaemonSet':
+            replicas = cluster_nodes
+        else:
+            replicas = obj['spec'].get('replicas', 1)
+        total['pods'] += replicas
+        # native sidecars run along with containers
+        sidecars = [container for container in pod_spec.get('initContainers', []) if container.get('restartPolicy') == 'Always']
+        for container in sidecars + pod_spec['containers']:
+            requests = container.get('resources', {}).get('requests', {})
+            if not requests:
+                total['no_requests'] += replicas
+            total['containers'] += replicas
+            total['cpu'] += replicas * parse_quantity(requests.get('cpu', PLAN_DEFAULT_REQUESTS['cpu']))
+            total['memory'] += replicas * parse_quantity(requests.get('memory', PLAN_DEFAULT_REQUESTS['memory']))
+    return total
+
+
+# storage of volumeClaimTemplates of all replicas, volumes of pd and tikv are not on the PV of nodes
+def sum_claim_requests(k8s_config):
+    total = 0
+    for obj in k8s_config:
+        if obj['kind'] != 'StatefulSet':
+            continue
+        for claim in obj['spec'].get('volumeClaimTemplates', []):
+            total += obj['spec'].get('replicas', 1) * parse_quantity(claim['spec']['resources']['requests']['storage'])
+    return total
+
+
+# bytes written to the PV by one node per day, and the bound of its logs
+def estimate_node_storage(args, service_config, is_need_sync):
+    blocks_per_day = 86400 / args.block_interval
+    txs_per_day = args.tx_rate * 86400
+    tx_copies = PLAN_TX_COPIES
+    if is_need_sync and args.sync_volume == VOLUME_CLASS_DATADIR:
+        # controller folders shared by syncthing
+        tx_copies += 1
+    daily = blocks_per_day * PLAN_BLOCK_OVERHEAD + txs_per_day * args.tx_size * tx_copies
+    log_config = gen_log_config(args, service_config)
+    if log_config['is_stdout'] or args.log_volume != VOLUME_CLASS_DATADIR:
+        logs = 0
+    else:
+        # current file and rolled files of every service
+        logs = len(SERVICE_LIST) * parse_log_size(log_config['roll_size']) * (log_config['roll_count'] + 1)
+    return daily, logs
+
+
+def run_subcmd_plan(args, work_dir):
+    service_config = load_service_config(args.service_config)
+    verify_service_config(service_config)
+    verify_startup_config(args)
+    apply_profile(args, service_config)
+
+    nodes_count = args.peers_count + args.rpc_replicas
+    is_need_sync = is_sync_enabled(args, service_config)
+    is_shared_monitor = args.need_monitor and args.monitor_mode == MONITOR_MODE_SHARED
+
+    # same workloads as local_cluster, no keys are generated
+    k8s_config = []
+    for i in range(nodes_count):
+        k8s_config.append(gen_local_node_deployment(args, service_config, i, 'plan', is_need_sync))
+    if is_shared_monitor:
+        k8s_config.append(gen_monitor_process_daemonset())
+    if args.need_tikv:
+        k8s_config.extend(gen_tikv_config_objects(args.chain_name, service_config, args.peers_count))
+    if args.bench:
+        k8s_config.extend(gen_bench_config(args, service_config, 'plan'))
+    if args.need_prepull:
+        k8s_config.append(gen_prepull_daemonset(args.chain_name, gen_images(k8s_config), DEFAULT_IMAGEPULLPOLICY))
+    total = sum_pod_requests(k8s_config, args.cluster_nodes)
+
+    daily, logs = estimate_node_storage(args, service_config, is_need_sync)
+    if args.pvc_per_node:
+        pv_daily, pv_logs = daily, logs
+    else:
+        pv_daily, pv_logs = daily * nodes_count, logs * nodes_count
+    pv_need = pv_daily * args.days + pv_logs
+    pv_capacity = parse_quantity(args.pv_capacity)
+
+    min_port, max_port = parse_port_range(args.node_port_range)
+    node_ports = 1 + 5 * nodes_count
+
+    print('nodes: {} ({} validators, {} rpc)'.format(nodes_count, args.peers_count, args.rpc_replicas))
+    print('pods: {}'.format(total['pods']))
+    print('containers: {} ({} without requests, counted as cpu {} memory {})'.format(total['containers'], total['no_requests'], PLAN_DEFAULT_REQUESTS['cpu'], PLAN_DEFAULT_REQUESTS['memory']))
+    print('cpu requests: {:.2f}'.format(total['cpu']))
+    print('memory requests: {}'.format(format_bytes(total['memory'])))
+    print('pv growth per day: {} ({} per node, {} tx/s of {} bytes, block interval {}s)'.format(format_bytes(pv_daily), format_bytes(daily), args.tx_rate, args.tx_size, args.block_interval))
+    print('pv logs: {}'.format(format_bytes(pv_logs)))
+    if args.need_tikv:
+        print('tikv volumes: {}'.format(format_bytes(sum_claim_requests(k8s_config))))
+    print('pv need for {} days: {} of {}'.format(args.days, format_bytes(pv_need), args.pv_capacity))
+    if pv_daily > 0:
+        print('pv full in days: {:.1f}'.format(max(0, pv_capacity - pv_logs) / pv_daily))
+    print('node ports: {} of {}'.format(node_ports, max_port - min_port + 1))
+
+    # usage of each resource, the highest one is the bottleneck
+    usages = {
+        'storage': pv_need / pv_capacity,
+        'node_ports': node_ports / (max_port - min_port + 1),
+    }
+    if args.cluster_cpu:
+        usages['cpu'] = total['cpu'] / parse_quantity(args.cluster_cpu)
+    if args.cluster_memory:
+        usages['memory'] = total['memory'] / parse_quantity(args.cluster_memory)
+    for name, usage in sorted(usages.items(), key=lambda item: item[1], reverse=True):
+        print('usage of {}: {:.1f}%'.format(name, usage * 100))
+    bottleneck = max(usages, key=usages.get)
+    if usages[bottleneck] > 1:
+        print('bottleneck: {} is not enough'.format(bottleneck))
+        sys.exit(1)
+    print('bottleneck: {}'.format(bottleneck))
+
+
+# apply to k8s
+def load_kubeconfig(kubeconfig):
+    if not kubeconfig:
+        kubeconfig = os.environ.get('KUBECONFIG', '~/.kube/config').split(os.pathsep)[0]
+    kubeconfig = os.path.expanduser(kubeconfig)
+    if not os.path.exists(kubeconfig):
+        return None
+    with open(kubeconfig) as stream:
+        return yaml.safe_load(stream)
+
+
+def find_named(items, name):
+    for item in items or []:
+        if item['name'] == name:
+            return item
+    print('Can not find {} in kubeconfig'.format(name))
+    sys.exit(1)
+
+
+# data in kubeconfig or path relative to kubeconfig
+def kubeconfig_file(config, key, temp_dir):
+    if key + '-data' in config:
+        path = os.path.join(temp_dir, key)
+        with open(path, 'wb') as stream:
+            stream.write(base64.b64decode(config[key + '-data']))
+        return path
+    return config.get(key)
+
+
+# cluster: server, namespace, headers and ssl context
+def gen_cluster(kubeconfig, context_name, server, namespace, temp_dir):
+    cluster = {
+        'server': server,
+        'namespace': namespace,
+        'headers': {},
+        'ssl_context': None,
+    }
+    if kubeconfig:
+        context_name = context_name or kubeconfig.get('current-context')
+        context = find_named(kubeconfig.get('contexts'), context_name)['context']
+        cluster_config = find_named(kubeconfig.get('clusters'), context['cluster'])['cluster']
+        user_config = find_named(kubeconfig.get('users'), context['user'])['user']
+        cluster['server'] = server or cluster_config['server']
+        cluster['namespace'] = namespace or context.get('namespace')
+        if cluster['server'].startswith('https'):
+            if cluster_config.get('insecure-skip-tls-verify'):
+                ssl_context = ssl._create_unverified_context()
+            else:
+                ssl_context = ssl.create_default_context(cafile=kubeconfig_file(cluster_config, 'certificate-authority', temp_dir))
+            cert_file = kubeconfig_file(user_config, 'client-certificate', temp_dir)
+            if cert_file:
+                ssl_context.load_cert_chain(cert_file, kubeconfig_file(user_config, 'client-key', temp_dir))
+            cluster['ssl_context'] = ssl_context
+        if 'token' in user_config:
+            cluster['headers']['Authorization'] = 'Bearer {}'.format(user_config['token'])
+        elif 'exec' in user_config or 'auth-provider' in user_config:
+            print('exec and auth-provider of kubeconfig are not supported, use a token or client certificate')
+            sys.exit(1)
+    if not cluster['server']:
+        print('server or kubeconfig must be set!')
+        sys.exit(1)
+    cluster['namespace'] = cluster['namespace'] or 'default'
+    return cluster
+
+
+def gen_apply_path(obj, namespace):
+    if obj['kind'] not in KIND_RESOURCES:
+        print('Unknown kind', obj['kind'])
+        sys.exit(1)
+    plural, is_namespaced = KIND_RESOURCES[obj['kind']]
+    if '/' in obj['apiVersion']:
+        path = '/apis/{}'.format(obj['apiVersion'])
+    else:
+        path = '/api/{}'.format(obj['apiVersion'])
+    if is_namespaced:
+        path += '/namespaces/{}'.format(obj['metadata'].get('namespace', namespace))
+    return '{}/{}/{}'.format(path, plural, obj['metadata']['name'])
+
+
+# send(method, path, body, headers) -> (status, text) over pooled connections
+# httpx shares one http2 connection among threads, http.client keeps one connection per thread
+def gen_http_sender(cluster, concurrency, timeout):
+    if httpx is not None:
+        client = httpx.Client(
+            base_url=cluster['server'],
+            http2=h2 is not None,
+            verify=cluster['ssl_context'] or True,
+            headers=cluster['headers'],
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=concurrency))
+
+        def send(method, path, body, headers):
+            response = client.request(method, path, content=body, headers=headers)
+            return response.status_code, response.text
+        return send, client.close
+
+    url = urllib.parse.urlsplit(cluster['server'])
+    local = threading.local()
+    connections = []
+
+    def connect():
+        if url.scheme == 'https':
+            return http.client.HTTPSConnection(url.netloc, timeout=timeout, context=cluster['ssl_context'])
+        return http.client.HTTPConnection(url.netloc, timeout=timeout)
+
+    def send(method, path, body, headers):
+        headers = dict(cluster['headers'], **headers)
+        for retry in range(2):
+            if getattr(local, 'connection', None) is None:
+                local.connection = connect()
+                connections.append(local.connection)
+            try:
+                local.connection.request(method, url.path.rstrip('/') + path, body=body, headers=headers)
+                response = local.connection.getresponse()
+                return response.status, response.read().decode()
+            except (http.client.HTTPException, ConnectionError):
+                # server closed the keep-alive connection, reconnect once
+                local.connection.close()
+                local.connection = None
+                if retry:
+                    raise
+
+    def close():
+        for connection in connections:
+            connection.close()
+    return send, close
+
+
+def apply_object(send, obj, namespace, field_manager, is_force):
+    query = urllib.parse.urlencode({'fieldManager': field_manager, 'force': 'true' if is_force else 'false'})
+    path = '{}?{}'.format(gen_apply_path(obj, namespace), query)
+    headers = {'Content-Type': 'application/apply-patch+yaml'}
+    # json is yaml
+    status, text = send('PATCH', path, json.dumps(obj), headers)
+    if status >= 300:
+        return '{} {}: {} {}'.format(obj['kind'], obj['metadata']['name'], status, text.strip())
+    return None
+
+
+# apply objects to one cluster, objects before workloads, return errors
+def apply_to_cluster(args, cluster, send, objs):
+    errors = []
+    try:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            for wave in [False, True]:
+                wave_objs = [obj for obj in objs if (obj['kind'] in WORKLOAD_KINDS) == wave]
+                results = executor.map(lambda obj: apply_object(send, obj, cluster['namespace'], args.field_manager, args.force_conflicts), wave_objs)
+                for obj, error in zip(wave_objs, results):
+                    if error:
+                        errors.append(error)
+                    else:
+                        # one write, clusters are applied in parallel
+                        print('{} {} {} applied\n'.format(cluster['server'], obj['kind'], obj['metadata']['name']), end='')
+    except Exception as e:
+        errors.append('{}: {}'.format(cluster['server'], e))
+    return errors
+
+
+def is_node_deployment(obj):
+    return obj['kind'] == 'Deployment' and 'node_name' in obj['metadata'].get('labels', {})
+
+
+# all pods of deployment are updated and ready
+def wait_deployment_ready(send, cluster, obj, timeout):
+    path = gen_apply_path(obj, cluster['namespace'])
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status, text = send('GET', path, None, {})
+        if status < 300:
+            deployment = json.loads(text)
+            replicas = deployment['spec'].get('replicas', 1)
+            deployment_status = deployment.get('status', {})
+            if deployment_status.get('observedGeneration', 0) >= deployment['metadata'].get('generation', 0) \
+                    and deployment_status.get('updatedReplicas', 0) == replicas \
+                    and deployment_status.get('readyReplicas', 0) == replicas:
+                return None
+        time.sleep(2)
+    return 'Deployment {}: not ready in {}s'.format(obj['metadata']['name'], timeout)
+
+
+def apply_node_wave(args, cluster, send, obj):
+    error = apply_object(send, obj, cluster['namespace'], args.field_manager, args.force_conflicts)
+    if error:
+        return error
+    return wait_deployment_ready(send, cluster, obj, args.wave_timeout)
+
+
+def run_subcmd_apply(args, work_dir):
+    if args.index:
+        index = toml.load(args.index)
+        index_dir = os.path.dirname(os.path.abspath(args.index))
+        for cluster, cluster_index in index['clusters'].items():
+            args.files.extend(os.path.join(index_dir, path) for path in cluster_index['files'])
+        args.contexts = ','.join(cluster for cluster, cluster_index in index['clusters'].items() for _ in cluster_index['files'])
+    if not args.files:
+        print('files or index must be set!')
+        sys.exit(1)
+    if args.contexts:
+        contexts = args.contexts.split(',')
+        if len(contexts) != len(args.files):
+            print('The len of contexts is invalid')
+            sys.exit(1)
+    else:
+        contexts = [args.context] * len(args.files)
+    kubeconfig = None
+    if not args.server or args.contexts or args.context:
+        kubeconfig = load_kubeconfig(args.kubeconfig)
+
+    # objects of files in the same context go to one cluster
+    # node deployments are left to waves if wave_size is set
+    cluster_objs = {}
+    node_deployments = []
+    for path, context in zip(args.files, contexts):
+        with open(path) as stream:
+            objs = [obj for obj in yaml.safe_load_all(stream) if obj]
+        for obj in objs:
+            if args.wave_size and is_node_deployment(obj):
+                node_deployments.append((context, obj))
+            else:
+                cluster_objs.setdefault(context, []).append(obj)
+        cluster_objs.setdefault(context, [])
+    # validators have lower index than rpc nodes
+    node_deployments.sort(key=lambda item: int(item[1]['metadata']['name'].rsplit('-', 1)[1]))
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        clusters = {context: gen_cluster(kubeconfig, context, args.server, args.namespace, temp_dir) for context in cluster_objs}
+        senders = {context: gen_http_sender(clusters[context], args.concurrency, args.timeout) for context in clusters}
+        try:
+            with ThreadPoolExecutor(max_workers=len(clusters)) as executor:
+                results = executor.map(lambda context: apply_to_cluster(args, clusters[context], senders[context][0], cluster_objs[context]), list(cluster_objs))
+                errors = [error for result in results for error in result]
+
+            # the next wave starts after all nodes of this wave are ready
+            if errors:
+                node_deployments = []
+            for start in range(0, len(node_deployments), args.wave_size or 1):
+                wave = node_deployments[start:start + args.wave_size]
+                with ThreadPoolExecutor(max_workers=len(wave)) as executor:
+                    results = list(executor.map(lambda item: apply_node_wave(args, clusters[item[0]], senders[item[0]][0], item[1]), wave))
+                for (context, obj), error in zip(wave, results):
+                    if error:
+                        errors.append(error)
+                    else:
+                        print('{} {} {} ready'.format(clusters[context]['server'], obj['kind'], obj['metadata']['name']))
+                if errors:
+                    break
+        finally:
+            for send, close in senders.values():
+                close()
+
+    for error in errors:
+        print(error)
+    if errors:
+        sys.exit(1)
+    print("Done!!!")
+
+
+# watch rollout
+# k8s time, e.g. 2021-06-01T08:00:00Z or 2021-06-01T08:00:00.123456Z
+def parse_k8s_time(value):
+    if not value:
+        return None
+    value = value.split('.')[0].rstrip('Z')
+    return datetime.datetime.strptime(value, '%Y-%m-%dT%H:%M:%S').replace(tzinfo=datetime.timezone.utc).timestamp()
+
+
+# put (kind, event) of a watch stream into events until the server closes it
+def watch_objects(cluster, path, params, timeout, events):
+    params = dict(params, watch='true', timeoutSeconds=timeout)
+    path = '{}?{}'.format(path, urllib.parse.urlencode(params))
+    kind = path.split('?')[0].split('/')[-1]
+    try:
+        if httpx is not None:
+            with httpx.Client(base_url=cluster['server'], http2=h2 is not None, verify=cluster['ssl_context'] or True, headers=cluster['headers'], timeout=None) as client:
+                with client.stream('GET', path) as response:
+                    response.raise_for_status()
+                    for line in response.iter_lines():
+                        if line:
+                            events.put((kind, json.loads(line)))
+        else:
+            url = urllib.parse.urlsplit(cluster['server'])
+            if url.scheme == 'https':
+                connection = http.client.HTTPSConnection(url.netloc, context=cluster['ssl_context'])
+            else:
+                connection = http.client.HTTPConnection(url.netloc)
+            connection.request('GET', url.path.rstrip('/') + path, headers=cluster['headers'])
+            response = connection.getresponse()
+            if response.status >= 300:
+                raise Exception('{} {}'.format(response.status, response.read().decode().strip()))
+            while True:
+                line = response.readline()
+                if not line:
+                    break
+                if line.strip():
+                    events.put((kind, json.loads(line)))
+            connection.close()
+    except Exception as e:
+        events.put(('error', '{}: {}'.format(kind, e)))
+    events.put(('closed', kind))
+
+
+def gen_node_rollout(pod):
+    rollout = {
+        'pod': pod['metadata']['name'],
+        'created': parse_k8s_time(pod['metadata'].get('creationTimestamp')),
+        'scheduled': None,
+        'containers': {},
+        'ready': None,
+    }
+    status = pod.get('status', {})
+    for condition in status.get('conditions', []):
+        if condition['status'] != 'True':
+            continue
+        if condition['type'] == 'PodScheduled':
+            rollout['scheduled'] = parse_k8s_time(condition.get('lastTransitionTime'))
+        elif condition['type'] == 'Ready':
+            rollout['ready'] = parse_k8s_time(condition.get('lastTransitionTime'))
+    # init containers which run to completion are not counted
+    container_statuses = [container_status for container_status in status.get('initContainerStatuses', []) if 'terminated' not in container_status.get('state', {})]
+    for container_status in container_statuses + status.get('containerStatuses', []):
+        running = container_status.get('state', {}).get('running')
+        rollout['containers'][container_status['name']] = parse_k8s_time(running['startedAt']) if running else None
+    return rollout
+
+
+# time of Pulled events of a pod: {container: time}
+def update_pulled(pulled, event, observed):
+    involved = event.get('involvedObject', {})
+    if event.get('reason') != EVENT_REASON_PULLED or involved.get('kind') != 'Pod':
+        return
+    # fieldPath is spec.containers{name}
+    container = involved.get('fieldPath', '').split('{')[-1].rstrip('}')
+    event_time = parse_k8s_time(event.get('lastTimestamp') or event.get('eventTime')) or observed
+    pulled.setdefault(involved['name'], {})[container] = event_time
+
+
+def gen_rollout_report(args, nodes, pulled):
+    report = {
+        'chain_name': args.chain_name,
+        'nodes': {},
+    }
+    starts = [rollout['created'] for rollout in nodes.values() if rollout['created']]
+    start = min(starts) if starts else None
+    report['start'] = start
+
+    def since(value):
+        if value is None or start is None:
+            return None
+        return value - start
+
+    for node_name in sorted(nodes):
+        rollout = nodes[node_name]
+        pod_pulled = pulled.get(rollout['pod'], {})
+        containers = {}
+        for name, started in rollout['containers'].items():
+            containers[name] = {'pulled': since(pod_pulled.get(name)), 'started': since(started)}
+        report['nodes'][node_name] = {
+            'pod': rollout['pod'],
+            'created': since(rollout['created']),
+            'scheduled': since(rollout['scheduled']),
+            'pulled': since(max(pod_pulled.values())) if pod_pulled else None,
+            'started': since(max(rollout['containers'].values())) if rollout['containers'] and all(rollout['containers'].values()) else None,
+            'ready': since(rollout['ready']),
+            'containers': containers,
+        }
+    ready = [node['ready'] for node in report['nodes'].values() if node['ready'] is not None]
+    report['time_to_ready'] = max(ready) if ready else None
+    if ready:
+        report['slowest_node'] = max((node['ready'], node_name) for node_name, node in report['nodes'].items() if node['ready'] is not None)[1]
+    return report
+
+
+def print_rollout_timeline(report):
+    def fmt(value):
+        return '-' if value is None else '{:.0f}s'.format(value)
+
+    print('{:<24}{:>10}{:>10}{:>10}{:>10}{:>10}'.format('node', 'created', 'scheduled', 'pulled', 'started', 'ready'))
+    for node_name, node in sorted(report['nodes'].items(), key=lambda item: (item[1]['ready'] is None, item[1]['ready'] or 0)):
+        print('{:<24}{:>10}{:>10}{:>10}{:>10}{:>10}'.format(node_name, fmt(node['created']), fmt(node['scheduled']), fmt(node['pulled']), fmt(node['started']), fmt(node['ready'])))
+        for name, container in sorted(node['containers'].items()):
+            print('  {:<42}{:>10}{:>10}'.format(name, fmt(container['pulled']), fmt(container['started'])))
+    print('time_to_ready:', fmt(report['time_to_ready']))
+    if report.get('slowest_node'):
+        print('slowest_node:', report['slowest_node'])
+
+
+def run_subcmd_watch(args, work_dir):
+    nodes_count = args.peers_count + args.rpc_replicas
+    kubeconfig = None
+    if not args.server or args.context:
+        kubeconfig = load_kubeconfig(args.kubeconfig)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cluster = gen_cluster(kubeconfig, args.context, args.server, args.namespace, temp_dir)
+        namespace_path = '/api/v1/namespaces/{}'.format(cluster['namespace'])
+        events = queue.Queue()
+        watches = [
+            ('{}/pods'.format(namespace_path), {'labelSelector': 'chain_name={},node_name'.format(args.chain_name)}),
+            ('{}/events'.format(namespace_path), {'fieldSelector': 'involvedObject.kind=Pod,reason={}'.format(EVENT_REASON_PULLED)}),
+        ]
+        for path, params in watches:
+            thread = threading.Thread(target=watch_objects, args=(cluster, path, params, args.timeout, events), daemon=True)
+            thread.start()
+
+        # latest pod of each node
+        nodes = {}
+        pulled = {}
+        closed = 0
+        is_ready = False
+        deadline = time.time() + args.timeout
+        while not is_ready and closed < len(watches) and time.time() < deadline:
+            try:
+                kind, event = events.get(timeout=max(0, deadline - time.time()))
+            except queue.Empty:
+                break
+            if kind == 'error':
+                print(event)
+                continue
+            if kind == 'closed':
+                closed += 1
+                continue
+            obj = event['object']
+            if kind == 'events':
+                update_pulled(pulled, obj, time.time())
+                continue
+            node_name = obj['metadata'].get('labels', {}).get('node_name')
+            if event['type'] == 'DELETED':
+                if node_name in nodes and nodes[node_name]['pod'] == obj['metadata']['name']:
+                    del nodes[node_name]
+                continue
+            rollout = gen_node_rollout(obj)
+            if node_name not in nodes or nodes[node_name]['pod'] == rollout['pod'] or (rollout['created'] or 0) >= (nodes[node_name]['created'] or 0):
+                if node_name not in nodes or nodes[node_name]['ready'] != rollout['ready']:
+                    print('{} {} ready: {}'.format(node_name, rollout['pod'], rollout['ready'] is not None))
+                nodes[node_name] = rollout
+            is_ready = len(nodes) >= nodes_count and all(rollout['ready'] for rollout in nodes.values())
+
+    report = gen_rollout_report(args, nodes, pulled)
+    report['is_ready'] = is_ready
+    print_rollout_timeline(report)
+    report_path = os.path.join(work_dir, '{}-rollout-{}.json'.format(args.chain_name, int(time.time())))
+    with open(report_path, 'wt') as stream:
+        json.dump(report, stream, indent=2)
+    print("report_path:", report_path)
+    if not is_ready:
+        print('{} of {} nodes ready'.format(sum(1 for rollout in nodes.values() if rollout['ready']), nodes_count))
+        sys.exit(1)
+    print("Done!!!")
+
+
+# probe
+# ip of each node of multi cluster, from index of inventory or network config
+# node0 has all other nodes as peers, node1 has node0 as the first peer
+def load_node_ips(work_dir, chain_name):
+    index_path = os.path.join(work_dir, '{}-index.toml'.format(chain_name))
+    if os.path.exists(index_path):
+        ips = {}
+        for cluster_index in toml.load(index_path)['clusters'].values():
+            ips.update(zip(cluster_index['nodes'], cluster_index['ips']))
+        return [ips[i] for i in sorted(ips)]
+    ips = []
+    for index in [1, 0]:
+        net_config_file = os.path.join(work_dir, 'cita-cloud/{}/node{}/network-config.toml'.format(chain_name, index))
+        if os.path.exists(net_config_file):
+            peers = toml.load(net_config_file)['peers']
+            ips = [peer['ip'] for peer in peers[:1]] if index == 1 else ips + [peer['ip'] for peer in peers]
+    return ips
+
+
+# controller address of each node, from the rendered services
+# local cluster: service of node in {chain_name}.yaml, the name resolves only in the cluster
+# multi cluster: ip of node and rpc port of all-{chain_name}-{i} in {chain_name}-{i}.yaml
+def load_probe_targets(work_dir, chain_name, nodes=None):
+    local_yaml_path = os.path.join(work_dir, '{}.yaml'.format(chain_name))
+    if os.path.exists(local_yaml_path):
+        with open(local_yaml_path) as stream:
+            objs = [obj for obj in yaml.safe_load_all(stream) if obj]
+        targets = []
+        for obj in objs:
+            if obj['kind'] != 'Service' or 'node_name' not in obj['spec'].get('selector', {}):
+                continue
+            ports = [port['port'] for port in obj['spec']['ports'] if port.get('targetPort') == CONTROLLER_RPC_PORT]
+            if ports:
+                targets.append('{}:{}'.format(obj['metadata']['name'], ports[0]))
+        if not targets:
+            print('Can not find rpc port in', local_yaml_path)
+            sys.exit(1)
+        print('targets are services in the cluster, run probe in the cluster or set --targets, e.g. by kubectl port-forward')
+        return targets
+
+    # files of multi_cluster with inventory are in directories of clusters
+    yaml_names = {}
+    index_path = os.path.join(work_dir, '{}-index.toml'.format(chain_name))
+    if os.path.exists(index_path):
+        for cluster_index in toml.load(index_path)['clusters'].values():
+            yaml_names.update(zip(cluster_index['nodes'], cluster_index['files']))
+    nodes_count = len(glob.glob(os.path.join(work_dir, 'cita-cloud/{}/node*/network-config.toml'.format(chain_name))))
+    ips = nodes.split(',') if nodes else load_node_ips(work_dir, chain_name)
+    if not nodes_count or len(ips) != nodes_count:
+        print('Can not find ip of all nodes of {}, set --nodes or --targets'.format(chain_name))
+        sys.exit(1)
+    targets = []
+    for i, ip in enumerate(ips):
+        yaml_path = os.path.join(work_dir, yaml_names.get(i, '{}-{}.yaml'.format(chain_name, i)))
+        with open(yaml_path) as stream:
+            objs = [obj for obj in yaml.safe_load_all(stream) if obj]
+        ports = [port['port'] for obj in objs if obj['kind'] == 'Service' for port in obj['spec']['ports'] if port.get('targetPort') == CONTROLLER_RPC_PORT]
+        if not ports:
+            print('Can not find rpc port in', yaml_path)
+            sys.exit(1)
+        targets.append('{}:{}'.format(ip, ports[0]))
+    return targets
+
+
+# protobuf of common.Flag {bool flag = 1;}
+def encode_flag(flag):
+    return b'\x08\x01' if flag else b''
+
+
+# return (block number, latency) or (None, error)
+async def probe_controller(channel, timeout):
+    get_block_number = channel.unary_unary(GET_BLOCK_NUMBER_METHOD)
+    start = time.monotonic()
+    try:
+        response = await get_block_number(encode_flag(False), timeout=timeout)
+    except Exception as e:
+        return None, str(getattr(e, 'details', lambda: e)())
+    return decode_block_number(response), time.monotonic() - start
+
+
+async def probe_chain(args, targets, stats):
+    channels = [grpc_aio.insecure_channel(target) for target in targets]
+    sample = 0
+    try:
+        while True:
+            results = await asyncio.gather(*[probe_controller(channel, args.timeout) for channel in channels])
+            heights = [height for height, _ in results if height is not None]
+            max_height = max(heights) if heights else None
+            print('sample {} at {}'.format(sample, time.strftime('%H:%M:%S')))
+            for target, (height, result) in zip(targets, results):
+                stat = stats[target]
+                if height is None:
+                    stat['errors'] += 1
+                    print('  {:<32} error: {}'.format(target, result))
+                    continue
+                lag = max_height - height
+                stat['heights'].append(height)
+                stat['latencies'].append(result)
+                stat['max_lag'] = max(stat['max_lag'], lag)
+                print('  {:<32} height: {:<10} lag: {:<6} latency: {:.1f}ms'.format(target, height, lag, result * 1000))
+            sample += 1
+            if not args.interval or (args.count and sample >= args.count):
+                break
+            await asyncio.sleep(args.interval)
+    finally:
+        for channel in channels:
+            await channel.close()
+
+
+def gen_probe_report(args, targets, stats):
+    report = {
+        'chain_name': args.chain_name,
+        'nodes': {},
+    }
+    for target in targets:
+        stat = stats[target]
+        latencies = sorted(stat['latencies'])
+        report['nodes'][target] = {
+            'samples': len(latencies) + stat['errors'],
+            'errors': stat['errors'],
+            'height': stat['heights'][-1] if stat['heights'] else None,
+            'max_lag': stat['max_lag'],
+            'latency': {
+                'p50': percentile(latencies, 50),
+                'p90': percentile(latencies, 90),
+                'p99': percentile(latencies, 99),
+                'max': latencies[-1] if latencies else None,
+            },
+        }
+    return report
+
+
+def run_subcmd_probe(args, work_dir):
+    if grpc_aio is None:
+        print('grpcio must be installed: pip install grpcio')
+        sys.exit(1)
+    if args.targets:
+        targets = args.targets.split(',')
+    else:
+        targets = load_probe_targets(work_dir, args.chain_name, args.nodes)
+    print("targets:", targets)
+
+    stats = {target: {'heights': [], 'latencies': [], 'errors': 0, 'max_lag': 0} for target in targets}
+    try:
+        asyncio.run(probe_chain(args, targets, stats))
+    except KeyboardInterrupt:
+        pass
+
+    report = gen_probe_report(args, targets, stats)
+    print('{:<32}{:>10}{:>10}{:>10}{:>10}{:>10}{:>10}'.format('node', 'height', 'max_lag', 'errors', 'p50', 'p90', 'p99'))
+    for target, node in report['nodes'].items():
+        latency = ['-' if node['latency'][key] is None else '{:.1f}ms'.format(node['latency'][key] * 1000) for key in ['p50', 'p90', 'p99']]
+        print('{:<32}{:>10}{:>10}{:>10}{:>10}{:>10}{:>10}'.format(target, str(node['height']), node['max_lag'], node['errors'], *latency))
+    report_path = os.path.join(work_dir, '{}-probe-{}.json'.format(args.chain_name, int(time.time())))
+    with open(report_path, 'wt') as stream:
+        json.dump(report, stream, indent=2)
+    print("report_path:", report_path)
+    if any(node['errors'] for node in report['nodes'].values()):
+        sys.exit(1)
 
 
 def run_subcmd_local_cluster(args, work_dir):
@@ -1106,84 +4319,191 @@ def run_subcmd_local_cluster(args, work_dir):
         print('kms_password must be set!')
         sys.exit(1)
 
-    if not args.pvc_name:
-        print('pvc_name must be set!')
+    if not args.pvc_name and not args.pvc_map:
+        print('pvc_name or pvc_map must be set!')
         sys.exit(1)
 
+    # rpc nodes follow validators, their index start from peers_count
+    nodes_count = args.peers_count + args.rpc_replicas
+
+    # rpc port and 5 ports of every node, see gen_monitor_service and gen_executor_service
+    if args.port_registry:
+        args.node_port = alloc_port_blocks(args.port_registry, args.chain_name, [-1], 1 + 5 * nodes_count)[0]
+        print('node_port:', args.node_port)
+
+    if args.pvc_map:
+        pvc_names = load_pvc_names(args.pvc_map, args.chain_name, nodes_count)
+    else:
+        pvc_names = [args.pvc_name] * nodes_count
+
     # load service_config
     service_config = load_service_config(args.service_config)
     print("service_config:", service_config)
 
     # verify service_config
     verify_service_config(service_config)
+    verify_startup_config(args)
+    # no published image is known to have python3, grpcio and cldi together
+    if args.bench and not args.bench_image:
+        print('bench_image must be set for bench, an image with python3, grpcio and cldi')
+        sys.exit(1)
 
-    # generate peers info by pod name
-    peers = gen_peers(args.peers_count, args.chain_name)
-    print("peers:", peers)
-
-    # generate network config for all peers
-    net_config_list = gen_net_config_list(peers, args.enable_tls)
-    print("net_config_list:", net_config_list)
-
-    # generate node config
-    timestamp = int(time.time() * 1000)
-    for index, net_config in enumerate(net_config_list):
-        node_path = os.path.join(work_dir, 'cita-cloud/{}/node{}'.format(args.chain_name, index))
-        need_directory(node_path)
-        tx_infos_path = os.path.join(work_dir, 'cita-cloud/{}/node{}/tx_infos'.format(args.chain_name, index))
-        need_directory(tx_infos_path)
-        # generate network config file
-        net_config_file = os.path.join(node_path, 'network-config.toml')
-        with open(net_config_file, 'wt') as stream:
-            toml.dump(net_config, stream)
-        # generate log config
-        gen_log4rs_config(node_path, args.log_level, args.is_stdout)
-        gen_consensus_config(node_path, index)
-        gen_controller_config(node_path, args.block_delay_number)
-        # generate genesis
-        gen_genesis(node_path, timestamp, DEFAULT_PREVHASH)
+    # apply performance profile
+    apply_profile(args, service_config)
 
+    # pd and tikv of the chain
+    if args.need_tikv:
+        if "tikv" not in find_docker_image(service_config, "storage"):
+            print('need_tikv is only for storage_tikv')
+            sys.exit(1)
+        wire_tikv_storage(service_config, args.chain_name)
+
+    checkpoint = load_checkpoint(work_dir, args.chain_name, gen_stage_inputs(args, service_config, nodes_count), args.restart_from)
+    print("stages done:", checkpoint['stages'])
+
+    if 'config' not in checkpoint['stages']:
+        # generate peers info by pod name
+        peers = gen_peers(nodes_count, args.chain_name)
+        print("peers:", peers)
+
+        # generate network config for all peers
+        net_config_list = gen_net_config_list(peers, args.enable_tls)
+        print("net_config_list:", net_config_list)
+
+        # generate node config
+        log_config = gen_log_config(args, service_config)
+        # genesis of an existing chain is kept when only other inputs of config changed
+        timestamp = checkpoint.setdefault('genesis', {}).setdefault('timestamp', int(time.time() * 1000))
+        for index, net_config in enumerate(net_config_list):
+            node_path = os.path.join(work_dir, 'cita-cloud/{}/node{}'.format(args.chain_name, index))
+            need_directory(node_path)
+            tx_infos_path = os.path.join(work_dir, 'cita-cloud/{}/node{}/tx_infos'.format(args.chain_name, index))
+            need_directory(tx_infos_path)
+            # generate network config file
+            net_config_file = os.path.join(node_path, 'network-config.toml')
+            with open(net_config_file, 'wt') as stream:
+                toml.dump(net_config, stream)
+            # generate log config
+            gen_log4rs_config(node_path, log_config, service_config)
+            gen_consensus_config(node_path, index, find_service(service_config, 'consensus'))
+            gen_controller_config(node_path, args.block_delay_number, find_service(service_config, 'controller'))
+            # generate genesis
+            gen_genesis(node_path, timestamp, DEFAULT_PREVHASH)
+        finish_stage(work_dir, args.chain_name, checkpoint, 'config')
 
-    # generate init_sys_config
     # is bft
     consensus_docker_image = find_docker_image(service_config, "consensus")
     is_bft = "bft" in consensus_docker_image
 
+    # accounts of nodes done are kept, a rerun continues from the failed node
     kms_docker_image = find_docker_image(service_config, "kms")
-    super_admin = gen_super_admin(work_dir, args.chain_name, kms_docker_image, args.kms_password)
-    if is_bft:
-        authorities = gen_sm2_authorities(work_dir, args.chain_name, args.peers_count)
-    else:
-        authorities = gen_authorities(work_dir, args.chain_name, kms_docker_image, args.kms_password, args.peers_count)
-    gen_init_sysconfig(work_dir, args.chain_name, super_admin, authorities, args.peers_count)
+    accounts = checkpoint.setdefault('accounts', {})
+    if 'accounts' not in checkpoint['stages']:
+        if 'super_admin' not in accounts:
+            accounts['super_admin'] = gen_super_admin(work_dir, args.chain_name, kms_docker_image, args.kms_password)
+            save_checkpoint(work_dir, args.chain_name, checkpoint)
+        authorities = accounts.setdefault('authorities', [])
+        for i in range(len(authorities), nodes_count):
+            if is_bft:
+                authorities.append(gen_sm2_authority(work_dir, args.chain_name, i))
+            else:
+                authorities.append(gen_authority(work_dir, args.chain_name, kms_docker_image, args.kms_password, i))
+            save_checkpoint(work_dir, args.chain_name, checkpoint)
+        finish_stage(work_dir, args.chain_name, checkpoint, 'accounts')
+    super_admin = accounts['super_admin']
+    authorities = accounts['authorities']
+
+    # generate init_sys_config
+    if 'sysconfig' not in checkpoint['stages']:
+        # rpc nodes are not validators
+        gen_init_sysconfig(work_dir, args.chain_name, super_admin, authorities[:args.peers_count], nodes_count, args.block_interval)
+        finish_stage(work_dir, args.chain_name, checkpoint, 'sysconfig')
 
     # generate syncthing config
-    sync_peers = gen_sync_peers(work_dir, args.peers_count, args.chain_name)
-    print("sync_peers:", sync_peers)
-    gen_sync_configs(work_dir, sync_peers, args.chain_name)
+    is_need_sync = is_sync_enabled(args, service_config)
+    if is_need_sync and 'sync' not in checkpoint['stages']:
+        sync_peers = checkpoint.setdefault('sync', {}).setdefault('peers', [])
+        for i in range(len(sync_peers), nodes_count):
+            sync_peers.append(gen_sync_peer(work_dir, i, args.chain_name))
+            save_checkpoint(work_dir, args.chain_name, checkpoint)
+        print("sync_peers:", sync_peers)
+        gen_sync_configs(work_dir, sync_peers, args.chain_name, service_config)
+        finish_stage(work_dir, args.chain_name, checkpoint, 'sync')
 
     # is chaincode executor
     executor_docker_image = find_docker_image(service_config, "executor")
     is_chaincode_executor = "chaincode" in executor_docker_image
 
     # generate k8s yaml
+    is_shared_monitor = args.need_monitor and args.monitor_mode == MONITOR_MODE_SHARED
     k8s_config = []
     kms_secret = gen_kms_secret(args.kms_password, gen_kms_secret_name(args.chain_name))
     k8s_config.append(kms_secret)
-    grpc_service = gen_grpc_service(args.chain_name, args.node_port)
+    if args.rpc_replicas:
+        grpc_service = gen_grpc_service(args.chain_name, args.node_port, NODE_ROLE_RPC, args.rpc_session_affinity)
+    else:
+        grpc_service = gen_grpc_service(args.chain_name, args.node_port, None, args.rpc_session_affinity)
     k8s_config.append(grpc_service)
-    for i in range(args.peers_count):
+    for i in range(nodes_count):
         netwok_secret = gen_network_secret(args.chain_name, i)
         k8s_config.append(netwok_secret)
-        network_service = gen_network_service(i, args.chain_name)
+        # rpc of each node is exposed for probe and shared monitor
+        network_service = gen_network_service(i, args.chain_name, is_need_sync, True)
         k8s_config.append(network_service)
-        deployment = gen_node_deployment(i, service_config, args.chain_name, args.pvc_name, args.state_db_user, args.state_db_password, args.need_monitor, gen_kms_secret_name(args.chain_name), args.need_debug)
+        deployment = gen_local_node_deployment(args, service_config, i, pvc_names[i], is_need_sync)
         k8s_config.append(deployment)
         if args.need_monitor:
-            monitor_service = gen_monitor_service(i, args.chain_name, args.node_port)
+            monitor_service = gen_monitor_service(i, args.chain_name, args.node_port, is_shared_monitor)
             k8s_config.append(monitor_service)
         executor_service = gen_executor_service(i, args.chain_name, args.node_port, is_chaincode_executor)
         k8s_config.append(executor_service)
+    if is_state_db_needed(service_config):
+        k8s_config.append(gen_state_db_configmap(args.chain_name, service_config))
+    is_raft = "raft" in find_docker_image(service_config, "consensus")
+    # a pdb of chain without tolerated faults blocks every drain, every update stops blocks anyway
+    tolerated_faults = gen_tolerated_faults(args.peers_count, is_raft)
+    if tolerated_faults:
+        k8s_config.append(gen_validator_pdb(args.chain_name, args.peers_count, tolerated_faults))
+        print('wave_size of apply should be at most', tolerated_faults)
+    else:
+        print('{} validators tolerate no fault, no pdb is generated, blocks stop while a validator is updated or drained'.format(args.peers_count))
+
+    # prometheus and grafana config
+    if args.need_monitor:
+        targets = []
+        for i in range(nodes_count):
+            if not is_shared_monitor:
+                targets.append(('monitor-{}-{}:9256'.format(args.chain_name, i), get_node_pod_name(i, args.chain_name)))
+            targets.append(('monitor-{}-{}:9349'.format(args.chain_name, i), get_node_pod_name(i, args.chain_name)))
+        write_monitor_config(work_dir, args.chain_name, args.monitor_config, is_shared_monitor, targets)
+
+    # bench job is applied after chain is ready
+    if args.bench:
+        bench_config = gen_bench_config(args, service_config, pvc_names[0])
+        apply_image_policy(bench_config, args.image_pull_policy, load_image_lock(args.image_lock))
+        yaml_ptah = os.path.join(work_dir, '{}-bench.yaml'.format(args.chain_name))
+        print("yaml_ptah:{}", yaml_ptah)
+        with open(yaml_ptah, 'wt') as stream:
+            yaml.dump_all(bench_config, stream, sort_keys=False)
+
+    # image pull policy and digests
+    apply_image_policy(k8s_config, args.image_pull_policy, load_image_lock(args.image_lock))
+    images = gen_images(k8s_config)
+    if is_shared_monitor:
+        images.extend(image for image in write_monitor_process_config(work_dir, args.monitor_config, args.image_pull_policy, load_image_lock(args.image_lock)) if image not in images)
+    if args.need_tikv:
+        tikv_config = gen_tikv_config_objects(args.chain_name, service_config, args.peers_count)
+        apply_image_policy(tikv_config, args.image_pull_policy, load_image_lock(args.image_lock))
+        images.extend(image for image in gen_images(tikv_config) if image not in images)
+        yaml_ptah = os.path.join(work_dir, '{}-tikv.yaml'.format(args.chain_name))
+        print("yaml_ptah:{}", yaml_ptah)
+        with open(yaml_ptah, 'wt') as stream:
+            yaml.dump_all(tikv_config, stream, sort_keys=False)
+
+    if args.need_prepull:
+        write_prepull_config(work_dir, args.chain_name, images, args.image_pull_policy)
+
+    write_changed_config(work_dir, args.chain_name, args.chain_name, k8s_config, args.changed_only)
 
     # write k8s_config to yaml file
     yaml_ptah = os.path.join(work_dir, '{}.yaml'.format(args.chain_name))
@@ -1203,7 +4523,7 @@ def gen_sync_peers_mc(nodes, node_ports, sync_device_ids):
     return list(map(lambda ip, port, device_id: {'ip': ip, 'port': port + 1, 'device_id': device_id}, nodes, node_ports, sync_device_ids))
 
 
-def gen_all_service(i, chain_name, node_port, token, is_need_monitor, is_need_debug, is_chaincode_executor):
+def gen_all_service(i, chain_name, node_port, token, is_need_monitor, is_need_debug, is_chaincode_executor, is_need_sync=True):
     ports = [
         {
             'port': node_port,
@@ -1226,6 +4546,9 @@ def gen_all_service(i, chain_name, node_port, token, is_need_monitor, is_need_de
             'name': 'call',
         },
     ]
+    if not is_need_sync:
+        # port of sync is still reserved
+        ports = [port for port in ports if port['name'] != 'sync']
     if is_need_monitor:
         process_port = {
             'port': node_port + 4,
@@ -1285,6 +4608,107 @@ def gen_kms_secret_name_mc(chain_name, i):
     return 'kms-secret-{}-{}'.format(chain_name, i)
 
 
+def load_inventory(inventory):
+    with open(inventory) as stream:
+        if inventory.endswith('.json'):
+            return json.load(stream)
+        return toml.load(stream)
+
+
+# check all nodes in one pass, print every error found
+def verify_inventory(inventory, is_need_sync, is_port_allocated):
+    errors = []
+    nodes = inventory.get('nodes', [])
+    if not nodes:
+        errors.append('no nodes')
+    fields = list(INVENTORY_NODE_FIELDS)
+    if is_need_sync:
+        fields.append('sync_device_id')
+    if not is_port_allocated:
+        fields.append('node_port')
+    for i, node in enumerate(nodes):
+        for field in fields:
+            if not node.get(field):
+                errors.append('node {}: {} must be set'.format(i, field))
+        if 'node_port' in node and not isinstance(node['node_port'], int):
+            errors.append('node {}: node_port must be int'.format(i))
+    for field in ['authority', 'sync_device_id', 'lbs_token']:
+        values = [node[field] for node in nodes if node.get(field)]
+        for value in set(values):
+            if values.count(value) > 1:
+                errors.append('{} {} is duplicated'.format(field, value))
+    addrs = ['{}:{}'.format(node.get('ip'), node['node_port']) for node in nodes if 'node_port' in node]
+    for addr in set(addrs):
+        if addrs.count(addr) > 1:
+            errors.append('address {} is duplicated'.format(addr))
+    if errors:
+        for error in errors:
+            print('inventory:', error)
+        sys.exit(1)
+
+
+# render yaml files of nodes in one cluster, run in a worker process
+def render_cluster_config(args, work_dir, service_config, layout, cluster, indexes):
+    files = []
+    images = []
+    image_lock = load_image_lock(args.image_lock)
+    for i in indexes:
+        k8s_config = []
+        kms_secret = gen_kms_secret(layout['kms_passwords'][i], gen_kms_secret_name_mc(args.chain_name, i))
+        k8s_config.append(kms_secret)
+        netwok_secret = gen_network_secret(args.chain_name, i)
+        k8s_config.append(netwok_secret)
+        deployment = gen_node_deployment(i, service_config, args.chain_name, layout['pvc_names'][i], args.state_db_user, args.state_db_password, args.need_monitor, gen_kms_secret_name_mc(args.chain_name, i), args.need_debug, gen_volume_classes(args), layout['is_need_sync'], startup_config=gen_startup_config(args))
+        k8s_config.append(deployment)
+        all_service = gen_all_service(i, args.chain_name, layout['node_ports'][i], layout['lbs_tokens'][i], args.need_monitor, args.need_debug, layout['is_chaincode_executor'], layout['is_need_sync'])
+        k8s_config.append(all_service)
+        if is_state_db_needed(service_config):
+            k8s_config.append(gen_state_db_configmap(args.chain_name, service_config))
+        apply_image_policy(k8s_config, args.image_pull_policy, image_lock)
+        images.extend(image for image in gen_images(k8s_config) if image not in images)
+        yaml_name = os.path.join(cluster, '{}-{}'.format(args.chain_name, i))
+        need_directory(os.path.join(work_dir, cluster))
+        write_changed_config(work_dir, args.chain_name, yaml_name, k8s_config, args.changed_only)
+        # write k8s_config to yaml file
+        yaml_ptah = os.path.join(work_dir, '{}.yaml'.format(yaml_name))
+        print("yaml_ptah:{}", yaml_ptah)
+        with open(yaml_ptah, 'wt') as stream:
+            yaml.dump_all(k8s_config, stream, sort_keys=False)
+        files.append('{}.yaml'.format(yaml_name))
+
+    # validators in one cluster of inventory, a drain of the cluster keeps at most tolerated faults of them unavailable
+    # clusters holding no more than tolerated faults need no pdb, chain without tolerated faults has none as local_cluster
+    tolerated_faults = layout['tolerated_faults']
+    if cluster and tolerated_faults and len(indexes) > tolerated_faults:
+        k8s_config = [gen_validator_pdb(args.chain_name, len(indexes), tolerated_faults)]
+        yaml_name = os.path.join(cluster, '{}-pdb'.format(args.chain_name))
+        write_changed_config(work_dir, args.chain_name, yaml_name, k8s_config, args.changed_only)
+        yaml_ptah = os.path.join(work_dir, '{}.yaml'.format(yaml_name))
+        print("yaml_ptah:{}", yaml_ptah)
+        with open(yaml_ptah, 'wt') as stream:
+            yaml.dump_all(k8s_config, stream, sort_keys=False)
+        files.append('{}.yaml'.format(yaml_name))
+    return files, images
+
+
+# files to apply of each cluster
+def write_cluster_index(work_dir, chain_name, clusters, cluster_files, nodes):
+    index = {
+        'chain_name': chain_name,
+        'clusters': {},
+    }
+    for cluster, files in cluster_files.items():
+        index['clusters'][cluster] = {
+            'nodes': [i for i, node_cluster in enumerate(clusters) if node_cluster == cluster],
+            'ips': [nodes[i] for i, node_cluster in enumerate(clusters) if node_cluster == cluster],
+            'files': files,
+        }
+    index_path = os.path.join(work_dir, '{}-index.toml'.format(chain_name))
+    print("index_path:", index_path)
+    with open(index_path, 'wt') as stream:
+        toml.dump(index, stream)
+
+
 def run_subcmd_multi_cluster(args, work_dir):
     # load service_config
     service_config = load_service_config(args.service_config)
@@ -1292,20 +4716,52 @@ def run_subcmd_multi_cluster(args, work_dir):
 
     # verify service_config
     verify_service_config(service_config)
+    verify_startup_config(args)
+
+    # apply performance profile
+    apply_profile(args, service_config)
     
     # parse and check arguments
-    if not args.super_admin:
+    is_need_sync = is_sync_enabled(args, service_config)
+    if args.inventory:
+        inventory = load_inventory(args.inventory)
+        verify_inventory(inventory, is_need_sync, bool(args.port_registry) and not all('node_port' in node for node in inventory.get('nodes', [])))
+        inventory_nodes = inventory['nodes']
+        super_admin = args.super_admin or inventory.get('super_admin')
+        clusters = [str(node['cluster']) for node in inventory_nodes]
+        nodes = [node['ip'] for node in inventory_nodes]
+        lbs_tokens = [node['lbs_token'] for node in inventory_nodes]
+        authorities = [node['authority'] for node in inventory_nodes]
+        if is_need_sync:
+            sync_device_ids = [node['sync_device_id'] for node in inventory_nodes]
+        kms_passwords = [node['kms_password'] for node in inventory_nodes]
+        pvc_names = [node['pvc_name'] for node in inventory_nodes]
+        if all('node_port' in node for node in inventory_nodes):
+            args.node_ports = ','.join(str(node['node_port']) for node in inventory_nodes)
+    else:
+        super_admin = args.super_admin
+        nodes = args.nodes.split(',')
+        # files of all nodes are in work_dir
+        clusters = [''] * len(nodes)
+        lbs_tokens = args.lbs_tokens.split(',')
+        authorities = args.authorities.split(',')
+        if is_need_sync:
+            sync_device_ids = args.sync_device_ids.split(',')
+        kms_passwords = args.kms_passwords.split(',')
+        pvc_names = args.pvc_names.split(',')
+    if not super_admin:
         print('super_admin must be set!')
         sys.exit(1)
-    nodes = args.nodes.split(',')
-    lbs_tokens = args.lbs_tokens.split(',')
-    authorities = args.authorities.split(',')
-    sync_device_ids = args.sync_device_ids.split(',')
-    kms_passwords = args.kms_passwords.split(',')
-    node_ports = list(map(lambda x : int(x), args.node_ports.split(',')))
-    pvc_names = args.pvc_names.split(',')
 
     peers_count = len(nodes)
+    if args.node_ports:
+        node_ports = list(map(lambda x : int(x), args.node_ports.split(',')))
+    elif args.port_registry:
+        node_ports = alloc_port_blocks(args.port_registry, args.chain_name, list(range(peers_count)), MC_NODE_PORTS_SIZE)
+        print('node_ports:', node_ports)
+    else:
+        print('node_ports or port_registry must be set!')
+        sys.exit(1)
     if len(lbs_tokens) != peers_count:
         print('The len of lbs_tokens is invalid')
         sys.exit(1)
@@ -1314,7 +4770,7 @@ def run_subcmd_multi_cluster(args, work_dir):
         print('The len of authorities is invalid')
         sys.exit(1)
     
-    if len(sync_device_ids) != peers_count:
+    if is_need_sync and len(sync_device_ids) != peers_count:
         print('The len of sync_device_ids is invalid')
         sys.exit(1)
 
@@ -1339,6 +4795,7 @@ def run_subcmd_multi_cluster(args, work_dir):
     print("net_config_list:", net_config_list)
 
     # generate node config
+    log_config = gen_log_config(args, service_config)
     if args.timestamp:
         timestamp = args.timestamp
     else:
@@ -1355,40 +4812,59 @@ def run_subcmd_multi_cluster(args, work_dir):
         with open(net_config_file, 'wt') as stream:
             toml.dump(net_config, stream)
         # generate log config
-        gen_log4rs_config(node_path, args.log_level, args.is_stdout)
-        gen_consensus_config(node_path, index)
-        gen_controller_config(node_path, args.block_delay_number)
+        gen_log4rs_config(node_path, log_config, service_config)
+        gen_consensus_config(node_path, index, find_service(service_config, 'consensus'))
+        gen_controller_config(node_path, args.block_delay_number, find_service(service_config, 'controller'))
         # generate genesis
         gen_genesis(node_path, timestamp, DEFAULT_PREVHASH)
 
     # generate init_sys_config
-    gen_init_sysconfig(work_dir, args.chain_name, args.super_admin, authorities, peers_count)
+    gen_init_sysconfig(work_dir, args.chain_name, super_admin, authorities, peers_count, args.block_interval)
     
     # generate syncthing config
-    sync_peers = gen_sync_peers_mc(nodes, node_ports, sync_device_ids)
-    print("sync_peers:", sync_peers)
-    gen_sync_configs(work_dir, sync_peers, args.chain_name)
+    if is_need_sync:
+        sync_peers = gen_sync_peers_mc(nodes, node_ports, sync_device_ids)
+        print("sync_peers:", sync_peers)
+        gen_sync_configs(work_dir, sync_peers, args.chain_name, service_config)
 
     # is chaincode executor
     executor_docker_image = find_docker_image(service_config, "executor")
     is_chaincode_executor = "chaincode" in executor_docker_image
 
-    # generate k8s yaml
-    for i in range(peers_count):
-        k8s_config = []
-        kms_secret = gen_kms_secret(kms_passwords[i], gen_kms_secret_name_mc(args.chain_name, i))
-        k8s_config.append(kms_secret)
-        netwok_secret = gen_network_secret(args.chain_name, i)
-        k8s_config.append(netwok_secret)
-        deployment = gen_node_deployment(i, service_config, args.chain_name, pvc_names[i], args.state_db_user, args.state_db_password, args.need_monitor, gen_kms_secret_name_mc(args.chain_name, i), args.need_debug)
-        k8s_config.append(deployment)
-        all_service = gen_all_service(i, args.chain_name, node_ports[i], lbs_tokens[i], args.need_monitor, args.need_debug, is_chaincode_executor)
-        k8s_config.append(all_service)
-        # write k8s_config to yaml file
-        yaml_ptah = os.path.join(work_dir, '{}-{}.yaml'.format(args.chain_name, i))
-        print("yaml_ptah:{}", yaml_ptah)
-        with open(yaml_ptah, 'wt') as stream:
-            yaml.dump_all(k8s_config, stream, sort_keys=False)
+    # generate k8s yaml, clusters are rendered in parallel
+    layout = {
+        'kms_passwords': kms_passwords,
+        'pvc_names': pvc_names,
+        'node_ports': node_ports,
+        'lbs_tokens': lbs_tokens,
+        'is_need_sync': is_need_sync,
+        'is_chaincode_executor': is_chaincode_executor,
+        'tolerated_faults': gen_tolerated_faults(peers_count, "raft" in find_docker_image(service_config, "consensus")),
+    }
+    cluster_indexes = {}
+    for i, cluster in enumerate(clusters):
+        cluster_indexes.setdefault(cluster, []).append(i)
+    cluster_files = {}
+    images = []
+    with ProcessPoolExecutor(max_workers=args.jobs or None) as executor:
+        futures = {cluster: executor.submit(render_cluster_config, args, work_dir, service_config, layout, cluster, indexes) for cluster, indexes in cluster_indexes.items()}
+        for cluster, future in futures.items():
+            files, cluster_images = future.result()
+            cluster_files[cluster] = files
+            images.extend(image for image in cluster_images if image not in images)
+    if args.inventory:
+        write_cluster_index(work_dir, args.chain_name, clusters, cluster_files, nodes)
+
+    if args.need_prepull:
+        write_prepull_config(work_dir, args.chain_name, images, args.image_pull_policy)
+
+    # prometheus scrape config through load balancers
+    if args.need_monitor:
+        targets = []
+        for i in range(peers_count):
+            targets.append(('{}:{}'.format(nodes[i], node_ports[i] + 4), get_node_pod_name(i, args.chain_name)))
+            targets.append(('{}:{}'.format(nodes[i], node_ports[i] + 5), get_node_pod_name(i, args.chain_name)))
+        write_monitor_config(work_dir, args.chain_name, MONITOR_CONFIG_STATIC, False, targets)
 
     print("Done!!!")
 
@@ -1399,12 +4875,22 @@ def main():
     funcs_router = {
         SUBCMD_LOCAL_CLUSTER: run_subcmd_local_cluster,
         SUBCMD_MULTI_CLUSTER: run_subcmd_multi_cluster,
+        SUBCMD_PORTS: run_subcmd_ports,
+        SUBCMD_PLAN: run_subcmd_plan,
+        SUBCMD_APPLY: run_subcmd_apply,
+        SUBCMD_WATCH: run_subcmd_watch,
+        SUBCMD_PROBE: run_subcmd_probe,
     }
-    work_dir = os.path.abspath(args.work_dir)
+    work_dir = os.path.abspath(getattr(args, 'work_dir', '.'))
     funcs_router[args.subcmd](args, work_dir)
 
 
 if __name__ == '__main__':
     SUBCMD_LOCAL_CLUSTER = 'local_cluster'
     SUBCMD_MULTI_CLUSTER = 'multi_cluster'
+    SUBCMD_PORTS = 'ports'
+    SUBCMD_PLAN = 'plan'
+    SUBCMD_APPLY = 'apply'
+    SUBCMD_WATCH = 'watch'
+    SUBCMD_PROBE = 'probe'
     main()
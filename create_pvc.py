@@ -4,8 +4,20 @@
 
 import argparse
 import os
+import toml
 import yaml
 
+DEFAULT_PV_CAPACITY = '100Gi'
+
+DEFAULT_PVC_REQUEST = '10Gi'
+
+NFS_CSI_PROVISIONER = 'nfs.csi.k8s.io'
+
+# sub directory of each pvc under nfs_path, csi-driver-nfs expands the pvc fields
+# a known path lets node configs be copied in before the chain starts
+NFS_CSI_SUB_DIR = '${pvc.metadata.namespace}/${pvc.metadata.name}'
+
+
 def parse_arguments():
     parser = argparse.ArgumentParser()
     subparsers = parser.add_subparsers(
@@ -24,6 +36,31 @@ def parse_arguments():
     plocal_pvc.add_argument(
             '--node_list', default='minikube', help='Host name list of nodes of k8s cluster.')
 
+    #
+    # Subcommand: node_local_pvc
+    #
+
+    pnode_local_pvc = subparsers.add_parser(
+        SUBCMD_NODE_LOCAL_PVC, help='Create one local pv/pvc for each node of chain.')
+
+    pnode_local_pvc.add_argument(
+        '--chain_name', default='test-chain', help='The name of chain.')
+
+    pnode_local_pvc.add_argument(
+        '--peers_count',
+        type=int,
+        default=2,
+        help='Count of peers.')
+
+    pnode_local_pvc.add_argument(
+        '--data_dir', default='/mnt/nvme/cita-cloud-datadir', help='Root data dir on the fast disk of each host.')
+
+    pnode_local_pvc.add_argument(
+        '--node_list', default='minikube', help='Host name list of nodes of k8s cluster, chain nodes are assigned to them in turn.')
+
+    pnode_local_pvc.add_argument(
+        '--capacity', default=DEFAULT_PV_CAPACITY, help='Capacity of each pv.')
+
     #
     # Subcommand: nfs_pvc
     #
@@ -37,6 +74,65 @@ def parse_arguments():
     pnfs_pvc.add_argument(
         '--nfs_path', help='Path of nfs server.')
 
+    pnfs_pvc.add_argument(
+        '--capacity', default=DEFAULT_PV_CAPACITY, help='Capacity of pv.')
+
+    pnfs_pvc.add_argument(
+        '--request', default=DEFAULT_PVC_REQUEST, help='Storage request of pvc.')
+
+    pnfs_pvc.add_argument(
+        '--access_mode', default='ReadWriteMany', help='Access mode of pv/pvc.')
+
+    pnfs_pvc.add_argument(
+        '--nfs_version', help='Mount option nfsvers, e.g. 4.1.')
+
+    pnfs_pvc.add_argument(
+        '--nconnect',
+        type=int,
+        help='Mount option nconnect, count of tcp connections to nfs server.')
+
+    pnfs_pvc.add_argument(
+        '--rsize',
+        type=int,
+        help='Mount option rsize in bytes, e.g. 1048576.')
+
+    pnfs_pvc.add_argument(
+        '--wsize',
+        type=int,
+        help='Mount option wsize in bytes, e.g. 1048576.')
+
+    pnfs_pvc.add_argument(
+        '--noatime',
+        type=bool,
+        default=False,
+        help='Is add mount option noatime')
+
+    pnfs_pvc.add_argument(
+        '--actimeo',
+        type=int,
+        help='Mount option actimeo in seconds.')
+
+    pnfs_pvc.add_argument(
+        '--mount_options', help='Extra mount option list.')
+
+    pnfs_pvc.add_argument(
+        '--dynamic',
+        type=bool,
+        default=False,
+        help='Is create StorageClass of nfs csi provisioner and one pvc for each node of chain')
+
+    pnfs_pvc.add_argument(
+        '--provisioner', default=NFS_CSI_PROVISIONER, help='Provisioner of the nfs StorageClass.')
+
+    pnfs_pvc.add_argument(
+        '--chain_name', default='test-chain', help='The name of chain.')
+
+    pnfs_pvc.add_argument(
+        '--peers_count',
+        type=int,
+        default=2,
+        help='Count of peers.')
+
     args = parser.parse_args()
     return args
 
@@ -63,7 +159,7 @@ def run_subcmd_local_pvc(args, work_dir):
         },
         'spec': {
             'capacity': {
-                'storage': '100Gi',
+                'storage': DEFAULT_PV_CAPACITY,
             },
             'accessModes': [
                 'ReadWriteMany',
@@ -103,7 +199,7 @@ def run_subcmd_local_pvc(args, work_dir):
             ],
             'resources': {
                 'requests': {
-                    'storage': '10Gi',
+                    'storage': DEFAULT_PVC_REQUEST,
                 },
             },
             'storageClassName': 'local-storage',
@@ -120,7 +216,216 @@ def run_subcmd_local_pvc(args, work_dir):
     print("Done!!!")
 
 
+def gen_node_pvc_name(chain_name, i):
+    return 'local-pvc-{}-{}'.format(chain_name, i)
+
+
+# each pv has a dir of its own, hosts may have more than one node
+def gen_node_local_path(data_dir, chain_name, i):
+    return os.path.join(data_dir, '{}-node{}'.format(chain_name, i))
+
+
+def gen_node_pv_name(chain_name, i):
+    return 'local-pv-{}-{}'.format(chain_name, i)
+
+
+# the pvc map is used by create_k8s_config.py as --pvc_map
+def write_pvc_map(work_dir, chain_name, pvc_names, hosts):
+    pvc_map = {
+        'chain_name': chain_name,
+        'pvc_names': pvc_names,
+    }
+    if hosts:
+        pvc_map['hosts'] = hosts
+    path = os.path.join(work_dir, '{}-pvc-map.toml'.format(chain_name))
+    print("pvc_map_path:", path)
+    with open(path, 'wt') as stream:
+        toml.dump(pvc_map, stream)
+
+
+def run_subcmd_node_local_pvc(args, work_dir):
+    node_list = args.node_list.split(',')
+
+    k8s_config = []
+    storage_class = {
+        'kind': 'StorageClass',
+        'apiVersion': 'storage.k8s.io/v1',
+        'metadata': {
+            'name': 'local-storage',
+        },
+        'provisioner': 'kubernetes.io/no-provisioner',
+        'volumeBindingMode': 'WaitForFirstConsumer',
+    }
+    k8s_config.append(storage_class)
+
+    pvc_names = []
+    hosts = []
+    for i in range(args.peers_count):
+        # assign chain nodes to hosts in turn
+        host = node_list[i % len(node_list)]
+        local_pv = {
+            'apiVersion': 'v1',
+            'kind': 'PersistentVolume',
+            'metadata': {
+                'name': gen_node_pv_name(args.chain_name, i),
+            },
+            'spec': {
+                'capacity': {
+                    'storage': args.capacity,
+                },
+                'accessModes': [
+                    'ReadWriteOnce',
+                ],
+                'persistentVolumeReclaimPolicy': 'Retain',
+                'storageClassName': 'local-storage',
+                'local': {
+                    'path': gen_node_local_path(args.data_dir, args.chain_name, i),
+                },
+                'nodeAffinity': {
+                    'required': {
+                        'nodeSelectorTerms': [
+                            {
+                                'matchExpressions': [
+                                    {
+                                        'key': 'kubernetes.io/hostname',
+                                        'operator': 'In',
+                                        'values': [host]
+                                    },
+                                ],
+                            },
+                        ],
+                    },
+                },
+            },
+        }
+        k8s_config.append(local_pv)
+        local_pvc = {
+            'kind': 'PersistentVolumeClaim',
+            'apiVersion': 'v1',
+            'metadata': {
+                'name': gen_node_pvc_name(args.chain_name, i),
+            },
+            'spec': {
+                'accessModes': [
+                    'ReadWriteOnce',
+                ],
+                'resources': {
+                    'requests': {
+                        'storage': args.capacity,
+                    },
+                },
+                'storageClassName': 'local-storage',
+                # bind to the pv of this node
+                'volumeName': gen_node_pv_name(args.chain_name, i),
+            },
+        }
+        k8s_config.append(local_pvc)
+        pvc_names.append(gen_node_pvc_name(args.chain_name, i))
+        hosts.append(host)
+        # pods mount the pv with subPath cita-cloud/<chain_name>/node<i>
+        print('node{}: {}:{}, copy cita-cloud/{}/node{} into it keeping the path'.format(i, host, gen_node_local_path(args.data_dir, args.chain_name, i), args.chain_name, i))
+
+    # write k8s_config to yaml file
+    yaml_ptah = os.path.join(work_dir, '{}-local-pvc.yaml'.format(args.chain_name))
+    print("yaml_ptah:{}", yaml_ptah)
+    with open(yaml_ptah, 'wt') as stream:
+        yaml.dump_all(k8s_config, stream, sort_keys=False)
+
+    write_pvc_map(work_dir, args.chain_name, pvc_names, hosts)
+
+    print("Done!!!")
+
+
+def gen_nfs_mount_options(args):
+    mount_options = []
+    if args.nfs_version:
+        mount_options.append('nfsvers={}'.format(args.nfs_version))
+    if args.nconnect:
+        mount_options.append('nconnect={}'.format(args.nconnect))
+    if args.rsize:
+        mount_options.append('rsize={}'.format(args.rsize))
+    if args.wsize:
+        mount_options.append('wsize={}'.format(args.wsize))
+    if args.noatime:
+        mount_options.append('noatime')
+    if args.actimeo is not None:
+        mount_options.append('actimeo={}'.format(args.actimeo))
+    if args.mount_options:
+        mount_options.extend(args.mount_options.split(','))
+    return mount_options
+
+
+def gen_nfs_pvc_name(chain_name, i):
+    return 'nfs-pvc-{}-{}'.format(chain_name, i)
+
+
+# StorageClass of nfs csi provisioner
+# each pvc gets its own sub directory under nfs_path
+def run_subcmd_dynamic_nfs_pvc(args, work_dir, mount_options):
+    k8s_config = []
+    storage_class = {
+        'kind': 'StorageClass',
+        'apiVersion': 'storage.k8s.io/v1',
+        'metadata': {
+            'name': 'nfs-storage',
+        },
+        'provisioner': args.provisioner,
+        'parameters': {
+            'server': args.nfs_server,
+            'share': args.nfs_path,
+        },
+        'reclaimPolicy': 'Retain',
+        'volumeBindingMode': 'Immediate',
+    }
+    if args.provisioner == NFS_CSI_PROVISIONER:
+        storage_class['parameters']['subDir'] = NFS_CSI_SUB_DIR
+    if mount_options:
+        storage_class['mountOptions'] = mount_options
+    k8s_config.append(storage_class)
+
+    pvc_names = []
+    for i in range(args.peers_count):
+        nfs_pvc = {
+            'kind': 'PersistentVolumeClaim',
+            'apiVersion': 'v1',
+            'metadata': {
+                'name': gen_nfs_pvc_name(args.chain_name, i),
+            },
+            'spec': {
+                'accessModes': [
+                    args.access_mode,
+                ],
+                'resources': {
+                    'requests': {
+                        'storage': args.request,
+                    },
+                },
+                'storageClassName': 'nfs-storage',
+            },
+        }
+        k8s_config.append(nfs_pvc)
+        pvc_names.append(gen_nfs_pvc_name(args.chain_name, i))
+        # pods mount the pvc with subPath cita-cloud/<chain_name>/node<i>
+        if args.provisioner == NFS_CSI_PROVISIONER:
+            print('node{}: copy cita-cloud/{}/node{} to {}:{}/<namespace>/{}/cita-cloud/{}/node{}'.format(i, args.chain_name, i, args.nfs_server, args.nfs_path, gen_nfs_pvc_name(args.chain_name, i), args.chain_name, i))
+
+    # write k8s_config to yaml file
+    yaml_ptah = os.path.join(work_dir, '{}-nfs-pvc.yaml'.format(args.chain_name))
+    print("yaml_ptah:{}", yaml_ptah)
+    with open(yaml_ptah, 'wt') as stream:
+        yaml.dump_all(k8s_config, stream, sort_keys=False)
+
+    write_pvc_map(work_dir, args.chain_name, pvc_names, None)
+
+    print("Done!!!")
+
+
 def run_subcmd_nfs_pvc(args, work_dir):
+    mount_options = gen_nfs_mount_options(args)
+    if args.dynamic:
+        run_subcmd_dynamic_nfs_pvc(args, work_dir, mount_options)
+        return
+
     k8s_config = []
     nfs_pv = {
         'apiVersion': 'v1',
@@ -130,10 +435,10 @@ def run_subcmd_nfs_pvc(args, work_dir):
         },
         'spec': {
             'capacity': {
-                'storage': '100Gi',
+                'storage': args.capacity,
             },
             'accessModes': [
-                'ReadWriteMany',
+                args.access_mode,
             ],
             'persistentVolumeReclaimPolicy': 'Retain',
             'nfs': {
@@ -142,6 +447,8 @@ def run_subcmd_nfs_pvc(args, work_dir):
             },
         },
     }
+    if mount_options:
+        nfs_pv['spec']['mountOptions'] = mount_options
     k8s_config.append(nfs_pv)
     nfs_pvc = {
         'kind': 'PersistentVolumeClaim',
@@ -151,11 +458,11 @@ def run_subcmd_nfs_pvc(args, work_dir):
         },
         'spec': {
             'accessModes': [
-                'ReadWriteMany',
+                args.access_mode,
             ],
             'resources': {
                 'requests': {
-                    'storage': '10Gi',
+                    'storage': args.request,
                 },
             },
         },
@@ -176,6 +483,7 @@ def main():
     print("args:", args)
     funcs_router = {
         SUBCMD_LOCAL_PVC: run_subcmd_local_pvc,
+        SUBCMD_NODE_LOCAL_PVC: run_subcmd_node_local_pvc,
         SUBCMD_NFS_PVC: run_subcmd_nfs_pvc,
     }
     work_dir = os.path.abspath(os.curdir)
@@ -184,5 +492,6 @@ def main():
 
 if __name__ == '__main__':
     SUBCMD_LOCAL_PVC = 'local_pvc'
+    SUBCMD_NODE_LOCAL_PVC = 'node_local_pvc'
     SUBCMD_NFS_PVC = 'nfs_pvc'
     main()
@@ -2,9 +2,12 @@
 # -*- coding:utf-8 -*-
 # pylint: disable=missing-docstring
 
+import argparse
 import os
+from concurrent.futures import ProcessPoolExecutor
 from pysmx.SM2 import generate_keypair
 from pysmx.SM3 import hash_msg
+from create_account import write_summary
 
 
 def gen_sm2_keypair(work_dir, chain_name):
@@ -19,13 +22,34 @@ def gen_sm2_keypair(work_dir, chain_name):
     return addr
 
 
-def main():
+def parse_arguments():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        '--count',
+        type=int,
+        default=1,
+        help='Count of keypairs to generate.')
+
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        default=0,
+        help='Count of processes to generate keypairs, 0 is count of cpus.')
+
+    parser.add_argument(
+        '--summary', help='Write addresses of generated keypairs to the file, json or csv by the extension.')
+
+    args = parser.parse_args()
+    return args
+
+
+def gen_account(current_dir):
     pk, sk = generate_keypair()
     address = '0x'+hash_msg(pk)[24:]
 
     print("address:", address)
 
-    current_dir = os.path.abspath(os.curdir)
     target_dir = os.path.join(current_dir, address)
     if not os.path.exists(target_dir):
         os.makedirs(target_dir)
@@ -41,6 +65,19 @@ def main():
     path = os.path.join(target_dir, 'key_id')
     with open(path, 'wt') as stream:
         stream.write("1")
+    return {'address': address, 'key_id': '1', 'path': target_dir}
+
+
+def main():
+    args = parse_arguments()
+    current_dir = os.path.abspath(os.curdir)
+    # sm2 of pysmx is pure python, use processes
+    with ProcessPoolExecutor(max_workers=args.jobs or None) as executor:
+        accounts = list(executor.map(gen_account, [current_dir] * args.count))
+    if args.count > 1:
+        print("authorities:", ','.join(account['address'] for account in accounts))
+    if args.summary:
+        write_summary(args.summary, accounts)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+# pylint: disable=missing-docstring
+
+import argparse
+import http.server
+import json
+import os
+import queue
+import sys
+import tempfile
+import threading
+import unittest
+import urllib.parse
+
+import yaml
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import create_k8s_config  # noqa: E402
+
+
+# stand-in of API Server: records PATCH requests, answers GET with a watch stream or an object
+# requests records method and path of PATCH and GET of objects in order
+class StubHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_PATCH(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        url = urllib.parse.urlsplit(self.path)
+        self.server.requests.append(('PATCH', url.path))
+        self.server.patches.append({
+            'path': url.path,
+            'query': urllib.parse.parse_qs(url.query),
+            'content_type': self.headers['Content-Type'],
+            'obj': json.loads(body),
+        })
+        status = 409 if url.path.endswith('/conflict') else 200
+        self.send_body(status, b'{}')
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        query = urllib.parse.parse_qs(url.query)
+        if query.get('watch') == ['true']:
+            self.server.watch_queries.append(query)
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            for event in self.server.watch_events:
+                self.wfile.write((json.dumps(event) + '\n').encode())
+                self.wfile.flush()
+            self.close_connection = True
+            return
+        self.server.requests.append(('GET', url.path))
+        self.send_body(200, json.dumps(self.server.objects[url.path]).encode())
+
+    def send_body(self, status, body):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def gen_deployment(name, ready):
+    return {
+        'apiVersion': 'apps/v1',
+        'kind': 'Deployment',
+        'metadata': {
+            'name': name,
+            'generation': 1,
+            'labels': {
+                'node_name': name,
+            },
+        },
+        'spec': {
+            'replicas': 1,
+        },
+        'status': {
+            'observedGeneration': 1,
+            'updatedReplicas': 1,
+            'readyReplicas': 1 if ready else 0,
+        },
+    }
+
+
+def gen_pod(name):
+    return {
+        'metadata': {
+            'name': name,
+            'creationTimestamp': '2021-06-01T08:00:00Z',
+        },
+        'status': {
+            'conditions': [
+                {'type': 'PodScheduled', 'status': 'True', 'lastTransitionTime': '2021-06-01T08:00:01Z'},
+                {'type': 'Ready', 'status': 'True', 'lastTransitionTime': '2021-06-01T08:00:09Z'},
+            ],
+            'containerStatuses': [
+                {'name': 'controller', 'state': {'running': {'startedAt': '2021-06-01T08:00:05.123Z'}}},
+            ],
+        },
+    }
+
+
+class StubServerTest(unittest.TestCase):
+    def setUp(self):
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        self.server.patches = []
+        self.server.requests = []
+        self.server.watch_queries = []
+        self.server.watch_events = []
+        self.server.objects = {}
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.url = 'http://127.0.0.1:{}'.format(self.server.server_address[1])
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        self.temp_dir.cleanup()
+
+    def write_yaml(self, objs):
+        path = os.path.join(self.temp_dir.name, 'test-chain.yaml')
+        with open(path, 'wt') as stream:
+            yaml.dump_all(objs, stream, sort_keys=False)
+        return path
+
+    def gen_apply_args(self, files, wave_size=0, wave_timeout=5):
+        return argparse.Namespace(
+            files=files,
+            index=None,
+            kubeconfig=None,
+            context=None,
+            contexts=None,
+            server=self.url,
+            namespace='default',
+            concurrency=4,
+            field_manager='runner-k8s',
+            force_conflicts=True,
+            timeout=5,
+            wave_size=wave_size,
+            wave_timeout=wave_timeout,
+        )
+
+
+class ApplyTest(StubServerTest):
+    def test_server_side_apply(self):
+        secret = {'apiVersion': 'v1', 'kind': 'Secret', 'metadata': {'name': 'kms-test-chain'}, 'data': {'key': 'MTIz'}}
+        deployment = gen_deployment('test-chain-0', True)
+        path = self.write_yaml([deployment, secret])
+        create_k8s_config.run_subcmd_apply(self.gen_apply_args([path]), self.temp_dir.name)
+
+        self.assertEqual([patch['path'] for patch in self.server.patches], [
+            '/api/v1/namespaces/default/secrets/kms-test-chain',
+            '/apis/apps/v1/namespaces/default/deployments/test-chain-0',
+        ])
+        for patch in self.server.patches:
+            self.assertEqual(patch['content_type'], 'application/apply-patch+yaml')
+            self.assertEqual(patch['query'], {'fieldManager': ['runner-k8s'], 'force': ['true']})
+        self.assertEqual(self.server.patches[0]['obj'], secret)
+
+    def test_conflict_fails(self):
+        obj = {'apiVersion': 'v1', 'kind': 'ConfigMap', 'metadata': {'name': 'conflict'}}
+        path = self.write_yaml([obj])
+        with self.assertRaises(SystemExit):
+            create_k8s_config.run_subcmd_apply(self.gen_apply_args([path]), self.temp_dir.name)
+
+    def write_deployments(self, readies):
+        deployments = [gen_deployment('test-chain-{}'.format(i), ready) for i, ready in enumerate(readies)]
+        for deployment in deployments:
+            self.server.objects[self.deployment_path(deployment['metadata']['name'])] = deployment
+        return self.write_yaml(deployments)
+
+    def deployment_path(self, name):
+        return '/apis/apps/v1/namespaces/default/deployments/{}'.format(name)
+
+    def test_waves_wait_ready(self):
+        path = self.write_deployments([True] * 3)
+        create_k8s_config.run_subcmd_apply(self.gen_apply_args([path], wave_size=2), self.temp_dir.name)
+        self.assertEqual(len(self.server.patches), 3)
+        # the last node is patched after both nodes of the first wave are read ready
+        requests = self.server.requests
+        last_patch = requests.index(('PATCH', self.deployment_path('test-chain-2')))
+        for i in range(2):
+            self.assertLess(requests.index(('PATCH', self.deployment_path('test-chain-{}'.format(i)))), last_patch)
+            self.assertLess(requests.index(('GET', self.deployment_path('test-chain-{}'.format(i)))), last_patch)
+        self.assertEqual(requests[-1], ('GET', self.deployment_path('test-chain-2')))
+
+    def test_wave_not_ready_stops(self):
+        path = self.write_deployments([True, False, True])
+        with self.assertRaises(SystemExit):
+            create_k8s_config.run_subcmd_apply(self.gen_apply_args([path], wave_size=2, wave_timeout=0.1), self.temp_dir.name)
+        patched = [patch['path'] for patch in self.server.patches]
+        self.assertEqual(sorted(patched), [self.deployment_path('test-chain-0'), self.deployment_path('test-chain-1')])
+
+
+class WatchTest(StubServerTest):
+    def test_watch_stream(self):
+        pod = gen_pod('test-chain-0-abc')
+        self.server.watch_events = [
+            {'type': 'ADDED', 'object': pod},
+            {'type': 'MODIFIED', 'object': pod},
+        ]
+        cluster = create_k8s_config.gen_cluster(None, None, self.url, 'default', self.temp_dir.name)
+        events = queue.Queue()
+        create_k8s_config.watch_objects(cluster, '/api/v1/namespaces/default/pods', {'labelSelector': 'chain_name=test-chain'}, 5, events)
+
+        self.assertEqual(self.server.watch_queries[0]['labelSelector'], ['chain_name=test-chain'])
+        self.assertEqual(self.server.watch_queries[0]['timeoutSeconds'], ['5'])
+        received = [events.get_nowait() for _ in range(events.qsize())]
+        self.assertEqual([event['type'] for kind, event in received[:2]], ['ADDED', 'MODIFIED'])
+        self.assertEqual(received[-1], ('closed', 'pods'))
+
+        rollout = create_k8s_config.gen_node_rollout(received[0][1]['object'])
+        self.assertEqual(rollout['ready'] - rollout['created'], 9)
+        self.assertEqual(rollout['containers']['controller'] - rollout['created'], 5)
+
+    def test_watch_error(self):
+        cluster = create_k8s_config.gen_cluster(None, None, self.url, 'default', self.temp_dir.name)
+        self.server.server_close()
+        events = queue.Queue()
+        create_k8s_config.watch_objects(cluster, '/api/v1/namespaces/default/pods', {}, 5, events)
+        self.assertEqual(events.get_nowait()[0], 'error')
+        self.assertEqual(events.get_nowait(), ('closed', 'pods'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+# pylint: disable=missing-docstring
+
+import contextlib
+import io
+import itertools
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import toml
+import yaml
+
+REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, REPO_DIR)
+
+import create_k8s_config  # noqa: E402
+
+# subcommand names are set in __main__ of create_k8s_config
+for name in ['LOCAL_CLUSTER', 'MULTI_CLUSTER', 'PORTS', 'PLAN', 'APPLY', 'WATCH', 'PROBE']:
+    setattr(create_k8s_config, 'SUBCMD_' + name, name.lower())
+
+
+# run a subcommand of create_k8s_config, kms and syncthing run in docker and are replaced
+class CommandTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.work_dir = self.temp_dir.name
+        self.addresses = itertools.count()
+        self.kms_calls = 0
+        # config.xml and service-config.toml are read from current dir
+        self.old_dir = os.getcwd()
+        os.chdir(REPO_DIR)
+
+    def tearDown(self):
+        os.chdir(self.old_dir)
+        self.temp_dir.cleanup()
+
+    def fake_kms_account(self, dir, kms_docker_image):
+        self.kms_calls += 1
+        address = '0x{:040x}'.format(next(self.addresses))
+        for name, value in [('node_address', address), ('key_id', '1')]:
+            with open(os.path.join(dir, name), 'wt') as stream:
+                stream.write(value)
+        return address
+
+    def fake_sync_peer(self, work_dir, i, chain_name):
+        return {'ip': create_k8s_config.get_node_pod_name(i, chain_name), 'port': 22000, 'device_id': 'DEVICE{}'.format(i)}
+
+    def run_subcmd(self, *argv):
+        output = io.StringIO()
+        with mock.patch.object(sys, 'argv', ['create_k8s_config.py'] + list(argv)), \
+                mock.patch.object(create_k8s_config, 'gen_kms_account', self.fake_kms_account), \
+                mock.patch.object(create_k8s_config, 'gen_sync_peer', self.fake_sync_peer), \
+                contextlib.redirect_stdout(output):
+            create_k8s_config.main()
+        return output.getvalue()
+
+    def run_local_cluster(self, *argv):
+        return self.run_subcmd('local_cluster', '--work_dir', self.work_dir, '--kms_password', '123456', '--pvc_name', 'local-pvc', *argv)
+
+    def node_file(self, i, name):
+        return os.path.join(self.work_dir, 'cita-cloud/test-chain/node{}/{}'.format(i, name))
+
+    def read_node_file(self, i, name):
+        with open(self.node_file(i, name)) as stream:
+            return stream.read()
+
+    def load_checkpoint(self):
+        return toml.load(create_k8s_config.gen_checkpoint_path(self.work_dir, 'test-chain'))
+
+
+class CheckpointTest(CommandTest):
+    def test_rerun_skips_stages(self):
+        self.run_local_cluster()
+        kms_calls = self.kms_calls
+        genesis = self.read_node_file(0, 'genesis.toml')
+        self.run_local_cluster()
+        self.assertEqual(self.kms_calls, kms_calls)
+        self.assertEqual(self.read_node_file(0, 'genesis.toml'), genesis)
+        self.assertEqual(self.load_checkpoint()['stages'], create_k8s_config.STAGE_LIST)
+
+    def test_config_change_keeps_genesis(self):
+        with mock.patch.object(create_k8s_config.time, 'time', return_value=1000):
+            self.run_local_cluster()
+        accounts = self.load_checkpoint()['accounts']
+        log_config = self.read_node_file(0, 'controller-log4rs.yaml')
+        with mock.patch.object(create_k8s_config.time, 'time', return_value=2000):
+            output = self.run_local_cluster('--log_level', 'debug')
+
+        self.assertIn("inputs of stages ['config'] changed", output)
+        self.assertNotEqual(self.read_node_file(0, 'controller-log4rs.yaml'), log_config)
+        for i in range(2):
+            self.assertIn('timestamp = 1000000', self.read_node_file(i, 'genesis.toml'))
+        self.assertEqual(self.load_checkpoint()['accounts'], accounts)
+
+    def test_restart_from_config_regenerates_genesis(self):
+        with mock.patch.object(create_k8s_config.time, 'time', return_value=1000):
+            self.run_local_cluster()
+        with mock.patch.object(create_k8s_config.time, 'time', return_value=2000):
+            self.run_local_cluster('--restart_from', 'config')
+        self.assertIn('timestamp = 2000000', self.read_node_file(0, 'genesis.toml'))
+
+    def test_sysconfig_change_redoes_only_sysconfig(self):
+        self.run_local_cluster()
+        kms_calls = self.kms_calls
+        output = self.run_local_cluster('--block_interval', '7')
+        self.assertIn("inputs of stages ['sysconfig'] changed", output)
+        self.assertEqual(self.kms_calls, kms_calls)
+        sys_config = toml.load(self.node_file(0, 'init_sys_config.toml'))
+        self.assertEqual(sys_config['block_interval'], 7)
+
+    def test_accounts_change_fails(self):
+        self.run_local_cluster()
+        checkpoint = self.load_checkpoint()
+        with self.assertRaises(SystemExit):
+            self.run_subcmd('local_cluster', '--work_dir', self.work_dir, '--kms_password', '654321', '--pvc_name', 'local-pvc')
+        self.assertEqual(self.load_checkpoint(), checkpoint)
+
+    def test_failed_node_is_resumed(self):
+        calls = []
+
+        def failing_sync_peer(work_dir, i, chain_name):
+            calls.append(i)
+            if i == 1 and calls.count(1) == 1:
+                raise RuntimeError('sync failed')
+            return CommandTest.fake_sync_peer(self, work_dir, i, chain_name)
+
+        with mock.patch.object(self, 'fake_sync_peer', failing_sync_peer):
+            with self.assertRaises(RuntimeError):
+                self.run_local_cluster()
+            self.assertNotIn('sync', self.load_checkpoint()['stages'])
+            self.run_local_cluster()
+        self.assertEqual(calls, [0, 1, 1])
+        self.assertEqual(len(self.load_checkpoint()['sync']['peers']), 2)
+
+
+class MonitorTest(CommandTest):
+    def load_kinds(self, name):
+        with open(os.path.join(self.work_dir, name)) as stream:
+            return [(obj['kind'], obj['metadata']['name']) for obj in yaml.safe_load_all(stream) if obj]
+
+    def test_shared_exporter_is_not_in_chain(self):
+        self.run_local_cluster('--need_monitor', 'true', '--monitor_mode', 'shared')
+        shared = self.load_kinds('monitor-process.yaml')
+        self.assertEqual(shared, [('DaemonSet', 'monitor-process'), ('Service', 'monitor-process'), ('ServiceMonitor', 'monitor-process')])
+        for name in ['test-chain.yaml', 'test-chain-monitor.yaml']:
+            for obj in self.load_kinds(name):
+                self.assertNotIn(obj, shared)
+
+
+class SnapshotTest(CommandTest):
+    def gen_secret(self, network_key, kms_password):
+        return {'apiVersion': 'v1', 'kind': 'Secret', 'metadata': {'name': 'node0-secret'},
+                'data': {'network-key': network_key, 'kms-password': kms_password}}
+
+    def gen_config_map(self, data):
+        return {'apiVersion': 'v1', 'kind': 'ConfigMap', 'metadata': {'name': 'node0-config'}, 'data': data}
+
+    def write_changed(self, k8s_config):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            create_k8s_config.write_changed_config(self.work_dir, 'test-chain', 'test-chain', k8s_config, True)
+        with open(os.path.join(self.work_dir, 'test-chain-changed.yaml')) as stream:
+            changed = [create_k8s_config.gen_object_key(obj) for obj in yaml.safe_load_all(stream) if obj]
+        return changed, output.getvalue()
+
+    def test_secret_is_hashed(self):
+        secret = create_k8s_config.normalize_object(self.gen_secret('key0', 'password'))
+        self.assertEqual(secret['data']['network-key'], '')
+        self.assertNotIn('password', secret['data']['kms-password'])
+
+    def test_changed_objects(self):
+        changed, _ = self.write_changed([self.gen_secret('key0', 'password'), self.gen_config_map({'a': '1'})])
+        self.assertEqual(changed, ['Secret/node0-secret', 'ConfigMap/node0-config'])
+        # new network key alone is not a change
+        changed, _ = self.write_changed([self.gen_secret('key1', 'password'), self.gen_config_map({'a': '1'})])
+        self.assertEqual(changed, [])
+        changed, _ = self.write_changed([self.gen_secret('key2', 'password2'), self.gen_config_map({'a': '1'})])
+        self.assertEqual(changed, ['Secret/node0-secret'])
+        changed, _ = self.write_changed([self.gen_secret('key2', 'password2'), self.gen_config_map({'a': '2'})])
+        self.assertEqual(changed, ['ConfigMap/node0-config'])
+
+    def test_removed_objects_are_reported(self):
+        self.write_changed([self.gen_secret('key0', 'password'), self.gen_config_map({'a': '1'})])
+        changed, output = self.write_changed([self.gen_config_map({'a': '1'})])
+        self.assertEqual(changed, [])
+        self.assertIn('removed: Secret/node0-secret', output)
+
+    def test_rerun_of_local_cluster(self):
+        self.run_local_cluster('--changed_only', 'true')
+        output = self.run_local_cluster('--changed_only', 'true')
+        self.assertNotIn('changed:', output)
+        output = self.run_local_cluster('--changed_only', 'true', '--image_pull_policy', 'IfNotPresent')
+        self.assertIn('changed: Deployment/', output)
+        self.assertNotIn('changed: Secret/', output)
+
+
+class PlanTest(CommandTest):
+    def run_plan(self, *argv):
+        output = self.run_subcmd('plan', '--pv_capacity', '100Ti', *argv)
+        return dict(line.split(': ', 1) for line in output.splitlines() if ': ' in line and not line.startswith('args'))
+
+    def test_native_sidecars_are_counted(self):
+        parallel = self.run_plan()
+        native = self.run_plan('--startup_order', 'native')
+        self.assertEqual(native['containers'], parallel['containers'])
+        self.assertEqual(native['pods'], parallel['pods'])
+
+    def test_extra_workloads_are_counted(self):
+        self.assertEqual(self.run_plan()['pods'], '2')
+        self.assertEqual(self.run_plan('--bench', 'true', '--need_prepull', 'true', '--cluster_nodes', '3')['pods'], '6')
+
+    def test_logs_out_of_pv(self):
+        self.assertNotEqual(self.run_plan()['pv logs'], '0')
+        self.assertEqual(self.run_plan('--log_volume', 'emptydir')['pv logs'], '0')
+
+
+class TikvTest(unittest.TestCase):
+    def gen_service_config(self, tikv_config):
+        service_config = {
+            'services': [{'name': 'storage', 'docker_image': 'citacloud/storage_tikv', 'cmd': 'storage run -p 50003'}],
+            'tikv': tikv_config,
+        }
+        with contextlib.redirect_stdout(io.StringIO()):
+            create_k8s_config.wire_tikv_storage(service_config, 'test-chain')
+        return create_k8s_config.find_service(service_config, 'storage')
+
+    def test_cmd_is_kept_by_default(self):
+        storage = self.gen_service_config({})
+        self.assertEqual(storage['cmd'], 'storage run -p 50003')
+        self.assertNotIn('tikv_keyspace_arg', storage)
+
+    def test_arguments_from_config(self):
+        storage = self.gen_service_config({'pd_endpoints_arg': '--pd', 'keyspace_arg': '--prefix'})
+        self.assertEqual(storage['cmd'], 'storage run -p 50003 --pd pd-test-chain:2379')
+        self.assertEqual(storage['tikv_keyspace_arg'], '--prefix')
+
+
+if __name__ == '__main__':
+    unittest.main()
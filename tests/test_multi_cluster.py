@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+# pylint: disable=missing-docstring
+
+import contextlib
+import io
+import os
+import sys
+import unittest
+
+import toml
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from test_local_cluster import CommandTest, create_k8s_config  # noqa: E402
+
+
+# inventory of multi cluster, clusters of nodes are given in order
+class InventoryTest(CommandTest):
+    def write_inventory(self, clusters):
+        inventory = {
+            'super_admin': '0x' + '1' * 40,
+            'nodes': [],
+        }
+        for i, cluster in enumerate(clusters):
+            inventory['nodes'].append({
+                'cluster': cluster,
+                'ip': '10.0.0.{}'.format(i + 1),
+                'lbs_token': 'token{}'.format(i),
+                'authority': '0x{:040x}'.format(i + 1),
+                'kms_password': 'password{}'.format(i),
+                'pvc_name': 'pvc{}'.format(i),
+                'sync_device_id': 'DEVICE{}'.format(i),
+                'node_port': 30000,
+            })
+        path = os.path.join(self.work_dir, 'inventory.toml')
+        with open(path, 'wt') as stream:
+            toml.dump(inventory, stream)
+        return path
+
+    def run_multi_cluster(self, clusters, *argv):
+        return self.run_subcmd('multi_cluster', '--work_dir', self.work_dir, '--inventory', self.write_inventory(clusters), '--jobs', '1', *argv)
+
+    def load_index(self):
+        return toml.load(os.path.join(self.work_dir, 'test-chain-index.toml'))
+
+    def load_objs(self, path):
+        with open(os.path.join(self.work_dir, path)) as stream:
+            return [obj for obj in yaml.safe_load_all(stream) if obj]
+
+
+class RenderTest(InventoryTest):
+    def test_index_of_clusters(self):
+        self.run_multi_cluster(['k8s-a', 'k8s-b', 'k8s-a'])
+        index = self.load_index()
+        self.assertEqual(index['chain_name'], 'test-chain')
+        self.assertEqual(index['clusters']['k8s-a']['nodes'], [0, 2])
+        self.assertEqual(index['clusters']['k8s-a']['ips'], ['10.0.0.1', '10.0.0.3'])
+        self.assertEqual(index['clusters']['k8s-a']['files'], ['k8s-a/test-chain-0.yaml', 'k8s-a/test-chain-2.yaml'])
+        self.assertEqual(index['clusters']['k8s-b']['files'], ['k8s-b/test-chain-1.yaml'])
+
+    def test_files_of_nodes(self):
+        self.run_multi_cluster(['k8s-a', 'k8s-b', 'k8s-a'])
+        objs = self.load_objs('k8s-a/test-chain-2.yaml')
+        kinds = [obj['kind'] for obj in objs]
+        self.assertEqual(kinds.count('Secret'), 2)
+        self.assertIn('Deployment', kinds)
+        deployment = [obj for obj in objs if obj['kind'] == 'Deployment'][0]
+        volumes = [volume for volume in deployment['spec']['template']['spec']['volumes'] if 'persistentVolumeClaim' in volume]
+        self.assertIn('pvc2', [volume['persistentVolumeClaim']['claimName'] for volume in volumes])
+        # peers of node are addressed by ips of inventory
+        peers = toml.load(self.node_file(2, 'network-config.toml'))['peers']
+        self.assertEqual([peer['ip'] for peer in peers], ['10.0.0.1', '10.0.0.2'])
+
+    def test_node_ports_from_registry(self):
+        path = self.write_inventory(['k8s-a', 'k8s-b'])
+        inventory = toml.load(path)
+        for node in inventory['nodes']:
+            del node['node_port']
+        with open(path, 'wt') as stream:
+            toml.dump(inventory, stream)
+        registry_path = os.path.join(self.work_dir, 'port-registry.toml')
+        output = self.run_subcmd('multi_cluster', '--work_dir', self.work_dir, '--inventory', path, '--jobs', '1', '--port_registry', registry_path)
+        self.assertIn('node_ports: [30000, {}]'.format(30000 + create_k8s_config.MC_NODE_PORTS_SIZE), output)
+        peers = toml.load(self.node_file(0, 'network-config.toml'))['peers']
+        self.assertEqual(peers, [{'ip': '10.0.0.2', 'port': 30000 + create_k8s_config.MC_NODE_PORTS_SIZE}])
+
+    def test_probe_targets(self):
+        self.run_multi_cluster(['k8s-a'] * 4 + ['k8s-b'] * 3)
+        targets = create_k8s_config.load_probe_targets(self.work_dir, 'test-chain')
+        self.assertEqual([target.split(':')[0] for target in targets], ['10.0.0.{}'.format(i + 1) for i in range(7)])
+
+
+class VerifyTest(InventoryTest):
+    def gen_inventory(self, clusters):
+        return toml.load(self.write_inventory(clusters))
+
+    def verify(self, inventory, is_need_sync=True, is_port_allocated=False):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output), self.assertRaises(SystemExit):
+            create_k8s_config.verify_inventory(inventory, is_need_sync, is_port_allocated)
+        return output.getvalue()
+
+    def test_valid_inventory(self):
+        create_k8s_config.verify_inventory(self.gen_inventory(['k8s-a', 'k8s-b']), True, False)
+
+    def test_no_nodes(self):
+        self.assertIn('inventory: no nodes', self.verify({}))
+
+    def test_missing_fields(self):
+        inventory = self.gen_inventory(['k8s-a', 'k8s-b'])
+        del inventory['nodes'][1]['pvc_name']
+        del inventory['nodes'][1]['sync_device_id']
+        output = self.verify(inventory)
+        self.assertIn('node 1: pvc_name must be set', output)
+        self.assertIn('node 1: sync_device_id must be set', output)
+        # sync_device_id is optional without sync
+        self.assertNotIn('sync_device_id', self.verify(inventory, is_need_sync=False))
+
+    def test_node_port(self):
+        inventory = self.gen_inventory(['k8s-a', 'k8s-b'])
+        del inventory['nodes'][0]['node_port']
+        self.assertIn('node 0: node_port must be set', self.verify(inventory))
+        create_k8s_config.verify_inventory(inventory, True, True)
+        inventory['nodes'][0]['node_port'] = '30000'
+        self.assertIn('node 0: node_port must be int', self.verify(inventory))
+
+    def test_duplicated_values(self):
+        inventory = self.gen_inventory(['k8s-a', 'k8s-b'])
+        inventory['nodes'][1]['authority'] = inventory['nodes'][0]['authority']
+        inventory['nodes'][1]['ip'] = inventory['nodes'][0]['ip']
+        output = self.verify(inventory)
+        self.assertIn('authority {} is duplicated'.format(inventory['nodes'][0]['authority']), output)
+        self.assertIn('address 10.0.0.1:30000 is duplicated', output)
+
+
+class PdbTest(InventoryTest):
+    def load_pdbs(self):
+        pdbs = {}
+        for cluster, cluster_index in self.load_index()['clusters'].items():
+            for path in cluster_index['files']:
+                for obj in self.load_objs(path):
+                    if obj['kind'] == 'PodDisruptionBudget':
+                        pdbs[cluster] = obj
+        return pdbs
+
+    def test_pdb_of_each_cluster(self):
+        # bft of 7 validators tolerates 2 faults
+        self.run_multi_cluster(['k8s-a'] * 4 + ['k8s-b'] * 2 + ['k8s-c'])
+        pdbs = self.load_pdbs()
+        self.assertEqual(list(pdbs), ['k8s-a'])
+        self.assertEqual(pdbs['k8s-a']['spec']['minAvailable'], 2)
+        self.assertEqual(pdbs['k8s-a']['spec']['selector']['matchLabels'], {'chain_name': 'test-chain', 'node_role': 'validator'})
+
+    def test_no_pdb_without_tolerated_faults(self):
+        self.run_multi_cluster(['k8s-a'] * 3)
+        self.assertEqual(self.load_pdbs(), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
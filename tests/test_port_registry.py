@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+# pylint: disable=missing-docstring
+
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from test_local_cluster import CommandTest, create_k8s_config  # noqa: E402
+
+
+class PortRegistryTest(CommandTest):
+    def setUp(self):
+        super().setUp()
+        self.registry_path = os.path.join(self.work_dir, 'port-registry.toml')
+
+    def gen_registry(self, port_range='30000-30019'):
+        return create_k8s_config.load_port_registry(self.registry_path, port_range)
+
+    def assert_no_overlap(self, registry):
+        ports = []
+        for block in registry['blocks']:
+            ports.extend(range(block['start'], block['start'] + block['size']))
+        self.assertEqual(len(ports), len(set(ports)))
+        self.assertTrue(all(registry['min_port'] <= port <= registry['max_port'] for port in ports))
+
+    def test_alloc_and_free(self):
+        registry = self.gen_registry()
+        self.assertEqual(create_k8s_config.alloc_ports(registry, 'chain-a', 0, 5), 30000)
+        self.assertEqual(create_k8s_config.alloc_ports(registry, 'chain-b', 0, 5), 30005)
+        self.assertEqual(create_k8s_config.alloc_ports(registry, 'chain-a', 1, 5), 30010)
+        # same block is returned on rerun
+        self.assertEqual(create_k8s_config.alloc_ports(registry, 'chain-b', 0, 5), 30005)
+        self.assert_no_overlap(registry)
+
+        freed = create_k8s_config.free_ports(registry, 'chain-a')
+        self.assertEqual(sorted(block['start'] for block in freed), [30000, 30010])
+        # first fit reuses the freed ports
+        self.assertEqual(create_k8s_config.alloc_ports(registry, 'chain-c', -1, 3), 30000)
+        self.assert_no_overlap(registry)
+        stat = create_k8s_config.gen_port_stat(registry)
+        self.assertEqual((stat['used'], stat['free'], stat['largest_free_block'], stat['chains']), (8, 12, 10, 2))
+
+    def test_grow_block(self):
+        registry = self.gen_registry()
+        create_k8s_config.alloc_ports(registry, 'chain-a', 0, 5)
+        create_k8s_config.alloc_ports(registry, 'chain-b', 0, 5)
+        self.assertEqual(create_k8s_config.alloc_ports(registry, 'chain-a', 0, 8), 30010)
+        self.assertEqual(len(registry['blocks']), 2)
+        self.assert_no_overlap(registry)
+
+    def test_range_is_full(self):
+        registry = self.gen_registry()
+        create_k8s_config.alloc_ports(registry, 'chain-a', -1, 16)
+        with self.assertRaises(SystemExit):
+            create_k8s_config.alloc_ports(registry, 'chain-b', -1, 5)
+
+    def test_invalid_range(self):
+        for port_range in ['30000', '30010-30000', 'a-b']:
+            with self.assertRaises(SystemExit):
+                create_k8s_config.parse_port_range(port_range)
+
+    def test_blocks_are_saved(self):
+        starts = create_k8s_config.alloc_port_blocks(self.registry_path, 'chain-a', [0, 1, 2], 5)
+        self.assertEqual(starts, [30000, 30005, 30010])
+        self.assertEqual(create_k8s_config.alloc_port_blocks(self.registry_path, 'chain-b', [-1], 5), [30015])
+        # rerun of a chain keeps its ports
+        self.assertEqual(create_k8s_config.alloc_port_blocks(self.registry_path, 'chain-a', [0, 1, 2], 5), starts)
+        self.assert_no_overlap(create_k8s_config.load_port_registry(self.registry_path))
+
+    def test_alloc_waits_for_lock(self):
+        starts = []
+        lock = create_k8s_config.lock_port_registry(self.registry_path)
+        thread = threading.Thread(target=lambda: starts.extend(create_k8s_config.alloc_port_blocks(self.registry_path, 'chain-a', [0], 5)))
+        thread.start()
+        thread.join(0.2)
+        self.assertTrue(thread.is_alive())
+        self.assertFalse(os.path.exists(self.registry_path))
+        lock.close()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(starts, [30000])
+
+    def test_concurrent_allocs_do_not_overlap(self):
+        threads = [threading.Thread(target=create_k8s_config.alloc_port_blocks, args=(self.registry_path, 'chain-{}'.format(i), [0, 1], 5)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        registry = create_k8s_config.load_port_registry(self.registry_path)
+        self.assertEqual(len(registry['blocks']), 16)
+        self.assert_no_overlap(registry)
+
+    def test_free_subcommand(self):
+        create_k8s_config.alloc_port_blocks(self.registry_path, 'chain-a', [0, 1], 5)
+        create_k8s_config.alloc_port_blocks(self.registry_path, 'chain-b', [-1], 5)
+        output = self.run_subcmd('ports', 'free', '--port_registry', self.registry_path, '--chain_name', 'chain-a')
+        self.assertIn('freed 10 ports of chain-a', output)
+        output = self.run_subcmd('ports', 'list', '--port_registry', self.registry_path)
+        self.assertEqual(output.strip().splitlines()[-1], 'chain-b\t-1\t30010-30014')
+
+
+if __name__ == '__main__':
+    unittest.main()